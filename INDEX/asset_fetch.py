@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Asset Fetch
+Concurrent, conditional download of remote assets (UXL engine files) with a TTL,
+validators (ETag / Last-Modified) kept in INDEX/.cache and an offline mode
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FETCH_META_NAME = 'asset_fetch.json'
+
+USER_AGENT = "SynapseDocConverter/1.0 (+https://github.com/KhudyakovAlex/Synapse)"
+
+# Fetch results
+UPDATED = 'updated'            # new content written
+NOT_MODIFIED = 'not-modified'  # server confirmed (304) or same bytes
+FRESH = 'fresh'                # checked less than `ttl` seconds ago, no request
+OFFLINE = 'offline'            # offline mode, no request
+FAILED = 'failed'              # request failed, local copy (if any) kept
+
+
+class AssetFetcher:
+    """
+    Keeps local copies of remote files up to date.
+
+    Each (url, destination) pair is fetched in its own thread. Requests are
+    conditional (If-None-Match / If-Modified-Since from the previous response),
+    and a destination checked less than `ttl` seconds ago is not requested at all.
+    With offline=True nothing is requested; existing local copies are used as is.
+    """
+
+    VERSION = 1
+
+    def __init__(self, meta_path: Path, ttl: float = 0, timeout: float = 10,
+                 offline: bool = False, repo_root: Optional[Path] = None):
+        self.meta_path = Path(meta_path)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.offline = offline
+        self.repo_root = Path(repo_root) if repo_root else None
+        self.meta: Dict[str, dict] = self._load_meta()
+
+    def _load_meta(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return data.get('entries', {}) if data.get('version') == self.VERSION else {}
+
+    def _save_meta(self):
+        try:
+            self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+            data = {'version': self.VERSION, 'entries': self.meta}
+            tmp = self.meta_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+            tmp.replace(self.meta_path)
+        except OSError as e:
+            print(f"  [WARN] Failed to save asset fetch metadata: {e}")
+
+    def _key(self, dst: Path) -> str:
+        if self.repo_root:
+            try:
+                return dst.relative_to(self.repo_root).as_posix()
+            except ValueError:
+                pass
+        return dst.as_posix()
+
+    def fetch_one(self, url: str, dst: Path) -> str:
+        """Bring dst up to date with url. Returns one of the fetch result constants."""
+        dst = Path(dst)
+        key = self._key(dst)
+        entry = self.meta.get(key, {})
+        if entry.get('url') != url:
+            entry = {}
+        have_local = dst.exists()
+
+        if self.offline:
+            return OFFLINE
+        if have_local and entry and time.time() - entry.get('checked', 0) < self.ttl:
+            return FRESH
+
+        headers = {"User-Agent": USER_AGENT}
+        if have_local:
+            # Validators only make sense if we still have the body they describe
+            if entry.get('etag'):
+                headers["If-None-Match"] = entry['etag']
+            if entry.get('last_modified'):
+                headers["If-Modified-Since"] = entry['last_modified']
+        req = urllib.request.Request(url, headers=headers)
+
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                data = resp.read()
+                etag = resp.headers.get('ETag')
+                last_modified = resp.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and have_local:
+                entry['checked'] = time.time()
+                self.meta[key] = entry
+                return NOT_MODIFIED
+            return FAILED
+        except Exception:
+            return FAILED
+
+        self.meta[key] = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'checked': time.time(),
+        }
+
+        try:
+            if have_local and dst.read_bytes() == data:
+                return NOT_MODIFIED
+        except OSError:
+            # If read fails, we'll try to overwrite below.
+            pass
+
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(dst.name + '.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(dst)
+            return UPDATED
+        except OSError:
+            self.meta.pop(key, None)
+            return FAILED
+
+    def fetch(self, items: List[Tuple[str, Path]]) -> List[str]:
+        """Fetch all (url, dst) pairs concurrently. Results are in input order."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=len(items)) as pool:
+            results = list(pool.map(lambda item: self.fetch_one(*item), items))
+        if not self.offline:
+            self._save_meta()
+        return results
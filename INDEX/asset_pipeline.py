@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Asset Pipeline
+Content-addressed names for INDEX/assets (opt-in, convert_to_html.py --fingerprint-assets):
+assets/css/style.css -> assets/css/style.<hash>.css, referenced from the generated pages,
+so the published files can be cached forever. The fingerprinted files are referenced
+by the committed pages and are committed with them.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from build_cache import OutputWriter
+
+# Length of the content hash in fingerprinted names
+HASH_LENGTH = 10
+
+# href="../assets/css/style.css" / src="assets/img/logo.png" (also already fingerprinted names)
+ASSET_REF_RE = re.compile(r'(?P<attr>\b(?:href|src)=")(?P<prefix>(?:\.\./)*)assets/(?P<path>[^"?#]+)"')
+# srcset="../assets/img/logo.w480.png 480w, ../assets/img/logo.png 5536w"
+SRCSET_RE = re.compile(r'(?P<attr>\bsrcset=")(?P<value>[^"]*)"')
+_SRCSET_URL_RE = re.compile(r'(?P<prefix>(?:\.\./)*)assets/(?P<path>[^\s,"]+)')
+_HASHED_NAME_RE = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{%d}(?P<suffix>\.[^.]+)$' % HASH_LENGTH)
+
+
+def plain_asset_path(path: str) -> str:
+    """assets-relative path without a fingerprint ('css/style.0123456789.css' -> 'css/style.css')"""
+    folder, _, name = path.rpartition('/')
+    match = _HASHED_NAME_RE.match(name)
+    if match:
+        name = match.group('stem') + match.group('suffix')
+    return f"{folder}/{name}" if folder else name
+
+
+class AssetFingerprints:
+    """
+    Fingerprinted copies of files under INDEX/assets.
+
+    The fingerprinted file is created next to the original (hardlink when possible,
+    copy otherwise) the first time a page references it; older fingerprints of the
+    same asset are removed. Missing assets are left as plain references.
+    """
+
+    def __init__(self, assets_root: Path, writer: Optional[OutputWriter] = None):
+        self.assets_root = Path(assets_root)
+        self.writer = writer or OutputWriter()
+        self._names: Dict[str, Optional[str]] = {}
+
+    def fingerprinted(self, path: str) -> Optional[str]:
+        """assets-relative path -> fingerprinted assets-relative path (None if the file is missing)"""
+        path = plain_asset_path(path)
+        if path not in self._names:
+            self._names[path] = self._materialize(path)
+        return self._names[path]
+
+    def _materialize(self, path: str) -> Optional[str]:
+        src = self.assets_root / path
+        try:
+            digest = hashlib.sha256(src.read_bytes()).hexdigest()[:HASH_LENGTH]
+        except OSError:
+            return None
+        dst = src.with_name(f"{src.stem}.{digest}{src.suffix}")
+        if not dst.exists():
+            self.writer.link(src, dst)
+        # Previous versions of this asset
+        for old in src.parent.glob(f"{src.stem}.*{src.suffix}"):
+            match = _HASHED_NAME_RE.match(old.name)
+            if old != dst and match and match.group('stem') == src.stem:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        return dst.relative_to(self.assets_root).as_posix()
+
+    def rewrite(self, html: str) -> str:
+        """Point every assets/... reference in a page (srcset candidates too) at the fingerprinted file"""
+
+        def replace(match):
+            hashed = self.fingerprinted(match.group('path'))
+            if hashed is None:
+                return match.group(0)
+            return f'{match.group("attr")}{match.group("prefix")}assets/{hashed}"'
+
+        def replace_candidate(match):
+            hashed = self.fingerprinted(match.group('path'))
+            if hashed is None:
+                return match.group(0)
+            return f'{match.group("prefix")}assets/{hashed}'
+
+        html = ASSET_REF_RE.sub(replace, html)
+        return _rewrite_srcsets(html, replace_candidate)
+
+    def signature(self, paths) -> str:
+        """Fingerprints of the given assets-relative paths (for build fingerprints)"""
+        return '\n'.join(f"{path}={self.fingerprinted(path)}" for path in sorted(set(paths)))
+
+    def invalidate(self):
+        """Forget computed fingerprints (assets changed on disk during the run)"""
+        self._names.clear()
+
+
+def _rewrite_srcsets(html: str, replace_candidate) -> str:
+    """Apply replace_candidate to every assets/... URL inside srcset attributes"""
+    if 'srcset="' not in html:
+        return html
+    return SRCSET_RE.sub(
+        lambda match: f'{match.group("attr")}{_SRCSET_URL_RE.sub(replace_candidate, match.group("value"))}"', html)
+
+
+def restore(html: str) -> str:
+    """Undo rewrite(): fingerprinted references back to plain asset names"""
+
+    def replace(match):
+        return f'{match.group("attr")}{match.group("prefix")}assets/{plain_asset_path(match.group("path"))}"'
+
+    def replace_candidate(match):
+        return f'{match.group("prefix")}assets/{plain_asset_path(match.group("path"))}'
+
+    return _rewrite_srcsets(ASSET_REF_RE.sub(replace, html), replace_candidate)
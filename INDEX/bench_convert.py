@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Documentation Benchmarks
+Measures the cost of the documentation pipeline (convert_to_html.py)
+
+Usage:
+    python INDEX/bench_convert.py pipeline [--scales 1 10 100 1000] [--jobs N] [--json out.json]
+    python INDEX/bench_convert.py corpus --scale 10 --out /tmp/synapse_corpus
+    python INDEX/bench_convert.py compare before.json after.json
+    python INDEX/bench_convert.py markdown-setup [--repeat N]
+
+The pipeline benchmark converts a synthetic PRD/PDS-style corpus of `scale` times the
+size of the real one (PRD/ + PDS/) and reports wall time plus per-stage timings of
+convert_file. Results are written as JSON so runs can be compared.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import convert_to_html  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Bump when the generator changes, so results from different corpora are not compared
+CORPUS_VERSION = 1
+
+
+def load_corpus(repo_root: Path, folders=('PDS',)):
+    """(name, markdown text) for every .md in the given folders"""
+    corpus = []
+    for folder in folders:
+        for md_file in sorted((repo_root / folder).glob('*.md')):
+            corpus.append((md_file.name, md_file.read_text(encoding='utf-8')))
+    return corpus
+
+
+def real_corpus_bytes(repo_root: Path) -> int:
+    return sum(len(text.encode('utf-8')) for _, text in load_corpus(repo_root, ('PRD', 'PDS')))
+
+
+# --- Synthetic corpus ----------------------------------------------------------
+
+WORDS = (
+    'контроллер светильник линия DALI прошивка приложение телеграмма устройство '
+    'группа сценарий датчик кнопка расписание помещение яркость уровень состояние '
+    'данные таблица поле запись идентификатор значение параметр команда адрес '
+    'отправляет получает обновляет сохраняет проверяет включает выключает '
+    'пользователь настройка режим статус ответ запрос ошибка событие'
+).split()
+
+TELEGRAMS = ('[FW.CONTR_GET()]', '[FW.DALI_SCAN(1)]', '[USM.CONTR_SET(NAME)]', '[USM.DALI_LEVEL(3, 254)]')
+
+MERMAID_FLOW = """```mermaid
+graph TD
+    A[Телефон] -->|BLE| B[Контроллер]
+    B --> C{{Линия DALI}}
+    C --> D[Светильник {n}]
+    C --> E[Датчик {n}]
+```"""
+
+MERMAID_ER = """```mermaid
+erDiagram
+    CONTROLLERS ||--o{{ LUMINAIRES : contains
+    CONTROLLERS {{
+        int ID PK
+        string NAME
+    }}
+    LUMINAIRES {{
+        int ID PK
+        int LEVEL_{n}
+    }}
+```"""
+
+UXL_BLOCK = """```uxl
+SCREEN Экран {n}
+  HEADER "Контроллер {n}"
+  IMAGE SRC:assets/img/splash_logo.png
+  BUTTON "Включить"
+```"""
+
+
+class CorpusGenerator:
+    """Deterministic PRD/PDS-style markdown (seeded), sized relative to the real corpus"""
+
+    def __init__(self, seed: int = 1):
+        self.rand = random.Random(seed)
+
+    def sentence(self, words=12) -> str:
+        text = ' '.join(self.rand.choice(WORDS) for _ in range(self.rand.randint(words // 2, words)))
+        return text[0].upper() + text[1:] + '.'
+
+    def document(self, name: str, index: int, names, sections) -> str:
+        r = self.rand
+        lines = [
+            f"# Документ {index}: {self.sentence(4)[:-1]}",
+            "",
+            "АПК Синапс v1.0. ПО. Спецификации на разработку",
+            "",
+            f"**Последнее изменение:** {r.randint(1, 28):02d}.{r.randint(1, 12):02d}.2025, 12:00 МСК",
+            "",
+        ]
+        for sec in range(1, r.randint(4, 8) + 1):
+            lines += [f"## {sec}. {sections[sec % len(sections)]}", ""]
+            for sub in range(1, r.randint(2, 4) + 1):
+                lines += [f"### {sec}.{sub}. {self.sentence(3)[:-1]}", ""]
+                for para in range(1, r.randint(2, 5) + 1):
+                    text = self.sentence()
+                    roll = r.random()
+                    if roll < 0.15:
+                        text += f" См. {r.choice(names)}."
+                    elif roll < 0.25:
+                        other = r.choice(names)
+                        num = r.randint(1, 6)
+                        text += f" Подробнее: **{other}** — раздел {num} «{sections[num % len(sections)]}»."
+                    elif roll < 0.32:
+                        text += f" Телеграмма `{r.choice(TELEGRAMS)}`."
+                    elif roll < 0.37:
+                        text += f" Источник: https://github.com/KhudyakovAlex/Synapse/blob/master/PDS/{r.choice(names)}.md"
+                    lines += [f"{sec}.{sub}.{para}. {text}", ""]
+                if r.random() < 0.5:
+                    lines += [f"{self.sentence(6)[:-1]}:"]
+                    for _ in range(r.randint(2, 5)):
+                        lines.append(f"- {self.sentence(6)}")
+                        if r.random() < 0.3:
+                            lines.append(f"  - {self.sentence(4)}")
+                    lines.append("")
+                if r.random() < 0.15:
+                    lines += ["| Поле | Тип | Описание |", "|---|---|---|"]
+                    for _ in range(r.randint(2, 6)):
+                        lines.append(f"| {r.choice(WORDS).upper()} | int | {self.sentence(5)} |")
+                    lines.append("")
+            if r.random() < 0.25:
+                lines += [(MERMAID_ER if r.random() < 0.5 else MERMAID_FLOW).format(n=sec), ""]
+            if r.random() < 0.1:
+                lines += [UXL_BLOCK.format(n=sec), ""]
+        return '\n'.join(lines) + '\n'
+
+    def usml(self) -> str:
+        return (
+            "# Unit System Model Language\n\n"
+            "**Последнее изменение:** 01.01.2025\n\n"
+            "## 4. Формат телеграмм\n\n"
+            "### 4.1. DALI_ — Работа с линией DALI\n\nТелеграммы DALI.\n\n"
+            "### 4.2. CONTR_ — Работа с контроллером\n\nТелеграммы контроллера.\n"
+        )
+
+    def write_corpus(self, root: Path, target_bytes: int) -> dict:
+        """Write PRD/ and PDS/ under root until target_bytes of markdown exist"""
+        for folder in ('PRD', 'PDS', 'INDEX'):
+            (root / folder).mkdir(parents=True, exist_ok=True)
+        sections = [self.sentence(3)[:-1] for _ in range(8)]
+
+        # Rough document count from an average-sized sample, names known up front for cross-links
+        sample = len(self.document('Sample', 0, ['SynapsePDS_USML'], sections).encode('utf-8'))
+        count = max(2, target_bytes // max(sample, 1) + 1)
+        names = ['SynapsePDS_USML'] + [f"SynapsePDS_Gen{i:05d}" for i in range(1, count)]
+
+        total = 0
+        files = 0
+        usml = self.usml()
+        (root / 'PDS' / 'SynapsePDS_USML.md').write_text(usml, encoding='utf-8')
+        total += len(usml.encode('utf-8'))
+        files += 1
+        for i, name in enumerate(names[1:], start=1):
+            if total >= target_bytes:
+                break
+            folder = 'PRD' if i % 25 == 0 else 'PDS'
+            text = self.document(name, i, names, sections)
+            (root / folder / f"{name}.md").write_text(text, encoding='utf-8')
+            total += len(text.encode('utf-8'))
+            files += 1
+            # Some documents get an injected schema
+            if i % 20 == 0:
+                scheme = f"# Схема {name}\n\n{MERMAID_ER.format(n=i)}\n"
+                (root / folder / f"{name}_scheme.md").write_text(scheme, encoding='utf-8')
+                total += len(scheme.encode('utf-8'))
+                files += 1
+        return {'files': files, 'bytes': total}
+
+
+# --- Benchmarks ----------------------------------------------------------------
+
+def run_pipeline(corpus_root: Path, jobs: int = 1) -> dict:
+    """Convert every document of a corpus, timing each convert_file stage"""
+    quiet = io.StringIO()
+    start = time.perf_counter()
+    converter = convert_to_html.MarkdownConverter(str(corpus_root))
+    # Never touch the network from a benchmark
+    converter._uxl_assets_ready = True
+    startup = time.perf_counter() - start
+
+    md_files = converter.find_markdown_files()
+    converter.timer = convert_to_html.StageTimer()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        for md_file in md_files:
+            converter.convert_file(md_file)
+    wall = time.perf_counter() - start
+
+    result = {
+        'files': len(md_files),
+        'startup_s': startup,
+        'wall_s': wall,
+        'per_file_ms': wall / max(len(md_files), 1) * 1000,
+        'stages_s': dict(sorted(converter.timer.totals.items())),
+    }
+
+    if jobs > 1:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            converter.convert_all(force=True, jobs=jobs)
+        result['jobs'] = jobs
+        result['parallel_wall_s'] = time.perf_counter() - start
+    return result
+
+
+def bench_pipeline(repo_root: Path, scales, jobs: int, seed: int, keep: bool):
+    base_bytes = real_corpus_bytes(repo_root)
+    results = []
+    for scale in scales:
+        tmp = Path(tempfile.mkdtemp(prefix=f'synapse_bench_{scale}x_'))
+        try:
+            start = time.perf_counter()
+            corpus = CorpusGenerator(seed).write_corpus(tmp, int(base_bytes * scale))
+            generate = time.perf_counter() - start
+            print(f"{scale}x: {corpus['files']} files, {corpus['bytes'] / 1e6:.1f} MB "
+                  f"(generated in {generate:.1f} s)")
+            sys.stdout.flush()
+
+            result = {'scale': scale, 'bytes': corpus['bytes']}
+            result.update(run_pipeline(tmp, jobs))
+            result['mb_per_s'] = corpus['bytes'] / 1e6 / result['wall_s'] if result['wall_s'] else 0.0
+            results.append(result)
+            print_pipeline_result(result)
+        finally:
+            if keep:
+                print(f"  corpus kept in {tmp}")
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+    return {'base_bytes': base_bytes, 'results': results}
+
+
+def print_pipeline_result(result: dict):
+    print(f"  wall {result['wall_s']:.2f} s, {result['per_file_ms']:.2f} ms/file, "
+          f"{result['mb_per_s']:.2f} MB/s (startup {result['startup_s'] * 1000:.0f} ms)")
+    if 'parallel_wall_s' in result:
+        print(f"  --jobs {result['jobs']}: wall {result['parallel_wall_s']:.2f} s")
+    total = sum(result['stages_s'].values()) or 1.0
+    for stage, seconds in sorted(result['stages_s'].items(), key=lambda kv: -kv[1]):
+        print(f"    {stage:<14} {seconds:8.3f} s  {seconds / total * 100:5.1f}%")
+    sys.stdout.flush()
+
+
+def bench_markdown_setup(repo_root: Path, repeat: int):
+    """
+    Per-file markdown.Markdown setup cost: a new instance per file (old behaviour)
+    vs one instance reset() between files (MarkdownConverter.get_markdown).
+    """
+    if not convert_to_html.MARKDOWN_AVAILABLE:
+        print("[ERROR] markdown library is required for this benchmark")
+        return None
+
+    import markdown
+    extensions = ['extra', 'sane_lists']
+    corpus = load_corpus(repo_root)
+    files = len(corpus) * repeat
+
+    # Setup only
+    start = time.perf_counter()
+    for _ in range(files):
+        markdown.Markdown(extensions=extensions)
+    new_setup = time.perf_counter() - start
+
+    md = markdown.Markdown(extensions=extensions)
+    start = time.perf_counter()
+    for _ in range(files):
+        md.reset()
+    reset_setup = time.perf_counter() - start
+
+    # Setup + convert over the corpus
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            markdown.Markdown(extensions=extensions).convert(text)
+    new_total = time.perf_counter() - start
+
+    md = markdown.Markdown(extensions=extensions)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            md.reset()
+            md.convert(text)
+    reset_total = time.perf_counter() - start
+
+    results = {
+        'files': files,
+        'setup_new_ms': new_setup / files * 1000,
+        'setup_reset_ms': reset_setup / files * 1000,
+        'convert_new_ms': new_total / files * 1000,
+        'convert_reset_ms': reset_total / files * 1000,
+    }
+
+    print(f"markdown.Markdown setup on PDS corpus ({len(corpus)} files x {repeat})")
+    print(f"  per-file setup:   new instance {results['setup_new_ms']:.3f} ms"
+          f"  |  reset() {results['setup_reset_ms']:.3f} ms")
+    print(f"  per-file convert: new instance {results['convert_new_ms']:.3f} ms"
+          f"  |  reset() {results['convert_reset_ms']:.3f} ms")
+    return results
+
+
+# --- Results -------------------------------------------------------------------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        commit = ''
+    try:
+        import markdown
+        markdown_version = markdown.__version__
+    except ImportError:
+        markdown_version = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'markdown': markdown_version,
+        'corpus_version': CORPUS_VERSION,
+    }
+
+
+def write_json(path: str, benchmark: str, params: dict, data):
+    report = {'benchmark': benchmark, 'env': environment(), 'params': params, 'data': data}
+    Path(path).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\nResults saved to: {path}")
+
+
+def compare(before_path: str, after_path: str):
+    """Print after/before ratios for two pipeline JSON reports"""
+    before = json.loads(Path(before_path).read_text(encoding='utf-8'))
+    after = json.loads(Path(after_path).read_text(encoding='utf-8'))
+    if before.get('benchmark') != 'pipeline' or after.get('benchmark') != 'pipeline':
+        print("[ERROR] compare works on 'pipeline' reports")
+        return
+    if before['env'].get('corpus_version') != after['env'].get('corpus_version'):
+        print("[WARN] Reports were made with different corpus generators")
+
+    print(f"before: {before['env'].get('commit')} ({before['env']['timestamp']})")
+    print(f"after:  {after['env'].get('commit')} ({after['env']['timestamp']})")
+    before_by_scale = {r['scale']: r for r in before['data']['results']}
+    for res in after['data']['results']:
+        old = before_by_scale.get(res['scale'])
+        if not old:
+            continue
+        print(f"\n{res['scale']}x ({res['files']} files)")
+        rows = [('wall_s', old['wall_s'], res['wall_s'])]
+        for stage in sorted(set(old['stages_s']) | set(res['stages_s'])):
+            rows.append((stage, old['stages_s'].get(stage, 0.0), res['stages_s'].get(stage, 0.0)))
+        for name, a, b in rows:
+            ratio = f"{b / a:6.2f}x" if a else '    n/a'
+            print(f"  {name:<14} {a:8.3f} s -> {b:8.3f} s  {ratio}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synapse Documentation Benchmarks")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    pipeline = sub.add_parser('pipeline', help="convert synthetic corpora, per-stage timings")
+    pipeline.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                          help="corpus sizes relative to PRD/ + PDS/ (e.g. 10 100 1000)")
+    pipeline.add_argument('--jobs', type=int, default=1, help="also time convert_all with N workers")
+    pipeline.add_argument('--seed', type=int, default=1)
+    pipeline.add_argument('--keep', action='store_true', help="keep generated corpora")
+    pipeline.add_argument('--json', metavar='PATH', help="write results as JSON")
+
+    corpus = sub.add_parser('corpus', help="only generate a synthetic corpus")
+    corpus.add_argument('--scale', type=float, default=10)
+    corpus.add_argument('--seed', type=int, default=1)
+    corpus.add_argument('--out', required=True, help="target directory (gets PRD/, PDS/, INDEX/)")
+
+    cmp_parser = sub.add_parser('compare', help="compare two pipeline JSON reports")
+    cmp_parser.add_argument('before')
+    cmp_parser.add_argument('after')
+
+    setup = sub.add_parser('markdown-setup', help="new markdown.Markdown per file vs reset()")
+    setup.add_argument('--repeat', type=int, default=20, help="passes over the corpus")
+    setup.add_argument('--json', metavar='PATH', help="write results as JSON")
+
+    args = parser.parse_args()
+
+    if args.bench == 'pipeline':
+        data = bench_pipeline(REPO_ROOT, args.scales, args.jobs, args.seed, args.keep)
+        if args.json:
+            params = {'scales': args.scales, 'jobs': args.jobs, 'seed': args.seed}
+            write_json(args.json, 'pipeline', params, data)
+    elif args.bench == 'corpus':
+        target = int(real_corpus_bytes(REPO_ROOT) * args.scale)
+        info = CorpusGenerator(args.seed).write_corpus(Path(args.out), target)
+        print(f"Generated {info['files']} files, {info['bytes'] / 1e6:.1f} MB in {args.out}")
+    elif args.bench == 'compare':
+        compare(args.before, args.after)
+    elif args.bench == 'markdown-setup':
+        data = bench_markdown_setup(REPO_ROOT, args.repeat)
+        if args.json and data:
+            write_json(args.json, 'markdown-setup', {'repeat': args.repeat}, data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Build Cache
+Content hashes and the persistent build manifest used for incremental doc builds
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Cache directory (relative to INDEX/), ignored by git
+CACHE_DIR_NAME = '.cache'
+MANIFEST_NAME = 'build_manifest.json'
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a text string (UTF-8)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's bytes. Missing or unreadable files hash to an empty string."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return ''
+
+
+class BuildManifest:
+    """
+    Persistent record of what every output was built from.
+
+    One entry per source markdown file (key: path relative to repo root):
+        source  - hash of the .md file
+        build   - fingerprint of the converter (templates + code)
+        deps    - {relative path: hash} of extra inputs (e.g. injected *_scheme.md)
+        outputs - relative paths of every file written for this source
+        output_stats - {relative path: {hash, size, mtime_ns}} of those files as written
+    A source is fresh when all hashes still match and every output still exists with
+    the content it was built with (a checkout or hand edit of a generated page
+    rebuilds it). Outputs are only re-hashed when their size or mtime changed.
+    """
+
+    VERSION = 3
+
+    def __init__(self, repo_root: Path, path: Path):
+        self.repo_root = Path(repo_root)
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self._hash_cache: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': self.VERSION, 'entries': self.entries}
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+        tmp.replace(self.path)
+
+    def rel(self, path: Path) -> str:
+        """Manifest key for a path (relative to repo root, forward slashes)"""
+        path = Path(path)
+        try:
+            return path.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def hash_of(self, path: Path) -> str:
+        """File hash, memoized for the lifetime of this manifest (one build run)"""
+        key = self.rel(path)
+        if key not in self._hash_cache:
+            self._hash_cache[key] = file_hash(self.repo_root / key)
+        return self._hash_cache[key]
+
+    def invalidate(self, path: Path):
+        """Forget a memoized hash (file changed during this run)"""
+        self._hash_cache.pop(self.rel(path), None)
+
+    def is_fresh(self, source: Path, build_fingerprint: str) -> bool:
+        entry = self.entries.get(self.rel(source))
+        if not entry:
+            return False
+        if entry.get('build') != build_fingerprint:
+            return False
+        if entry.get('source') != self.hash_of(source):
+            return False
+        for dep, dep_hash in entry.get('deps', {}).items():
+            if self.hash_of(self.repo_root / dep) != dep_hash:
+                return False
+        output_stats = entry.get('output_stats', {})
+        return all(self._output_unchanged(out, output_stats.get(out)) for out in entry.get('outputs', []))
+
+    def _output_unchanged(self, out: str, recorded: Optional[dict]) -> bool:
+        """Output still has the recorded content (stat first, hash only if the stat differs)"""
+        if not recorded:
+            return False
+        path = self.repo_root / out
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        if recorded.get('size') == stat.st_size and recorded.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        if file_hash(path) != recorded.get('hash'):
+            return False
+        # Same bytes, new stat (e.g. a checkout): remember it so the next run skips the hash
+        recorded['size'], recorded['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+        return True
+
+    def _output_stat(self, out: str) -> dict:
+        path = self.repo_root / out
+        try:
+            stat = path.stat()
+        except OSError:
+            return {'hash': '', 'size': -1, 'mtime_ns': 0}
+        return {'hash': file_hash(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def record(self, source: Path, build_fingerprint: str,
+               outputs: Iterable[Path], deps: Iterable[Path] = ()) -> Optional[dict]:
+        """Store the entry for a freshly built source. Returns the previous entry (if any)."""
+        key = self.rel(source)
+        previous = self.entries.get(key)
+        self.invalidate(source)
+        outputs = sorted(self.rel(o) for o in outputs)
+        self.entries[key] = {
+            'source': self.hash_of(source),
+            'build': build_fingerprint,
+            'deps': {self.rel(d): self.hash_of(d) for d in deps},
+            'outputs': outputs,
+            # Not memoized: outputs were just written
+            'output_stats': {out: self._output_stat(out) for out in outputs},
+        }
+        return previous
+
+    def forget(self, source: Path):
+        self.entries.pop(self.rel(source), None)
+
+    def prune(self, sources: Iterable[Path]):
+        """Drop entries for sources that no longer exist"""
+        keep = {self.rel(s) for s in sources}
+        for key in list(self.entries):
+            if key not in keep:
+                del self.entries[key]
+
+
+class OutputWriter:
+    """
+    Compare-before-write for generated files.
+
+    A file is only written when its bytes differ from what is on disk (sizes are
+    compared first, contents only when sizes match), so unchanged outputs keep
+    their mtime. Writes go to a temporary file that replaces the target atomically.
+    Counts changed and unchanged files for the build report.
+    """
+
+    def __init__(self):
+        self.changed = 0
+        self.unchanged = 0
+
+    @staticmethod
+    def _same(path: Path, data: bytes) -> bool:
+        try:
+            if path.stat().st_size != len(data):
+                return False
+            return path.read_bytes() == data
+        except OSError:
+            return False
+
+    @staticmethod
+    def _temp_path(path: Path) -> Path:
+        """
+        Unique temporary file next to path: parallel build workers may write the
+        same target (e.g. the per-directory UXL asset copies)
+        """
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+        os.close(fd)
+        return Path(tmp)
+
+    def write_bytes(self, path: Path, data: bytes) -> bool:
+        """Write data to path unless identical. Returns True if the file changed."""
+        path = Path(path)
+        if self._same(path, data):
+            self.unchanged += 1
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._temp_path(path)
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.changed += 1
+        return True
+
+    def write_text(self, path: Path, text: str, encoding: str = 'utf-8') -> bool:
+        """Same as write_bytes; newlines are translated like open(path, 'w') does"""
+        if os.linesep != '\n':
+            text = text.replace('\n', os.linesep)
+        return self.write_bytes(path, text.encode(encoding))
+
+    def copy(self, src: Path, dst: Path) -> bool:
+        """Copy src to dst unless dst already has the same bytes"""
+        return self.write_bytes(dst, Path(src).read_bytes())
+
+    def link(self, src: Path, dst: Path) -> bool:
+        """
+        Make dst a hardlink to src (one copy on disk), or a plain copy where
+        hardlinks are not supported. Returns True if dst's content changed;
+        an identical separate copy is still replaced by a link, but counts as unchanged.
+        """
+        src, dst = Path(src), Path(dst)
+        try:
+            if os.path.samefile(src, dst):
+                self.unchanged += 1
+                return False
+        except OSError:
+            pass
+        data = src.read_bytes()
+        same = self._same(dst, data)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._temp_path(dst)
+        try:
+            tmp.unlink()
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+        except OSError:
+            if same:
+                self.unchanged += 1
+                return False
+            return self.write_bytes(dst, data)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        if same:
+            self.unchanged += 1
+            return False
+        self.changed += 1
+        return True
@@ -5,13 +5,23 @@ Synapse Documentation Converter
 Converts Markdown files to HTML with unified styling
 """
 
+import contextlib
+import io
 import os
 import re
-import shutil
-import urllib.request
-import urllib.error
+import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
+
+from asset_fetch import FAILED, FETCH_META_NAME, UPDATED, AssetFetcher
+from asset_pipeline import AssetFingerprints, restore as restore_asset_names
+from build_cache import CACHE_DIR_NAME, MANIFEST_NAME, BuildManifest, OutputWriter, text_hash
+from doc_graph import GRAPH_NAME, DocumentGraph
+from doc_registry import REGISTRY_NAME, USML_DOC, DocumentRegistry, heading_id
+from icon_sprites import IconSprites
+from index_page import IndexPage
+from mermaid_render import PRERENDERED_ATTR, MermaidRenderer
+from optimize_images import ICONS_OUT_ROOT, ImageOptimizer, ImageVariants
 
 # Try to import markdown library
 try:
@@ -22,6 +32,9 @@ except ImportError:
     print("Warning: markdown library not found. Install with: pip install markdown")
     print("Falling back to simple converter...")
 
+# Where the UXL engine (uxl.css, uxl.js, UXL.md) is downloaded from
+UXL_BASE_URL = "https://raw.githubusercontent.com/KhudyakovAlex/UXL/main"
+
 # HTML Template for Mermaid Diagram Page
 DIAGRAM_TEMPLATE = """<!DOCTYPE html>
 <html lang="ru">
@@ -96,15 +109,7 @@ DIAGRAM_TEMPLATE = """<!DOCTYPE html>
             height: auto !important;
         }}
         
-    </style>
-    <script type="module">
-        import mermaid from 'https://cdn.jsdelivr.net/npm/mermaid@11/dist/mermaid.esm.min.mjs';
-        mermaid.initialize({{ 
-            startOnLoad: true,
-            theme: "default",
-            securityLevel: "loose"
-        }});
-    </script>
+    </style>{mermaid_js}
     <script>
         // Zoom with mouse wheel
         let currentScale = 1;
@@ -202,7 +207,7 @@ DIAGRAM_TEMPLATE = """<!DOCTYPE html>
 </head>
 <body>
     <div class="diagram-container">
-        <div class="mermaid">
+        <div class="mermaid"{diagram_attrs}>
 {diagram_code}
         </div>
     </div>
@@ -221,18 +226,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="{css_path}assets/css/style.css">{uxl_css}
-    <script>
-        window.mermaid = {{
-            startOnLoad: true,
-            theme: "default",
-            securityLevel: "loose"
-        }};
-    </script>
-    <script type="module">
-        import mermaid from 'https://cdn.jsdelivr.net/npm/mermaid@11/dist/mermaid.esm.min.mjs';
-        mermaid.initialize({{ startOnLoad: true }});
-    </script>
+    <link rel="stylesheet" href="{css_path}assets/css/style.css">{uxl_css}{mermaid_js}
 </head>
 <body>
     <!-- Logo Bar -->
@@ -277,54 +271,288 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 """
 
 
+# Mermaid on a diagram page (not needed when the diagram was pre-rendered to SVG)
+DIAGRAM_MERMAID_SCRIPT = """
+    <script type="module">
+        import mermaid from 'https://cdn.jsdelivr.net/npm/mermaid@11/dist/mermaid.esm.min.mjs';
+        mermaid.initialize({ 
+            startOnLoad: true,
+            theme: "default",
+            securityLevel: "loose"
+        });
+    </script>"""
+
+# Pages with diagrams only: Mermaid is imported on demand and every diagram is rendered
+# when it comes near the viewport (all pending ones before printing)
+MERMAID_LAZY_SCRIPT = """
+    <script type="module">
+        const pending = new Set(document.querySelectorAll('.mermaid:not([data-processed])'));
+        let loading = null;
+        const loadMermaid = () => loading ??= import('https://cdn.jsdelivr.net/npm/mermaid@11/dist/mermaid.esm.min.mjs')
+            .then(({ default: mermaid }) => {
+                mermaid.initialize({ startOnLoad: false });
+                return mermaid;
+            });
+        const render = (nodes) => {
+            nodes = nodes.filter((node) => pending.delete(node));
+            if (nodes.length) loadMermaid().then((mermaid) => mermaid.run({ nodes }));
+        };
+        if ('IntersectionObserver' in window) {
+            const observer = new IntersectionObserver((entries) => {
+                const visible = entries.filter((entry) => entry.isIntersecting).map((entry) => entry.target);
+                visible.forEach((node) => observer.unobserve(node));
+                render(visible);
+            }, { rootMargin: '300px 0px' });
+            pending.forEach((node) => observer.observe(node));
+        } else {
+            render([...pending]);
+        }
+        window.addEventListener('beforeprint', () => render([...pending]));
+    </script>"""
+
+
+# Files under INDEX/assets referenced by generated pages (templates + UXL assets)
+TEMPLATE_ASSETS = sorted(set(re.findall(r'assets/([\w./-]+\.\w+)', HTML_TEMPLATE + DIAGRAM_TEMPLATE))
+                         | {'css/uxl.css', 'js/uxl.js'})
+
+# Regex patterns used while converting a page: name -> (pattern, flags).
+# Compiled once per MarkdownConverter (self.patterns), never per page.
+PATTERNS = {
+    # Markdown source
+    'md_uxl_fence': (r'```uxl\b', re.IGNORECASE),
+    'md_mermaid_block': (r'(```mermaid.*?```)', re.DOTALL),
+    'md_last_modified': (r'(\*\*Последнее изменение:\*\*[^\n]*\n)', 0),
+    'md_title': (r'^#\s+(.+)$', re.MULTILINE),
+    'md_list_item': (r'^\s*- ', 0),
+    'md_ordered_item': (r'^\s*\d+\.\s+', 0),
+    # Rendered HTML
+    'line_break': (r'  \n', 0),
+    'list_paragraph': (r'<p>((?:[^<]|<(?!\/p>))*- .+?)</p>', re.MULTILINE | re.DOTALL),
+    'list_line': (r'^(\s*)- (.+)$', 0),
+    'heading_h23': (r'<(h[23])>(.+?)</\1>', 0),
+    'url': (r'(?<!["\'>])(https?://[^\s<>\"\'\)]+)', 0),
+    'section_link': (r'(?:\*\*|<strong>)([A-Za-z0-9_]+)(?:\*\*|</strong>)\s*—\s*раздел\s+([\d.]+)\s+«([^»]+)»', 0),
+    'anchor_spaces': (r'\s+', 0),
+    'anchor_strip': (r'[^\w\-а-яё]', re.UNICODE),
+    'telegram': (r'<code>(\[(FW|USM)\.[A-Z_]+\([^)]*\)\])</code>', 0),
+    'uxl_code_block': (r'<pre><code class="language-uxl">(.*?)</code></pre>', re.DOTALL | re.IGNORECASE),
+    'mermaid_code_block': (r'<pre><code class="language-mermaid">(.*?)</code></pre>', re.DOTALL),
+    # Diagram div still to be rendered in the browser
+    'mermaid_pending': (r'<div class="mermaid"(?![^>]*data-processed)', 0),
+    'uxl_pre': (r'<pre class="uxl-md-block">(.*?)</pre>', re.DOTALL),
+    'uxl_src_win_quoted': (r'SRC:&quot;[A-Za-z]:\\.*?\\INDEX\\assets\\([^&]+?)&quot;', re.IGNORECASE),
+    'uxl_src_win_unquoted': (r'SRC:[A-Za-z]:\\.*?\\INDEX\\assets\\([^\s\\]+(?:\\[^\s\\]+)*)', re.IGNORECASE),
+    'icon_line': (r'<p>(\d{3}_[a-zA-Z0-9_]+\.svg)(.*?)</p>', re.DOTALL),
+    'h1': (r'<h1>(.*?)</h1>', re.DOTALL),
+}
+
+# Tokens of the fused HTML post-processor (MarkdownConverter.postprocess_html), in priority
+# order: at a given position the first alternative wins. Group names must be unique.
+# Each token kind has a handler `_on_<kind>`; INLINE_TOKENS are also applied inside
+# block tokens (heading, h1, icon line bodies).
+POSTPROCESS_TOKENS = [
+    ('uxl', r'(?is:<pre><code class="language-uxl">(?P<uxl_code>.*?)</code></pre>)'),
+    ('mermaid', r'(?s:<pre><code class="language-mermaid">(?P<mermaid_code>.*?)</code></pre>)'),
+    ('h1', r'(?s:<h1>(?P<h1_body>.*?)</h1>)'),
+    ('heading', r'<(?P<heading_tag>h[23])>(?P<heading_body>.+?)</(?P=heading_tag)>'),
+    ('icon', r'(?s:<p>(?P<icon_svg>\d{3}_[a-zA-Z0-9_]+\.svg)(?P<icon_rest>.*?)</p>)'),
+    # Existing links are passed through untouched
+    ('link', r'(?s:<a[^>]+>.*?</a>)'),
+    ('telegram', r'<code>(?P<telegram_code>\[(?:FW|USM)\.[A-Z_]+\([^)]*\)\])</code>'),
+    ('url', r'(?<!["\'>])(?P<url_href>https?://[^\s<>\"\'\)]+)'),
+    ('section', r'(?:\*\*|<strong>)(?P<section_doc>[A-Za-z0-9_]+)(?:\*\*|</strong>)\s*—\s*раздел\s+(?P<section_num>[\d.]+)\s+«(?P<section_title>[^»]+)»'),
+    # 'doc' (document names) is appended per converter, see _build_doc_link_pattern
+]
+INLINE_TOKENS = ('link', 'telegram', 'url', 'section', 'doc')
+
+
+def build_fingerprint() -> str:
+    """
+    Fingerprint of everything besides the sources that shapes the output:
+    page templates and the converter code itself. Any change forces a full rebuild.
+    """
+    parts = [HTML_TEMPLATE, DIAGRAM_TEMPLATE]
+    for script in ('convert_to_html.py', 'build_cache.py', 'doc_registry.py', 'asset_pipeline.py',
+                   'optimize_images.py', 'icon_sprites.py', 'mermaid_render.py'):
+        try:
+            parts.append((Path(__file__).parent / script).read_text(encoding='utf-8'))
+        except OSError:
+            pass
+    return text_hash('\0'.join(parts))
+
+
+class StageTimer:
+    """
+    Wall time per named stage of convert_file, per file and summed over all files.
+
+    lap(stage) charges the time since the previous lap to `stage`; nested(stage)
+    times a sub-step (e.g. a diagram page write) and excludes it from the enclosing
+    lap or nested stage, so stage times never overlap and add up to the total.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.per_file = {}
+        self.files = 0
+        self._current = {}
+        self._last = time.perf_counter()
+        self._nested = 0.0
+        self._stack = []
+
+    def add(self, stage: str, seconds: float):
+        """Charge time to a stage outside of any file (e.g. index.html updates)"""
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def _charge(self, stage: str, seconds: float):
+        self.add(stage, seconds)
+        self._current[stage] = self._current.get(stage, 0.0) + seconds
+
+    def start(self, name: str = None):
+        self.files += 1
+        self._current = {}
+        if name is not None:
+            self.per_file[name] = self._current
+        self._last = time.perf_counter()
+        self._nested = 0.0
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self._charge(stage, now - self._last - self._nested)
+        self._last = now
+        self._nested = 0.0
+
+    @contextlib.contextmanager
+    def nested(self, stage: str):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._charge(stage, elapsed - self._stack.pop())
+            if self._stack:
+                self._stack[-1] += elapsed
+            else:
+                self._nested += elapsed
+
+    def print_report(self, top: int = 10):
+        """Aggregate stage table plus the slowest files with their own breakdown"""
+        import sys
+        total = sum(self.totals.values())
+        print("\n" + "="*60)
+        print(f"Profile: {self.files} file(s), {total:.3f} s total")
+        print("="*60)
+        for stage, seconds in sorted(self.totals.items(), key=lambda kv: -kv[1]):
+            share = seconds / total * 100 if total else 0.0
+            print(f"  {stage:<24} {seconds:8.3f} s  {share:5.1f}%")
+
+        slowest = sorted(self.per_file.items(), key=lambda kv: -sum(kv[1].values()))[:top]
+        if slowest:
+            print(f"\nSlowest {len(slowest)} file(s):")
+        for name, stages in slowest:
+            print(f"  {sum(stages.values()) * 1000:8.1f} ms  {name}")
+            main = sorted(stages.items(), key=lambda kv: -kv[1])[:4]
+            print("             " + ", ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in main))
+        sys.stdout.flush()
+
+
+class _NoTimer:
+    """Stand-in for StageTimer when timing is off"""
+
+    def start(self, name: str = None):
+        pass
+
+    def lap(self, stage: str):
+        pass
+
+    def nested(self, stage: str):
+        return contextlib.nullcontext()
+
+
+_NO_TIMER = _NoTimer()
+
+
 class MarkdownConverter:
-    def __init__(self, repo_root: str):
+    def __init__(self, repo_root: str, uxl_base_url: str = None, uxl_ttl: float = 0,
+                 offline: bool = False, fingerprint_assets: bool = False, optimize_images: bool = False,
+                 icon_sprites: bool = False, prerender_diagrams: bool = False, image_variants=()):
         self.repo_root = Path(repo_root)
         self.index_root = Path(repo_root) / "INDEX"
+        self.cache_dir = self.index_root / CACHE_DIR_NAME
+        self._code_fingerprint = build_fingerprint()
+        # Every generated file goes through this (skips identical rewrites)
+        self.writer = OutputWriter()
+        # Optional content-addressed asset names (assets/css/style.<hash>.css)
+        self.fingerprint_assets = fingerprint_assets
+        # (pages must be rebuilt when an asset they reference changes, see _apply_registry)
+        self.assets = AssetFingerprints(self.index_root / 'assets', self.writer) if fingerprint_assets else None
+        # Icon pages reference the minified copies from optimize_images.py
+        self.optimize_images = optimize_images
+        if optimize_images:
+            self._code_fingerprint = text_hash(self._code_fingerprint + 'optimized-icons')
+        # srcset for the PNG size variants from optimize_images.py (those that exist on disk)
+        self.image_variants = tuple(image_variants)
+        self.images = ImageVariants(self.index_root / 'assets', image_variants) if image_variants else None
+        if self.images:
+            self._code_fingerprint = text_hash(self._code_fingerprint + self.images.signature(TEMPLATE_ASSETS))
+        # Icon pages embed one sprite per icon folder and draw icons with <use>
+        self.sprites = IconSprites(self.repo_root) if icon_sprites else None
+        if icon_sprites:
+            self._code_fingerprint = text_hash(self._code_fingerprint + 'icon-sprites')
+        # Optional static SVG diagrams (mmdc); the renderer's identity is part of the fingerprint,
+        # so installing or upgrading mmdc re-renders the pages
+        self.mermaid = MermaidRenderer(self.cache_dir) if prerender_diagrams else None
+        if self.mermaid:
+            self._code_fingerprint = text_hash(self._code_fingerprint + 'prerender:' + self.mermaid.signature())
+        # All documents in PRD/ and PDS/, shared by every link pass
+        self.registry = DocumentRegistry(self.repo_root, self.cache_dir / REGISTRY_NAME)
+        self.patterns = {name: re.compile(pattern, flags) for name, (pattern, flags) in PATTERNS.items()}
+        self._apply_registry()
+        # markdown.Markdown instance reused for every page (see get_markdown)
+        self._md = None
+        # Optional StageTimer: per-stage timings of convert_file
+        self.timer = None
         # UXL integration: follow Project/uxl_md_to_html.md (Variant A: local assets in INDEX/assets)
         self._uxl_assets_ready = False
+        # IMPORTANT: download from GitHub repository, then serve locally from INDEX/assets/...
+        # The base URL can be overridden (e.g. a local HTTP server) via uxl_base_url / SYNAPSE_UXL_BASE_URL
+        uxl_base_url = (uxl_base_url or os.environ.get('SYNAPSE_UXL_BASE_URL') or UXL_BASE_URL).rstrip('/')
         self._uxl_assets = {
-            # IMPORTANT: download from GitHub repository, then serve locally from INDEX/assets/...
-            "css_url": "https://raw.githubusercontent.com/KhudyakovAlex/UXL/main/uxl.css",
-            "js_url": "https://raw.githubusercontent.com/KhudyakovAlex/UXL/main/uxl.js",
-            "md_url": "https://raw.githubusercontent.com/KhudyakovAlex/UXL/main/UXL.md",
+            "css_url": f"{uxl_base_url}/uxl.css",
+            "js_url": f"{uxl_base_url}/uxl.js",
+            "md_url": f"{uxl_base_url}/UXL.md",
             "css_path": self.index_root / "assets" / "css" / "uxl.css",
             "js_path": self.index_root / "assets" / "js" / "uxl.js",
             "md_path": self.repo_root / "Project" / "UXL.md",
         }
-
-    def _download_if_changed(self, url: str, dst: Path) -> bool:
-        """Download URL into dst only if content differs. Returns True if file updated."""
-        req = urllib.request.Request(
-            url,
-            headers={
-                "User-Agent": "SynapseDocConverter/1.0 (+https://github.com/KhudyakovAlex/Synapse)",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            },
+        # Conditional, concurrent fetch; offline (or SYNAPSE_OFFLINE=1) never touches the network
+        self.uxl_fetcher = AssetFetcher(
+            self.cache_dir / FETCH_META_NAME,
+            ttl=uxl_ttl,
+            offline=offline or os.environ.get('SYNAPSE_OFFLINE') == '1',
+            repo_root=self.repo_root,
         )
 
-        try:
-            with urllib.request.urlopen(req, timeout=20) as resp:
-                data = resp.read()
-        except Exception:
-            return False
-
-        try:
-            if dst.exists():
-                old = dst.read_bytes()
-                if old == data:
-                    return False
-        except Exception:
-            # If read fails, we'll try to overwrite below.
-            pass
+    def _apply_registry(self):
+        """(Re)derive everything that depends on the set of documents (and the asset fingerprints)"""
+        # Adding/removing/renaming a document changes links on other pages
+        asset_signature = self.assets.signature(TEMPLATE_ASSETS) if self.assets else ''
+        self.build_fingerprint = text_hash(self._code_fingerprint + asset_signature + self.registry.link_signature())
+        # Documents that plain-text references are linked to (name -> path relative to INDEX/)
+        self.known_files = self.registry.link_targets()
+        self.patterns['doc_link'] = self._build_doc_link_pattern(self.known_files)
+        self.patterns['postprocess'] = self._build_postprocess_pattern(INLINE_TOKENS + ('uxl', 'mermaid', 'h1', 'heading'))
+        self.patterns['postprocess_icons'] = self._build_postprocess_pattern(INLINE_TOKENS + ('uxl', 'mermaid', 'h1', 'heading', 'icon'))
+        self.patterns['postprocess_inline'] = self._build_postprocess_pattern(INLINE_TOKENS)
 
-        try:
-            dst.parent.mkdir(parents=True, exist_ok=True)
-            dst.write_bytes(data)
-            return True
-        except Exception:
+    def refresh_registry(self) -> bool:
+        """Rescan PRD/ and PDS/ (watch mode). Returns True if links on other pages change."""
+        signature = self.registry.link_signature()
+        self.registry.scan()
+        if self.registry.link_signature() == signature:
             return False
+        self._apply_registry()
+        return True
 
     def ensure_uxl_local_assets(self):
         """
@@ -338,10 +566,20 @@ class MarkdownConverter:
         js_path: Path = self._uxl_assets["js_path"]
         md_path: Path = self._uxl_assets["md_path"]
 
-        updated_css = self._download_if_changed(self._uxl_assets["css_url"], css_path)
-        updated_js = self._download_if_changed(self._uxl_assets["js_url"], js_path)
-        updated_md = self._download_if_changed(self._uxl_assets["md_url"], md_path)
+        results = self.uxl_fetcher.fetch([
+            (self._uxl_assets["css_url"], css_path),
+            (self._uxl_assets["js_url"], js_path),
+            (self._uxl_assets["md_url"], md_path),
+        ])
+        updated_css, updated_js, updated_md = (result == UPDATED for result in results)
 
+        if updated_css or updated_js:
+            # The fetch replaced the files, so existing hardlinks still hold the old engine
+            self._relink_uxl_copies()
+            if self.assets:
+                self.assets.invalidate()
+                self._apply_registry()
+        
         if updated_css or updated_js or updated_md:
             msgs = []
             if updated_css or updated_js:
@@ -350,12 +588,27 @@ class MarkdownConverter:
                 msgs.append("Project/UXL.md")
             print(f"  [OK] Updated local UXL assets: {', '.join(msgs)}")
         elif css_path.exists() and js_path.exists():
-            print("  [-] Local UXL assets already present")
+            if FAILED in results:
+                print("  [WARN] Failed to check UXL assets for updates, using local copies")
+            else:
+                print("  [-] Local UXL assets already present")
+        elif self.uxl_fetcher.offline:
+            print("  [WARN] Offline mode and no local UXL assets (UXL rendering may not work)")
         else:
             print("  [WARN] Failed to download UXL assets (UXL rendering may not work)")
 
         self._uxl_assets_ready = True
 
+    def _relink_uxl_copies(self):
+        """Point the per-directory uxl.css / uxl.js copies at the freshly fetched files"""
+        for key, name in (("css_path", "uxl.css"), ("js_path", "uxl.js")):
+            src: Path = self._uxl_assets[key]
+            if not src.exists():
+                continue
+            for copy in self.index_root.rglob(name):
+                if copy != src:
+                    self.writer.link(src, copy)
+
     def ensure_uxl_assets_next_to_doc(self, target_dir: Path):
         """
         Ensure `uxl.js` and `uxl.css` exist next to a generated HTML document.
@@ -373,9 +626,9 @@ class MarkdownConverter:
             src_js: Path = self._uxl_assets["js_path"]
 
             if src_css.exists():
-                shutil.copyfile(src_css, target_dir / "uxl.css")
+                self.writer.link(src_css, target_dir / "uxl.css")
             if src_js.exists():
-                shutil.copyfile(src_js, target_dir / "uxl.js")
+                self.writer.link(src_js, target_dir / "uxl.js")
         except Exception as e:
             print(f"  [WARN] Failed to copy uxl assets into {target_dir}: {e}")
 
@@ -391,42 +644,32 @@ class MarkdownConverter:
             return html
 
         def repl(match):
-            inner = match.group(1)
-            inner = inner.replace("SRC:assets/", f"SRC:{assets_prefix}assets/")
-            inner = inner.replace("SRC:./assets/", f"SRC:{assets_prefix}assets/")
-
-            # Also normalize Windows absolute paths pointing into this repo's INDEX/assets.
-            # Example (HTML-escaped quotes): SRC:&quot;D:\Git\Synapse\INDEX\assets\img\splash_logo.png&quot;
-            def _win_abs_to_rel(m):
-                rel = m.group(1).replace("\\", "/")
-                return f'SRC:&quot;{assets_prefix}assets/{rel}&quot;'
-
-            inner = re.sub(
-                r'SRC:&quot;[A-Za-z]:\\.*?\\INDEX\\assets\\([^&]+?)&quot;',
-                _win_abs_to_rel,
-                inner,
-                flags=re.IGNORECASE
-            )
+            return f'<pre class="uxl-md-block">{self._rewrite_uxl_sources(match.group(1), assets_prefix)}</pre>'
 
-            # Unquoted variant: SRC:D:\...\INDEX\assets\...
-            def _win_abs_to_rel_unquoted(m):
-                rel = m.group(1).replace("\\", "/")
-                return f"SRC:{assets_prefix}assets/{rel}"
+        return self.patterns['uxl_pre'].sub(repl, html)
 
-            inner = re.sub(
-                r'SRC:[A-Za-z]:\\.*?\\INDEX\\assets\\([^\s\\]+(?:\\[^\s\\]+)*)',
-                _win_abs_to_rel_unquoted,
-                inner,
-                flags=re.IGNORECASE
-            )
-            return f'<pre class="uxl-md-block">{inner}</pre>'
+    def _rewrite_uxl_sources(self, inner: str, assets_prefix: str) -> str:
+        """SRC:assets/... -> SRC:{assets_prefix}assets/... inside one UXL block"""
+        if not assets_prefix:
+            return inner
 
-        return re.sub(
-            r'<pre class="uxl-md-block">(.*?)</pre>',
-            repl,
-            html,
-            flags=re.DOTALL
-        )
+        inner = inner.replace("SRC:assets/", f"SRC:{assets_prefix}assets/")
+        inner = inner.replace("SRC:./assets/", f"SRC:{assets_prefix}assets/")
+
+        # Also normalize Windows absolute paths pointing into this repo's INDEX/assets.
+        # Example (HTML-escaped quotes): SRC:&quot;D:\Git\Synapse\INDEX\assets\img\splash_logo.png&quot;
+        def _win_abs_to_rel(m):
+            rel = m.group(1).replace("\\", "/")
+            return f'SRC:&quot;{assets_prefix}assets/{rel}&quot;'
+
+        inner = self.patterns['uxl_src_win_quoted'].sub(_win_abs_to_rel, inner)
+
+        # Unquoted variant: SRC:D:\...\INDEX\assets\...
+        def _win_abs_to_rel_unquoted(m):
+            rel = m.group(1).replace("\\", "/")
+            return f"SRC:{assets_prefix}assets/{rel}"
+
+        return self.patterns['uxl_src_win_unquoted'].sub(_win_abs_to_rel_unquoted, inner)
         
     def convert_heading(self, text: str) -> str:
         """Convert markdown headings to HTML"""
@@ -459,58 +702,51 @@ class MarkdownConverter:
     def convert_urls(self, text: str) -> str:
         """Convert plain URLs to clickable links with truncated display text"""
         # Match URLs that are not already inside href="..." or <a> tags
-        # Pattern: http:// or https:// followed by non-whitespace characters
-        url_pattern = r'(?<!["\'>])(https?://[^\s<>\"\'\)]+)'
-        
-        def truncate_url(match):
-            url = match.group(1)
-            # If URL is longer than 30 characters, truncate display text
-            if len(url) > 30:
-                display_text = url[:15] + " ... " + url[-15:]
-            else:
-                display_text = url
-            return f'<a href="{url}" target="_blank">{display_text}</a>'
-        
-        text = re.sub(url_pattern, truncate_url, text)
+        # Pattern: http:// or https:// followed by non-whitespace characters (patterns['url'])
+        text = self.patterns['url'].sub(lambda m: self._url_link(m.group(1)), text)
         return text
     
+    @staticmethod
+    def _url_link(url: str) -> str:
+        # If URL is longer than 30 characters, truncate display text
+        if len(url) > 30:
+            display_text = url[:15] + " ... " + url[-15:]
+        else:
+            display_text = url
+        return f'<a href="{url}" target="_blank">{display_text}</a>'
+    
     def add_heading_ids(self, html_content: str) -> str:
         """Add id attributes to h2 and h3 headings for anchor links"""
-        import unicodedata
-        
-        def generate_id(text):
-            """Generate a URL-friendly id from heading text"""
-            # Remove HTML tags
-            text = re.sub(r'<[^>]+>', '', text)
-            # Convert to lowercase
-            text = text.lower()
-            # Replace spaces and special chars with hyphens
-            text = re.sub(r'[^\w\s-]', '', text)
-            text = re.sub(r'[\s_]+', '-', text)
-            # Remove leading/trailing hyphens
-            text = text.strip('-')
-            return text
-        
         def add_id_to_heading(match):
             tag = match.group(1)  # h2 or h3
             content = match.group(2)
-            heading_id = generate_id(content)
-            return f'<{tag} id="{heading_id}">{content}</{tag}>'
+            return f'<{tag} id="{heading_id(content)}">{content}</{tag}>'
         
         # Add id to h2 and h3 headings
-        html_content = re.sub(r'<(h[23])>(.+?)</\1>', add_id_to_heading, html_content)
+        html_content = self.patterns['heading_h23'].sub(add_id_to_heading, html_content)
         
         return html_content
     
     def convert_telegram_links(self, text: str, current_file: Path) -> str:
         """Convert telegram codes like [FW.CONTR_GET()] to links to USML documentation"""
-        # Map telegram prefixes to anchor IDs in USML
-        # Format: prefix -> (anchor_id, section_title)
-        # IDs are generated by add_heading_ids() from heading text
-        telegram_sections = {
-            'DALI_': ('41-dali-работа-с-линией-dali', '4.1. DALI_'),
-            'CONTR_': ('42-contr-работа-с-контроллером', '4.2. CONTR_'),
-        }
+        usml_path = self._telegram_usml_path(current_file)
+        if not usml_path:
+            return text
+        
+        def replace_telegram(match):
+            # e.g., <code>[FW.CONTR_GET()]</code> -> [FW.CONTR_GET()]
+            return self._telegram_link(match.group(1), usml_path) or match.group(0)
+        
+        # Match telegram codes in <code> tags: <code>[FW.XXX_YYY(...)]</code> or <code>[USM.XXX_YYY(...)]</code>
+        text = self.patterns['telegram'].sub(replace_telegram, text)
+        
+        return text
+    
+    def _telegram_usml_path(self, current_file: Path):
+        """Relative path to USML from current file, or None if telegram codes are not linked here"""
+        # Skip if we're in USML itself or USML has no telegram sections
+        if current_file.stem == USML_DOC or not self.registry.telegram_sections():
+            return None
         
         # Determine relative path to USML from current file
         try:
@@ -520,72 +756,51 @@ class MarkdownConverter:
         except ValueError:
             prefix = ''
         
-        usml_path = prefix + 'PDS/SynapsePDS_USML.html'
-        
-        # Skip if we're in USML itself
-        if current_file.name == 'SynapsePDS_USML.html':
-            return text
-        
-        def replace_telegram(match):
-            full_code = match.group(0)  # e.g., <code>[FW.CONTR_GET()]</code>
-            telegram = match.group(1)    # e.g., [FW.CONTR_GET()]
-            
-            # Find matching section
-            for prefix_key, (anchor, section_title) in telegram_sections.items():
-                if prefix_key in telegram:
-                    # Create link to USML with anchor
-                    link = f'<a href="{usml_path}#{anchor}" title="См. {section_title} в USML"><code>{telegram}</code></a>'
-                    return link
-            
-            # No match found, return original
-            return full_code
-        
-        # Match telegram codes in <code> tags: <code>[FW.XXX_YYY(...)]</code> or <code>[USM.XXX_YYY(...)]</code>
-        text = re.sub(
-            r'<code>(\[(FW|USM)\.[A-Z_]+\([^)]*\)\])</code>',
-            replace_telegram,
-            text
+        return prefix + self.registry.html_path(USML_DOC)
+    
+    def _telegram_link(self, telegram: str, usml_path: str):
+        """Link for one telegram code, or None if it matches no USML section"""
+        # Map telegram prefixes to anchor IDs in USML
+        # Format: prefix -> (anchor_id, section_title), discovered from USML headings like "4.1. DALI_ ..."
+        for prefix_key, (anchor, section_title) in self.registry.telegram_sections().items():
+            if prefix_key in telegram:
+                # Create link to USML with anchor
+                return f'<a href="{usml_path}#{anchor}" title="См. {section_title} в USML"><code>{telegram}</code></a>'
+        
+        # No match found
+        return None
+    
+    @staticmethod
+    def _doc_name_pattern(names, group: str) -> str:
+        """
+        Alternation of document names, sorted by length descending so longer names win
+        (e.g. SynapsePDS_FW_DB before SynapsePDS_FW). A name only matches when it is
+        not part of a longer word/filename. Without names the group never matches
+        (an empty alternation would match the empty string everywhere).
+        """
+        alternation = '|'.join(re.escape(n) for n in sorted(names, key=len, reverse=True)) or '(?!)'
+        return r'(?<!["\'/a-zA-Z0-9_])(?P<' + group + '>' + alternation + r')(?!["\'/a-zA-Z0-9_])'
+    
+    @classmethod
+    def _build_doc_link_pattern(cls, names) -> re.Pattern:
+        """
+        One regex that finds every document reference in a single pass.
+
+        Existing <a>...</a> tags are matched first as a whole and passed through,
+        so their text is never relinked.
+        """
+        return re.compile(
+            r'<a[^>]+>.*?</a>|' + cls._doc_name_pattern(names, 'name'),
+            re.DOTALL
         )
-        
-        return text
+    
+    def _build_postprocess_pattern(self, kinds) -> re.Pattern:
+        """Alternation of the given POSTPROCESS_TOKENS kinds (plus document names), in table order"""
+        tokens = POSTPROCESS_TOKENS + [('doc', self._doc_name_pattern(self.known_files, 'doc_name'))]
+        return re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in tokens if kind in kinds))
     
     def convert_md_file_links(self, text: str, current_file: Path) -> str:
         """Convert references to .md files in the repository to clickable links to HTML pages"""
-        # List of known files in the repository (with and without .md extension)
-        known_files = {
-            # PRD
-            'SynapsePRD': 'PRD/SynapsePRD.html',
-            'Идеи': 'PRD/Идеи.html',
-            # PDS
-            'SynapsePDS_APP': 'PDS/SynapsePDS_APP.html',
-            'SynapsePDS_APP_Bluetooth': 'PDS/SynapsePDS_APP_Bluetooth.html',
-            'SynapsePDS_APP_UI': 'PDS/SynapsePDS_APP_UI.html',
-            'SynapsePDS_APP_UX': 'PDS/SynapsePDS_APP_UX.html',
-            'SynapsePDS_Bluetooth': 'PDS/SynapsePDS_Bluetooth.html',
-            'SynapsePDS_APP_DB': 'PDS/SynapsePDS_APP_DB.html',
-            'SynapsePDS_DB_scheme': 'PDS/SynapsePDS_DB_scheme.html',
-            'SynapsePDS_APP_DB_scheme': 'PDS/SynapsePDS_APP_DB_scheme.html',
-            'SynapsePDS_FW_DB_scheme': 'PDS/SynapsePDS_FW_DB_scheme.html',
-            'SynapsePDS_FW_Logic_Phone': 'PDS/SynapsePDS_FW_Logic_Phone.html',
-            'SynapsePDS_FW_Logic_PNR': 'PDS/SynapsePDS_FW_Logic_PNR.html',
-            'SynapsePDS_FW_Logic_Settings': 'PDS/SynapsePDS_FW_Logic_Settings.html',
-            'SynapsePDS_FW_Logic_Control': 'PDS/SynapsePDS_FW_Logic_Control.html',
-            'SynapsePDS_FW_Logic_Buttons': 'PDS/SynapsePDS_FW_Logic_Buttons.html',
-            'SynapsePDS_FW_Logic_Sensors': 'PDS/SynapsePDS_FW_Logic_Sensors.html',
-            'SynapsePDS_FW_Logic_Schedule': 'PDS/SynapsePDS_FW_Logic_Schedule.html',
-            'SynapsePDS_FW_Logic_Case': 'PDS/SynapsePDS_FW_Logic_Case.html',
-            'SynapsePDS_FW': 'PDS/SynapsePDS_FW.html',
-            'SynapsePDS_FW_DB': 'PDS/SynapsePDS_FW_DB.html',
-            'SynapsePDS_FW_Bluetooth': 'PDS/SynapsePDS_FW_Bluetooth.html',
-            'SynapsePDS_FW_Logic': 'PDS/SynapsePDS_FW_Logic.html',
-            'SynapsePDS_Icons_Controllers': 'PDS/SynapsePDS_Icons_Controllers.html',
-            'SynapsePDS_Icons_Locations': 'PDS/SynapsePDS_Icons_Locations.html',
-            'SynapsePDS_Icons_Luminaires': 'PDS/SynapsePDS_Icons_Luminaires.html',
-            'SynapsePDS_Icons_System': 'PDS/SynapsePDS_Icons_System.html',
-            'SynapsePDS_LLM': 'PDS/SynapsePDS_LLM.html',
-            'SynapsePDS_USML': 'PDS/SynapsePDS_USML.html',
-        }
-        
         # Determine relative path prefix based on current file location
         try:
             rel_from_index = current_file.relative_to(self.index_root)
@@ -594,42 +809,14 @@ class MarkdownConverter:
         except ValueError:
             prefix = ''
         
-        # Protect existing <a> tags by temporarily replacing them
-        link_placeholders = {}
-        placeholder_counter = 0
-        
-        def replace_link(match):
-            nonlocal placeholder_counter
-            placeholder = f'__PROTECTED_LINK_{placeholder_counter}__'
-            link_placeholders[placeholder] = match.group(0)
-            placeholder_counter += 1
-            return placeholder
-        
-        # Replace all <a> tags with placeholders (non-greedy to avoid matching nested tags incorrectly)
-        protected_text = re.sub(r'<a[^>]+>.*?</a>', replace_link, text, flags=re.DOTALL)
-        
-        # Sort by length descending to match longer names first (e.g., SynapsePDS_FW_DB before SynapsePDS_FW)
-        # This is critical to avoid partial matches
-        for md_name, html_path in sorted(known_files.items(), key=lambda x: len(x[0]), reverse=True):
-            # Escape special characters in the pattern
-            escaped_name = re.escape(md_name)
-            # Match the name only if it's not part of a longer word/filename
-            # Use word boundaries and negative lookahead/lookbehind
-            pattern = r'(?<!["\'/a-zA-Z0-9_])(' + escaped_name + r')(?!["\'/a-zA-Z0-9_])'
-            
-            def make_replacer(md_n, html_p):
-                def replacer(m):
-                    return f'<a href="{prefix}{html_p}">{md_n}</a>'
-                return replacer
-            
-            protected_text = re.sub(pattern, make_replacer(md_name, html_path), protected_text)
-        
-        # Restore protected links
-        result = protected_text
-        for placeholder, original_link in link_placeholders.items():
-            result = result.replace(placeholder, original_link)
+        def replace(match):
+            # Existing <a> tags are matched whole and left untouched
+            name = match.group('name')
+            if name is None:
+                return match.group(0)
+            return f'<a href="{prefix}{self.known_files[name]}">{name}</a>'
         
-        return result
+        return self.patterns['doc_link'].sub(replace, text)
     
     def convert_section_links(self, text: str, current_file: Path) -> str:
         """Convert references like '**ИмяДокумента** — раздел N «Название раздела»' to links with anchors"""
@@ -641,36 +828,37 @@ class MarkdownConverter:
         except ValueError:
             prefix = ''
         
-        # Pattern: **ИмяДокумента** — раздел N «Название раздела»
+        # Pattern: **ИмяДокумента** — раздел N «Название раздела» (patterns['section_link'])
         # Captures: (doc_name, section_num, section_title)
-        pattern = r'\*\*([A-Za-z0-9_]+)\*\*\s*—\s*раздел\s+([\d.]+)\s+«([^»]+)»'
         
         def make_section_link(match):
-            doc_name = match.group(1)
-            section_num = match.group(2)
-            section_title = match.group(3)
-            
-            # Create anchor from section number and title
-            # Remove dots from section number for anchor (3.2 -> 32)
-            anchor_num = section_num.replace('.', '')
-            # Convert title to lowercase, replace spaces with hyphens
-            anchor_title = section_title.lower().strip()
-            anchor_title = re.sub(r'\s+', '-', anchor_title)
-            # Remove special characters except hyphens and cyrillic letters
-            anchor_title = re.sub(r'[^\w\-а-яё]', '', anchor_title, flags=re.UNICODE)
-            
-            anchor = f"#{anchor_num}-{anchor_title}"
-            
-            # Determine HTML file path
-            html_file = f"{doc_name}.html"
-            
-            # Create full link
-            full_link = f'{prefix}PDS/{html_file}{anchor}'
-            
-            # Return link preserving original text
-            return f'<a href="{full_link}"><strong>{doc_name}</strong> — раздел {section_num} «{section_title}»</a>'
+            return self._section_link(match.group(1), match.group(2), match.group(3), prefix)
+        
+        return self.patterns['section_link'].sub(make_section_link, text)
+    
+    def _section_anchor(self, section_num: str, section_title: str) -> str:
+        """Heading id a section reference points at ('3.2', 'Название' -> '32-название')"""
+        # Remove dots from section number for anchor (3.2 -> 32)
+        anchor_num = section_num.replace('.', '')
+        # Convert title to lowercase, replace spaces with hyphens
+        anchor_title = section_title.lower().strip()
+        anchor_title = self.patterns['anchor_spaces'].sub('-', anchor_title)
+        # Remove special characters except hyphens and cyrillic letters
+        anchor_title = self.patterns['anchor_strip'].sub('', anchor_title)
+        return f"{anchor_num}-{anchor_title}"
+    
+    def _section_link(self, doc_name: str, section_num: str, section_title: str, prefix: str) -> str:
+        """
+        Link for '**ИмяДокумента** — раздел N «Название раздела»'. References that do not
+        resolve to a heading of a known document stay unlinked (and are reported as dangling).
+        """
+        text = f'<strong>{doc_name}</strong> — раздел {section_num} «{section_title}»'
+        anchor = self.registry.resolve_anchor(doc_name, self._section_anchor(section_num, section_title))
+        if anchor is None:
+            return text
         
-        return re.sub(pattern, make_section_link, text)
+        # Return link preserving original text
+        return f'<a href="{prefix}{self.registry.html_path(doc_name)}#{anchor}">{text}</a>'
     
     def convert_lists(self, text: str) -> str:
         """Convert markdown lists to HTML"""
@@ -734,7 +922,7 @@ class MarkdownConverter:
             
             for i, line in enumerate(lines):
                 # Find lines starting with "- " (with optional leading whitespace)
-                match_item = re.match(r'^(\s*)- (.+)$', line)
+                match_item = self.patterns['list_line'].match(line)
                 if match_item:
                     indent = len(match_item.group(1))  # Number of spaces before "-"
                     item_text = match_item.group(2).strip()
@@ -799,7 +987,7 @@ class MarkdownConverter:
                 if last_item_line + 1 < len(lines):
                     after_lines = [lines[i].strip() for i in range(last_item_line + 1, len(lines)) if lines[i].strip()]
                     after_text = ' '.join(after_lines).strip()
-                    if after_text and not re.match(r'^\s*- ', after_text):
+                    if after_text and not self.patterns['md_list_item'].match(after_text):
                         result_parts.append(f'<p>{after_text}</p>')
                 
                 return '\n'.join(result_parts)
@@ -808,12 +996,7 @@ class MarkdownConverter:
         
         # Process paragraphs that might contain lists
         # Match paragraphs containing "- " pattern
-        html = re.sub(
-            r'<p>((?:[^<]|<(?!\/p>))*- .+?)</p>',
-            fix_paragraph_with_list,
-            html,
-            flags=re.MULTILINE | re.DOTALL
-        )
+        html = self.patterns['list_paragraph'].sub(fix_paragraph_with_list, html)
         
         return html
     
@@ -833,10 +1016,17 @@ class MarkdownConverter:
             flags=re.DOTALL | re.IGNORECASE
         )
         
-        # Mermaid blocks
+        # Mermaid blocks (static SVG when pre-rendering is on and succeeds)
+        def replace_mermaid(match):
+            code = match.group(1)
+            svg = self.mermaid.render(code) if self.mermaid else None
+            if svg:
+                return f'<div class="mermaid"{PRERENDERED_ATTR}>{svg}</div>'
+            return f'<div class="mermaid">{code}</div>'
+        
         text = re.sub(
             r'```mermaid\n(.*?)```',
-            r'<div class="mermaid">\1</div>',
+            replace_mermaid,
             text,
             flags=re.DOTALL
         )
@@ -956,8 +1146,12 @@ class MarkdownConverter:
 
     # NOTE: Old UXL per-directory asset copying is intentionally removed.
     
-    def create_diagram_page(self, diagram_code: str, diagram_index: int, output_file: Path, title: str) -> str:
-        """Create a separate HTML page for a diagram and return its URL"""
+    def create_diagram_page(self, diagram_code: str, diagram_index: int, output_file: Path, title: str,
+                            svg: Optional[str] = None) -> str:
+        """
+        Create a separate HTML page for a diagram and return its URL.
+        svg: the diagram pre-rendered by the caller (otherwise Mermaid renders it in the browser).
+        """
         # Create filename for diagram page
         diagram_filename = f"{output_file.stem}_diagram_{diagram_index}.html"
         diagram_path = output_file.parent / diagram_filename
@@ -973,14 +1167,22 @@ class MarkdownConverter:
             title=f"{title} - Диаграмма {diagram_index + 1}",
             js_path=js_path,
             back_url=back_url,
-            diagram_code=diagram_code
+            diagram_code=svg or diagram_code,
+            diagram_attrs=PRERENDERED_ATTR if svg else '',
+            mermaid_js='' if svg else DIAGRAM_MERMAID_SCRIPT
         )
         
         # Write diagram page
-        with open(diagram_path, 'w', encoding='utf-8') as f:
-            f.write(diagram_html)
+        if self.assets:
+            diagram_html = self.assets.rewrite(diagram_html)
         
-        print(f"  > Created diagram: {diagram_path}")
+        with (self.timer or _NO_TIMER).nested('diagram_write'):
+            changed = self.writer.write_text(diagram_path, diagram_html)
+        
+        if changed:
+            print(f"  > Created diagram: {diagram_path}")
+        else:
+            print(f"  = Unchanged diagram: {diagram_path}")
         
         # Return relative URL
         return diagram_filename
@@ -992,12 +1194,12 @@ class MarkdownConverter:
         
         for i, line in enumerate(lines):
             # Check if current line is a list item
-            is_list_item = re.match(r'^\s*- ', line) or re.match(r'^\s*\d+\.\s+', line)
+            is_list_item = self.patterns['md_list_item'].match(line) or self.patterns['md_ordered_item'].match(line)
             
             if is_list_item and i > 0:
                 # Check if previous line is not empty and not a list item
                 prev_line = lines[i-1].strip()
-                if prev_line and not prev_line.endswith(':') and not re.match(r'^\s*- ', lines[i-1]) and not re.match(r'^\s*\d+\.\s+', lines[i-1]):
+                if prev_line and not prev_line.endswith(':') and not self.patterns['md_list_item'].match(lines[i-1]) and not self.patterns['md_ordered_item'].match(lines[i-1]):
                     # Check if previous line doesn't end with punctuation that suggests continuation
                     if not prev_line.endswith((':', ';', ',')):
                         # This might be a list that needs a blank line before it
@@ -1009,14 +1211,8 @@ class MarkdownConverter:
         return '\n'.join(result)
     
     def get_icon_folder_for_file(self, md_file: Path) -> str:
-        """Get the icon folder path based on the markdown filename"""
-        icon_folders = {
-            'SynapsePDS_Icons_Controllers.md': 'MOBILE/Images/Ico/Controller',
-            'SynapsePDS_Icons_Luminaires.md': 'MOBILE/Images/Ico/Luminaire',
-            'SynapsePDS_Icons_Locations.md': 'MOBILE/Images/Ico/Location',
-            'SynapsePDS_Icons_System.md': 'MOBILE/Images/Ico/System',
-        }
-        return icon_folders.get(md_file.name, None)
+        """Get the icon folder for a page that lists icon files (e.g. SynapsePDS_Icons_*.md)"""
+        return self.registry.icon_folder_for(md_file)
     
     def process_icon_lines(self, html_content: str, icon_folder: str) -> str:
         """Insert SVG icons into lines that reference icon files (XXX_name.svg pattern)"""
@@ -1028,30 +1224,176 @@ class MarkdownConverter:
             svg_filename = match.group(1)
             rest_of_line = match.group(2)
             
-            # Build relative path from INDEX/PDS/ to MOBILE/Images/Ico/...
-            # HTML is in INDEX/PDS/, SVG is in MOBILE/Images/Ico/...
-            # Relative path: ../../MOBILE/Images/Ico/Controller/
-            icon_path = f"../../{icon_folder}/{svg_filename}"
-            
-            # Create img tag with 64x64 size
-            img_tag = f'<img src="{icon_path}" width="64" height="64" alt="{svg_filename}" style="vertical-align: middle; margin-right: 15px;">'
-            
+            img_tag = self._icon_img_tag(icon_folder, svg_filename)
             return f'<p>{img_tag}{svg_filename}{rest_of_line}</p>'
         
         # Match paragraphs containing SVG filename pattern at the start
         # Pattern: <p>NNN_name.svg followed by any text</p>
-        html_content = re.sub(
-            r'<p>(\d{3}_[a-zA-Z0-9_]+\.svg)(.*?)</p>',
-            replace_icon_line,
-            html_content,
-            flags=re.DOTALL
-        )
+        html_content = self.patterns['icon_line'].sub(replace_icon_line, html_content)
         
         return html_content
     
+    def _icon_img_tag(self, icon_folder: str, svg_filename: str) -> str:
+        # Build relative path from INDEX/PDS/ to MOBILE/Images/Ico/...
+        # HTML is in INDEX/PDS/, SVG is in MOBILE/Images/Ico/...
+        # Relative path: ../../MOBILE/Images/Ico/Controller/
+        if self.sprites and self.sprites.has_icon(icon_folder, svg_filename):
+            return self.sprites.use_tag(svg_filename, style="vertical-align: middle; margin-right: 15px;")
+        icon_path = f"../../{icon_folder}/{svg_filename}"
+        if self.optimize_images:
+            # Minified copy: INDEX/assets/icons/Controller/
+            icon_path = f"../{ICONS_OUT_ROOT.split('/', 1)[1]}/{icon_folder.rsplit('/', 1)[-1]}/{svg_filename}"
+        
+        # Create img tag with 64x64 size
+        return f'<img src="{icon_path}" width="64" height="64" alt="{svg_filename}" style="vertical-align: middle; margin-right: 15px;">'
+    
+    def get_markdown(self):
+        """
+        The converter's markdown.Markdown instance, reset for a new document.
+
+        Building an instance loads and registers every extension processor, so it is
+        created once per converter (i.e. once per worker process) and reset() between pages.
+        """
+        if self._md is None:
+            # Note: nl2br conflicts with list processing, so we handle line breaks manually
+            self._md = markdown.Markdown(extensions=[
+                'extra',  # Includes: tables, fenced_code, attr_list, def_list, footnotes, abbr
+                'sane_lists',  # Better list handling
+            ])
+        else:
+            self._md.reset()
+        return self._md
+    
+    def postprocess_html(self, html_content: str, output_file: Path, title: str, icon_folder: str = None):
+        """
+        Single traversal over the rendered page that does all post-processing:
+        heading ids, URL/section/document/telegram links, UXL and Mermaid blocks,
+        icon lines and extraction of the page <h1>.
+
+        One combined regex tokenizes the page (POSTPROCESS_TOKENS) and each token is
+        dispatched to its `_on_<kind>` handler. Returns (html, page), where page holds
+        per-page results: 'h1', 'diagrams' (written diagram pages), 'uxl_blocks' and the
+        referenced documents for the dependency graph ('links', 'sections', 'telegram').
+        """
+        prefix = self.get_relative_paths(output_file)[0]
+        page = {
+            'output_file': output_file,
+            'title': title,
+            'prefix': prefix,
+            'usml_path': self._telegram_usml_path(output_file),
+            'icon_folder': icon_folder,
+            'h1': None,
+            'diagrams': [],
+            'uxl_blocks': 0,
+            'links': set(),
+            'sections': set(),
+            'telegram': False,
+        }
+        pattern = self.patterns['postprocess_icons' if icon_folder else 'postprocess']
+        html_content = pattern.sub(lambda m: self._dispatch_token(m, page), html_content)
+        return html_content, page
+    
+    def _postprocess_inline(self, text: str, page: dict) -> str:
+        """Apply inline tokens (links) inside a block token's body"""
+        return self.patterns['postprocess_inline'].sub(lambda m: self._dispatch_token(m, page), text)
+    
+    def _dispatch_token(self, match, page: dict) -> str:
+        handler = getattr(self, f'_on_{match.lastgroup}')
+        if self.timer is None:
+            return handler(match, page)
+        # Profiling: time each post-processor separately (postprocess.<kind>)
+        with self.timer.nested(f'postprocess.{match.lastgroup}'):
+            return handler(match, page)
+    
+    def _on_uxl(self, match, page):
+        # Convert UXL code blocks to pre.uxl-md-block (rules: Project/uxl_md_to_html.md).
+        # Keep code HTML-escaped (safe inside <pre>). UXL engine reads textContent.
+        page['uxl_blocks'] += 1
+        # Fix UXL links to project assets (SRC:assets/...) based on the output directory depth.
+        code = self._rewrite_uxl_sources(match.group('uxl_code'), page['prefix'])
+        return f'<pre class="uxl-md-block">{code}</pre>'
+    
+    def _on_mermaid(self, match, page):
+        # Convert Mermaid code blocks to div.mermaid AND create separate pages for each diagram
+        code = match.group('mermaid_code')
+        # Unescape HTML entities for Mermaid
+        code = code.replace('&quot;', '"')
+        code = code.replace('&amp;', '&')
+        code = code.replace('&lt;', '<')
+        code = code.replace('&gt;', '>')
+        
+        # Pre-rendered SVG if available (once, for the page and its diagram page)
+        svg = self.mermaid.render(code) if self.mermaid else None
+        
+        # Create separate page for this diagram
+        output_file = page['output_file']
+        diagram_url = self.create_diagram_page(code, len(page['diagrams']), output_file, page['title'], svg)
+        page['diagrams'].append(output_file.parent / diagram_url)
+        
+        # Return div with data-diagram-url attribute
+        if svg:
+            return f'<div class="mermaid" data-diagram-url="{diagram_url}"{PRERENDERED_ATTR}>{svg}</div>'
+        return f'<div class="mermaid" data-diagram-url="{diagram_url}">{code}</div>'
+    
+    def _on_h1(self, match, page):
+        body = self._postprocess_inline(match.group('h1_body'), page)
+        # The first h1 becomes the page title and is removed from content
+        if page['h1'] is None:
+            page['h1'] = body
+            return ''
+        return f'<h1>{body}</h1>'
+    
+    def _on_heading(self, match, page):
+        # Add id attributes to h2/h3 headings for anchor links (id from the original text)
+        tag = match.group('heading_tag')
+        body = match.group('heading_body')
+        return f'<{tag} id="{heading_id(body)}">{self._postprocess_inline(body, page)}</{tag}>'
+    
+    def _on_icon(self, match, page):
+        # Insert the SVG icon into a line that references an icon file (see process_icon_lines)
+        svg_filename = match.group('icon_svg')
+        rest_of_line = self._postprocess_inline(match.group('icon_rest'), page)
+        return f'<p>{self._icon_img_tag(page["icon_folder"], svg_filename)}{svg_filename}{rest_of_line}</p>'
+    
+    def _on_link(self, match, page):
+        return match.group(0)
+    
+    def _on_telegram(self, match, page):
+        if not page['usml_path']:
+            return match.group(0)
+        # Any telegram code depends on the USML table, linked or not
+        page['telegram'] = True
+        return self._telegram_link(match.group('telegram_code'), page['usml_path']) or match.group(0)
+    
+    def _on_url(self, match, page):
+        return self._url_link(match.group('url_href'))
+    
+    def _on_section(self, match, page):
+        doc = match.group('section_doc')
+        anchor = self._section_anchor(match.group('section_num'), match.group('section_title'))
+        page['sections'].add((doc, anchor, self.registry.resolve_anchor(doc, anchor) or ''))
+        return self._section_link(match.group('section_doc'), match.group('section_num'),
+                                  match.group('section_title'), page['prefix'])
+    
+    def _on_doc(self, match, page):
+        name = match.group('doc_name')
+        page['links'].add(name)
+        return f'<a href="{page["prefix"]}{self.known_files[name]}">{name}</a>'
+    
     def convert_file(self, md_file: Path):
-        """Convert a single markdown file to HTML"""
+        """
+        Convert a single markdown file to HTML.
+
+        Returns {'outputs': [...], 'deps': [...]} - every file written and every extra
+        input read (besides md_file itself), for the build manifest - the documents the
+        page references ('refs', for the dependency graph) and the number of generated
+        files that 'changed' or were left 'unchanged' on disk.
+        """
         import sys
+        changed_before = self.writer.changed
+        unchanged_before = self.writer.unchanged
+        timer = self.timer or _NO_TIMER
+        timer.start(str(md_file.relative_to(self.repo_root)) if self.timer else None)
         print(f"Converting: {md_file}")
         sys.stdout.flush()
         
@@ -1064,36 +1406,41 @@ class MarkdownConverter:
             sys.stdout.flush()
             raise
         
+        timer.lap('read')
+        
         # Preprocess markdown to fix list formatting
         md_content = self.preprocess_markdown(md_content)
 
         # Detect UXL blocks in the source markdown (case-insensitive)
-        md_has_uxl = bool(re.search(r'```uxl\b', md_content, flags=re.IGNORECASE))
+        md_has_uxl = bool(self.patterns['md_uxl_fence'].search(md_content))
         
-        # Special handling for database files - inject schema from corresponding scheme file
-        scheme_mapping = {
-            'SynapsePDS_APP_DB.md': 'SynapsePDS_APP_DB_scheme.md',
-            'SynapsePDS_FW_DB.md': 'SynapsePDS_FW_DB_scheme.md',
-        }
-        if md_file.name in scheme_mapping:
-            scheme_file = md_file.parent / scheme_mapping[md_file.name]
+        timer.lap('preprocess')
+        
+        deps = []
+        
+        # Special handling for database files - inject schema from corresponding <name>_scheme.md
+        scheme_file = self.registry.scheme_file_for(md_file)
+        if scheme_file:
+            # Tracked even when missing, so creating it later triggers a rebuild
+            deps.append(scheme_file)
             if scheme_file.exists():
                 with open(scheme_file, 'r', encoding='utf-8') as f:
                     scheme_content = f.read()
                 # Extract only the mermaid block from scheme file
-                mermaid_match = re.search(r'(```mermaid.*?```)', scheme_content, re.DOTALL)
+                mermaid_match = self.patterns['md_mermaid_block'].search(scheme_content)
                 if mermaid_match:
                     mermaid_block = mermaid_match.group(1)
                     # Insert mermaid block after metadata (after "Последнее изменение:" line)
-                    md_content = re.sub(
-                        r'(\*\*Последнее изменение:\*\*[^\n]*\n)',
+                    md_content = self.patterns['md_last_modified'].sub(
                         r'\1\n' + mermaid_block + '\n',
                         md_content,
                         count=1
                     )
         
+        timer.lap('scheme')
+        
         # Get title from first heading
-        title_match = re.search(r'^#\s+(.+)$', md_content, re.MULTILINE)
+        title_match = self.patterns['md_title'].search(md_content)
         title = title_match.group(1) if title_match else md_file.stem
         
         # Determine output path first (we need it for diagram pages)
@@ -1105,84 +1452,68 @@ class MarkdownConverter:
         
         output_file = self.index_root / rel_path.with_suffix('.html')
         output_file.parent.mkdir(parents=True, exist_ok=True)
+        outputs = [output_file]
+        timer.lap('setup')
         
         # Convert markdown to HTML
         if MARKDOWN_AVAILABLE:
             # Use proper markdown library with extensions
-            # Note: nl2br conflicts with list processing, so we handle line breaks manually
-            md = markdown.Markdown(extensions=[
-                'extra',  # Includes: tables, fenced_code, attr_list, def_list, footnotes, abbr
-                'sane_lists',  # Better list handling
-            ])
-            html_content = md.convert(md_content)
+            html_content = self.get_markdown().convert(md_content)
+            timer.lap('render')
             
             # Convert two spaces + newline to <br> (markdown line breaks)
-            html_content = re.sub(r'  \n', '<br>\n', html_content)
+            html_content = self.patterns['line_break'].sub('<br>\n', html_content)
             
             # Fix lists that might have been broken
             html_content = self.fix_lists_in_html(html_content)
+            timer.lap('normalize')
             
-            # Add id attributes to headings for anchor links
-            html_content = self.add_heading_ids(html_content)
+            # Everything else in one traversal: heading ids, URL/section/document/telegram links,
+            # UXL and Mermaid blocks (+ diagram pages), icon lines and the page <h1>
+            icon_folder = self.get_icon_folder_for_file(md_file)
+            html_content, page = self.postprocess_html(html_content, output_file, title, icon_folder)
+            outputs.extend(page['diagrams'])
+            h1 = page['h1']
+            refs = {
+                'links': sorted(page['links']),
+                'sections': sorted(page['sections']),
+                'telegram': self.registry.telegram_signature() if page['telegram'] else None,
+            }
+            timer.lap('postprocess')
             
-            # Convert plain URLs to clickable links
-            html_content = self.convert_urls(html_content)
-            
-            # Convert section references with anchors (must be before convert_md_file_links)
-            html_content = self.convert_section_links(html_content, output_file)
-            
-            # Convert MD file references to clickable links
-            html_content = self.convert_md_file_links(html_content, output_file)
-            
-            # Convert telegram codes to links to USML
-            html_content = self.convert_telegram_links(html_content, output_file)
-            
-            # Post-process: Convert UXL code blocks to pre.uxl-md-block (rules: Project/uxl_md_to_html.md)
-            def replace_uxl_html(match):
-                code = match.group(1)
-                # Keep code HTML-escaped (safe inside <pre>). UXL engine reads textContent.
-                return f'<pre class="uxl-md-block">{code}</pre>'
-
-            html_content, uxl_repl_count = re.subn(
-                r'<pre><code class="language-uxl">(.*?)</code></pre>',
-                replace_uxl_html,
-                html_content,
-                flags=re.DOTALL | re.IGNORECASE
-            )
-
-            # Post-process: Convert Mermaid code blocks to div.mermaid
-            # AND create separate pages for each diagram
-            diagram_counter = [0]  # Use list to allow modification in nested function
-            
-            def replace_mermaid(match):
-                code = match.group(1)
-                # Unescape HTML entities for Mermaid
-                code = code.replace('&quot;', '"')
-                code = code.replace('&amp;', '&')
-                code = code.replace('&lt;', '<')
-                code = code.replace('&gt;', '>')
-                
-                # Create separate page for this diagram
-                diagram_url = self.create_diagram_page(code, diagram_counter[0], output_file, title)
-                diagram_counter[0] += 1
-                
-                # Return div with data-diagram-url attribute
-                return f'<div class="mermaid" data-diagram-url="{diagram_url}">{code}</div>'
-            
-            html_content = re.sub(
-                r'<pre><code class="language-mermaid">(.*?)</code></pre>',
-                replace_mermaid,
-                html_content,
-                flags=re.DOTALL
-            )
-
-            has_uxl = uxl_repl_count > 0
+            has_uxl = page['uxl_blocks'] > 0
         else:
-            # Fallback to simple converter
+            # Fallback to simple converter (references are not tracked)
             html_content = self.simple_markdown_to_html(md_content)
+            refs = {}
             # Check if there are UXL blocks in the content
             has_uxl = bool(re.search(r'<pre class="uxl-md-block">', html_content))
+            
+            # Process icon files (SynapsePDS_Icons_*.md)
+            icon_folder = self.get_icon_folder_for_file(md_file)
+            if icon_folder:
+                html_content = self.process_icon_lines(html_content, icon_folder)
+            
+            # Extract h1 from content for page title
+            h1_match = self.patterns['h1'].search(html_content)
+            h1 = h1_match.group(1) if h1_match else None
+            if h1_match:
+                # Remove h1 from content
+                html_content = self.patterns['h1'].sub('', html_content, count=1)
+            
+            # Fix UXL links to project assets (SRC:assets/...) based on the output directory depth.
+            if has_uxl:
+                html_content = self.rewrite_uxl_asset_paths_in_html(html_content, self.get_relative_paths(output_file)[0])
+            timer.lap('render')
 
+        if icon_folder and self.sprites:
+            # The page's icons come from the inline sprite (one request for the whole catalog).
+            # Every SVG of the folder and every listed one (even if missing) is a dependency.
+            html_content = self.sprites.sprite(icon_folder) + '\n' + html_content
+            listed = self.registry.for_file(md_file)['svg_refs']
+            deps.extend(sorted(set(self.sprites.sources(icon_folder))
+                               | {self.repo_root / icon_folder / svg for svg in listed}))
+        
         # Be conservative: if markdown contained UXL blocks, treat the page as UXL-enabled
         has_uxl = bool(has_uxl or md_has_uxl)
         
@@ -1195,27 +1526,20 @@ class MarkdownConverter:
         # GitHub URL
         github_url = f"https://github.com/KhudyakovAlex/Synapse/blob/master/{rel_path}"
         
-        # Process icon files (SynapsePDS_Icons_*.md)
-        icon_folder = self.get_icon_folder_for_file(md_file)
-        if icon_folder:
-            html_content = self.process_icon_lines(html_content, icon_folder)
-        
-        # Extract h1 from content for page title
-        h1_match = re.search(r'<h1>(.*?)</h1>', html_content, re.DOTALL)
-        if h1_match:
-            page_title = f'<h1 style="color: var(--accent-primary); font-size: 2.25em; margin: 0; padding-bottom: 15px; border-bottom: 3px solid var(--accent-primary); font-weight: normal;">{h1_match.group(1)}</h1>'
-            # Remove h1 from content
-            html_content = re.sub(r'<h1>.*?</h1>', '', html_content, count=1, flags=re.DOTALL)
+        # Page title from the content's h1
+        if h1 is not None:
+            page_title = f'<h1 style="color: var(--accent-primary); font-size: 2.25em; margin: 0; padding-bottom: 15px; border-bottom: 3px solid var(--accent-primary); font-weight: normal;">{h1}</h1>'
         else:
             page_title = ''
 
         # Inject UXL assets only for pages that contain UXL blocks (rules: Project/uxl_md_to_html.md).
         if has_uxl:
-            self.ensure_uxl_local_assets()
-            self.ensure_uxl_assets_next_to_doc(output_file.parent)
-
-            # Fix UXL links to project assets (SRC:assets/...) based on the output directory depth.
-            html_content = self.rewrite_uxl_asset_paths_in_html(html_content, css_path)
+            with timer.nested('uxl_assets'):
+                self.ensure_uxl_local_assets()
+                self.ensure_uxl_assets_next_to_doc(output_file.parent)
+            # An upstream UXL update re-copies the engine next to the page (and renames it
+            # with --fingerprint-assets)
+            deps.extend([self._uxl_assets["css_path"], self._uxl_assets["js_path"]])
 
             uxl_css = f'\n<link rel="stylesheet" href="{css_path}assets/css/uxl.css">'
             uxl_js = f'\n<script src="{js_path}assets/js/uxl.js"></script>'
@@ -1231,6 +1555,9 @@ class MarkdownConverter:
             uxl_js = ''
             uxl_init = ''
         
+        # Load Mermaid only on pages with diagrams, and render them lazily
+        mermaid_js = MERMAID_LAZY_SCRIPT if self.patterns['mermaid_pending'].search(html_content) else ''
+        
         # Fill template
         html = HTML_TEMPLATE.format(
             title=title,
@@ -1243,22 +1570,190 @@ class MarkdownConverter:
             content=html_content,
             uxl_css=uxl_css,
             uxl_js=uxl_js,
-            uxl_init=uxl_init
+            uxl_init=uxl_init,
+            mermaid_js=mermaid_js
         )
+        if self.images:
+            html = self.images.rewrite(html)
+        if self.assets:
+            html = self.assets.rewrite(html)
+        timer.lap('template')
         
         # Write HTML
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html)
-            print(f"  > Created: {output_file}")
+            if self.writer.write_text(output_file, html):
+                print(f"  > Created: {output_file}")
+            else:
+                print(f"  = Unchanged: {output_file}")
             sys.stdout.flush()
         except Exception as e:
             print(f"  X Error writing {output_file}: {e}")
             sys.stdout.flush()
             raise
+        timer.lap('write')
+        
+        return {
+            'outputs': outputs,
+            'deps': deps,
+            'refs': refs,
+            'changed': self.writer.changed - changed_before,
+            'unchanged': self.writer.unchanged - unchanged_before,
+        }
+    
+    def find_markdown_files(self) -> List[Path]:
+        """All .md sources in PRD and PDS folders"""
+        md_files = []
+        for folder in ['PRD', 'PDS']:
+            folder_path = self.repo_root / folder
+            if folder_path.exists():
+                md_files.extend(sorted(folder_path.glob('*.md')))
+        return md_files
+    
+    def load_manifest(self) -> BuildManifest:
+        return BuildManifest(self.repo_root, self.cache_dir / MANIFEST_NAME)
+    
+    def load_graph(self) -> DocumentGraph:
+        return DocumentGraph(self.cache_dir / GRAPH_NAME)
+    
+    def is_fresh(self, manifest: BuildManifest, graph: DocumentGraph, md_file: Path) -> bool:
+        """
+        Outputs of md_file are up to date (manifest) and built from the current telegram
+        table and headings of the documents it links to (graph)
+        """
+        return (manifest.is_fresh(md_file, self.build_fingerprint)
+                and graph.is_current(manifest.rel(md_file), self.registry.telegram_signature(), self.registry))
+    
+    def record_build(self, manifest: BuildManifest, graph: DocumentGraph, md_file: Path, result: dict):
+        """Store a successful build in the manifest and remove outputs it no longer produces"""
+        graph.record(manifest.rel(md_file), result['refs'], [manifest.rel(d) for d in result['deps']])
+        previous = manifest.record(md_file, self.build_fingerprint, result['outputs'], result['deps'])
+        if not previous:
+            return
+        current = set(manifest.entries[manifest.rel(md_file)]['outputs'])
+        for stale in set(previous.get('outputs', [])) - current:
+            stale_path = self.repo_root / stale
+            if stale_path.exists():
+                stale_path.unlink()
+                print(f"  > Removed stale output: {stale_path}")
+    
+    def _convert_pending(self, md_files: List[Path], jobs: int):
+        """
+        Convert files, yielding (md_file, result, log, error) in input order.
+
+        jobs == 1: in-process, log is printed live (log is None).
+        jobs > 1: process pool; each worker's output is captured and returned as log,
+        so the printed output is identical regardless of scheduling.
+        """
+        if jobs <= 1 or len(md_files) <= 1:
+            for md_file in md_files:
+                try:
+                    yield md_file, self.convert_file(md_file), None, None
+                except Exception as e:
+                    yield md_file, None, None, e
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Fetch UXL assets once here instead of racing on them from every worker
+        if any(_source_has_uxl(md_file) for md_file in md_files):
+            self.ensure_uxl_local_assets()
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(str(self.repo_root), self.fingerprint_assets,
+                                           self.optimize_images, self.sprites is not None,
+                                           self.mermaid is not None, self.image_variants)) as pool:
+            for md_file, (result, log, error) in zip(md_files, pool.map(_convert_in_worker, md_files)):
+                yield md_file, result, log, error
+
+    def report_dangling(self, graph: DocumentGraph):
+        """Warn about section links pointing at missing documents or headings"""
+        for source, doc, anchor in graph.dangling(self.registry):
+            print(f"  [WARN] Dangling section link in {source}: {doc}#{anchor}")
+    
+    def remove_outputs(self, manifest: BuildManifest, graph: DocumentGraph, md_file: Path):
+        """Delete everything built from a source that no longer exists"""
+        entry = manifest.entries.get(manifest.rel(md_file))
+        for output in entry.get('outputs', []) if entry else []:
+            output_path = self.repo_root / output
+            if output_path.exists():
+                output_path.unlink()
+                print(f"  > Removed stale output: {output_path}")
+        manifest.forget(md_file)
+        graph.forget(manifest.rel(md_file))
+    
+    def build(self, manifest: BuildManifest, graph: DocumentGraph, pending: List[Path], jobs: int = 1):
+        """
+        Convert the given sources and record them in the manifest and the dependency
+        graph (both saved at the end).
+        Returns (errors, changed, unchanged): failed files and generated file counts.
+        """
+        import sys
+        errors = []
+        changed = unchanged = 0
+        for md_file, result, log, error in self._convert_pending(pending, jobs):
+            if log:
+                print(log, end='')
+            if error is not None:
+                manifest.forget(md_file)
+                graph.forget(manifest.rel(md_file))
+                errors.append((md_file, error))
+                print(f"  X Error converting {md_file}: {error}")
+            elif result:
+                self.record_build(manifest, graph, md_file, result)
+                changed += result['changed']
+                unchanged += result['unchanged']
+            sys.stdout.flush()  # Flush after each file
+        
+        try:
+            manifest.save()
+            graph.save()
+        except OSError as e:
+            print(f"  [WARN] Failed to save build manifest: {e}")
+        return errors, changed, unchanged
+
+    def rebuild_changed(self, changed: Iterable[Path]):
+        """
+        Watch mode: rebuild the sources among `changed` (paths under PRD/ or PDS/)
+        plus the pages built from them. Deleted sources lose their outputs; if the set
+        of documents changed, every page whose links may differ is rebuilt.
+        Returns the list of failed files.
+        """
+        import sys
+        manifest = self.load_manifest()
+        graph = self.load_graph()
+        changed = sorted(set(changed))
+        links_changed = self.refresh_registry()
+        
+        for md_file in changed:
+            if not md_file.exists():
+                self.remove_outputs(manifest, graph, md_file)
+        
+        if links_changed:
+            print("  [-] Document set changed, checking every page")
+            candidates = self.find_markdown_files()
+        else:
+            dependents = graph.dependents(manifest.rel(f) for f in changed)
+            candidates = [f for f in changed if f.exists()] + [self.repo_root / d for d in dependents]
+        candidates = sorted(set(candidates))
+        pending = [f for f in candidates if not self.is_fresh(manifest, graph, f)]
+        
+        errors, written, unchanged = self.build(manifest, graph, pending)
+        self.report_dangling(graph)
+        if pending:
+            print(f"  [OK] Rebuilt {len(pending)} page(s): {written} file(s) changed, {unchanged} unchanged")
+        else:
+            print("  [-] Nothing to rebuild")
+        sys.stdout.flush()
+        return errors
     
-    def convert_all(self):
-        """Convert all markdown files in PRD and PDS folders"""
+    def convert_all(self, force: bool = False, jobs: int = 1):
+        """
+        Convert all markdown files in PRD and PDS folders.
+
+        Incremental: sources whose hash, dependencies, converter fingerprint and outputs
+        match the build manifest (INDEX/.cache/build_manifest.json) are skipped.
+        force=True rebuilds everything. jobs > 1 spreads files over a process pool.
+        """
         import sys
         print("="*60)
         print("Synapse Documentation Converter")
@@ -1266,32 +1761,88 @@ class MarkdownConverter:
         sys.stdout.flush()
         
         # Find all .md files
-        md_files = []
-        for folder in ['PRD', 'PDS']:
-            folder_path = self.repo_root / folder
-            if folder_path.exists():
-                md_files.extend(folder_path.glob('*.md'))
+        md_files = self.find_markdown_files()
         
         print(f"\nFound {len(md_files)} markdown files\n")
         sys.stdout.flush()
         
-        # Convert each file
-        for md_file in md_files:
-            try:
-                self.convert_file(md_file)
-                sys.stdout.flush()  # Flush after each file
-            except Exception as e:
-                print(f"  X Error converting {md_file}: {e}")
-                sys.stdout.flush()
+        # Check the UXL engine for updates on every run, even if every page is fresh:
+        # UXL pages depend on the local copies, so an update rebuilds them
+        self.ensure_uxl_local_assets()
+        
+        manifest = self.load_manifest()
+        manifest.prune(md_files)
+        graph = self.load_graph()
+        graph.prune(manifest.rel(f) for f in md_files)
+        
+        pending = [f for f in md_files if force or not self.is_fresh(manifest, graph, f)]
+        skipped = len(md_files) - len(pending)
+        
+        # Convert each stale file
+        errors, changed, unchanged = self.build(manifest, graph, pending, jobs)
+        self.report_dangling(graph)
+        
+        if skipped:
+            print(f"\n  [-] {skipped} of {len(md_files)} files up to date, skipped")
+        if pending:
+            print(f"  [OK] {changed} generated file(s) changed, {unchanged} unchanged")
+        
+        if errors:
+            print(f"\n  X {len(errors)} file(s) failed:")
+            for md_file, error in errors:
+                print(f"    - {md_file}: {error}")
         
         print("\n" + "="*60)
         print("Conversion complete!")
         print("="*60)
         sys.stdout.flush()
+        return errors
 
+def _source_has_uxl(md_file: Path) -> bool:
+    try:
+        pattern, flags = PATTERNS['md_uxl_fence']
+        return bool(re.search(pattern, md_file.read_text(encoding='utf-8'), flags))
+    except OSError:
+        return False
+
+
+# Per-process converter for parallel builds (convert_all with jobs > 1)
+_worker_converter = None
+
+
+def _init_worker(repo_root: str, fingerprint_assets: bool = False, optimize_images: bool = False,
+                 icon_sprites: bool = False, prerender_diagrams: bool = False, image_variants=()):
+    global _worker_converter
+    _worker_converter = MarkdownConverter(repo_root, fingerprint_assets=fingerprint_assets,
+                                          optimize_images=optimize_images, icon_sprites=icon_sprites,
+                                          prerender_diagrams=prerender_diagrams, image_variants=image_variants)
+    # The parent process has already fetched UXL assets
+    _worker_converter._uxl_assets_ready = True
+
+
+def _convert_in_worker(md_file: Path):
+    """Convert one file in a pool worker. Returns (result, captured output, error)."""
+    buf = io.StringIO()
+    result = error = None
+    with contextlib.redirect_stdout(buf):
+        try:
+            result = _worker_converter.convert_file(md_file)
+        except Exception as e:
+            error = e
+    # Exceptions travel back pickled; fall back to text for ones that can't
+    try:
+        import pickle
+        pickle.dumps(error)
+    except Exception:
+        error = RuntimeError(str(error))
+    return result, buf.getvalue(), error
 
-def update_ship_log(repo_root: str):
-    """Update ship log in INDEX/index.html from Project/log.md"""
+
+def update_ship_log(repo_root: str, index_page: IndexPage = None):
+    """
+    Update ship log in INDEX/index.html from Project/log.md.
+    With index_page the change is only made in memory (the caller saves the page).
+    """
     import sys
     
     log_file = Path(repo_root) / 'Project' / 'log.md'
@@ -1347,70 +1898,232 @@ def update_ship_log(repo_root: str):
     
     log_html = '\n'.join(log_html_parts)
     
-    # Read index.html
-    with open(index_file, 'r', encoding='utf-8') as f:
-        index_content = f.read()
-    
-    # Replace log entries in index.html
-    # Pattern: find the hero-log div and replace its log-entry divs
-    pattern = r'(<div class="hero-log">.*?<h3>Судовой журнал</h3>\s*)((?:<div class="log-entry">.*?</div>\s*)+)(\s*</div>)'
-    
-    def replace_log(match):
-        before = match.group(1)
-        after = match.group(3)
-        return before + '\n' + log_html + '\n        ' + after
+    # Replace log entries in index.html (hero-log div, see index_page.SHIP_LOG_RE)
+    own_page = index_page is None
+    if own_page:
+        index_page = IndexPage(index_file)
     
-    new_content, count = re.subn(pattern, replace_log, index_content, flags=re.DOTALL)
-    
-    if count == 0:
+    if not index_page.replace_ship_log(log_html):
         print("  [!] Could not find log section in index.html")
         return
     
-    # Write updated index.html
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    if own_page:
+        index_page.save()
     
     print(f"  [OK] Updated ship log with {len(entries)} entries")
     sys.stdout.flush()
 
 
-if __name__ == '__main__':
-    # Get repository root (parent of INDEX directory)
-    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Create converter and run
-    converter = MarkdownConverter(repo_root)
-    converter.convert_all()
-    
-    # Update diagrams in index.html
+def update_index_diagrams(repo_root: str, writer: OutputWriter = None, index_page: IndexPage = None,
+                          renderer: MermaidRenderer = None, assets: AssetFingerprints = None):
+    """Update diagrams in INDEX/index.html (update_diagrams.py, run in-process)"""
+    import sys
+    from update_diagrams import update_diagrams
     print("\n" + "="*60)
     print("Updating diagrams in INDEX/index.html...")
     print("="*60)
-    import sys
     sys.stdout.flush()  # Принудительно отправляем вывод
     try:
-        import subprocess
-        script_path = os.path.join(os.path.dirname(__file__), 'update_diagrams.py')
-        # Use -u flag for unbuffered output to prevent hangs in Windows
-        subprocess.run(['python', '-u', script_path], check=True, timeout=60)
-    except subprocess.TimeoutExpired:
-        print("Warning: update_diagrams.py timed out after 60 seconds")
-        print("You may need to run update_diagrams.py manually")
+        update_diagrams(repo_root, writer, index_page, renderer, assets)
     except Exception as e:
         print(f"Warning: Failed to update diagrams: {e}")
         print("You may need to run update_diagrams.py manually")
     finally:
         sys.stdout.flush()  # Принудительно отправляем вывод перед завершением
-    
-    # Update ship log from Project/log.md
+
+
+def update_index_log(repo_root: str, index_page: IndexPage = None):
+    """Update ship log in INDEX/index.html, reporting failures as warnings"""
+    import sys
     print("\n" + "="*60)
     print("Updating ship log in INDEX/index.html...")
     print("="*60)
     sys.stdout.flush()
     try:
-        update_ship_log(repo_root)
+        update_ship_log(repo_root, index_page)
     except Exception as e:
         print(f"Warning: Failed to update ship log: {e}")
     finally:
         sys.stdout.flush()
 
+
+def save_index_page(index_page: IndexPage, writer: OutputWriter = None):
+    """Write INDEX/index.html once, after all section updates"""
+    import sys
+    try:
+        if index_page.save(writer):
+            print(f"  [OK] Saved {index_page.path}")
+        else:
+            print(f"  [-] {index_page.path.name} unchanged")
+    except OSError as e:
+        print(f"Warning: Failed to write {index_page.path}: {e}")
+    sys.stdout.flush()
+
+
+def load_index_page(repo_root: str) -> Optional[IndexPage]:
+    index_file = Path(repo_root) / 'INDEX' / 'index.html'
+    try:
+        return IndexPage(index_file)
+    except OSError as e:
+        print(f"  [!] Index file not readable: {index_file} ({e})")
+        return None
+
+
+def watch(converter: MarkdownConverter, debounce: float = 0.3):
+    """
+    Keep the converter warm and rebuild what each change affects, until Ctrl+C.
+
+    PRD/ and PDS/ sources: the changed pages plus pages built from them
+    (MarkdownConverter.rebuild_changed). Project/process.md and mindmap.md:
+    diagrams in INDEX/index.html. Project/log.md: the ship log.
+    """
+    import sys
+    from doc_watch import ChangeWatcher
+    
+    repo_root = converter.repo_root.resolve()
+    watcher = ChangeWatcher(repo_root, debounce=debounce)
+    print(f"\nWatching PRD/, PDS/ and Project/ ({watcher.mode}), press Ctrl+C to stop")
+    sys.stdout.flush()
+    try:
+        while True:
+            changed = {path.relative_to(repo_root) for path in watcher.wait()}
+            start = time.perf_counter()
+            print(f"\nChanged: {', '.join(sorted(p.as_posix() for p in changed))}")
+            
+            sources = [converter.repo_root / p for p in changed if p.parts[0] in ('PRD', 'PDS')]
+            if sources:
+                converter.rebuild_changed(sources)
+            update_diagrams_needed = bool(changed & {Path('Project/process.md'), Path('Project/mindmap.md')})
+            update_log_needed = Path('Project/log.md') in changed
+            if update_diagrams_needed or update_log_needed:
+                index_page = load_index_page(str(converter.repo_root))
+                if update_diagrams_needed:
+                    update_index_diagrams(str(converter.repo_root), converter.writer, index_page, converter.mermaid,
+                                          converter.assets)
+                if update_log_needed:
+                    update_index_log(str(converter.repo_root), index_page)
+                if index_page:
+                    save_index_page(index_page, converter.writer)
+            
+            print(f"  [OK] Done in {(time.perf_counter() - start) * 1000:.0f} ms")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("\nWatch stopped")
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Synapse Documentation Converter")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every page, ignoring the build manifest")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="convert pages in N worker processes (0 = one per CPU)")
+    parser.add_argument('--offline', action='store_true',
+                        help="do not download UXL assets, use local copies (also SYNAPSE_OFFLINE=1)")
+    parser.add_argument('--uxl-ttl', type=float, default=0, metavar='SECONDS',
+                        help="skip the UXL asset update check if the last one is younger than this")
+    parser.add_argument('--uxl-base-url', metavar='URL',
+                        help="download UXL assets from URL instead of GitHub (also SYNAPSE_UXL_BASE_URL)")
+    parser.add_argument('--fingerprint-assets', action='store_true',
+                        help="reference INDEX/assets files by content-hashed names (cacheable forever)")
+    parser.add_argument('--optimize-images', action='store_true',
+                        help="minify icon SVGs into INDEX/assets/icons (cached by content hash)")
+    parser.add_argument('--image-variants', type=int, nargs='+', default=[], metavar='WIDTH',
+                        help="with --optimize-images: downscaled PNG copies <name>.w<WIDTH>.png, "
+                             "referenced from the pages with srcset (needs Pillow)")
+    parser.add_argument('--icon-sprites', action='store_true',
+                        help="embed one SVG sprite per icon folder in the icon pages (no request per icon)")
+    parser.add_argument('--prerender-diagrams', action='store_true',
+                        help="render Mermaid diagrams to static SVG with mmdc (cached; JS renderer as fallback)")
+    parser.add_argument('--profile', action='store_true',
+                        help="report time per conversion stage, per file and in total")
+    parser.add_argument('--profile-out', metavar='PATH',
+                        help="with --profile: also run under cProfile and dump pstats to PATH")
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help="with --profile: number of slowest files to list (default 10)")
+    parser.add_argument('--watch', action='store_true',
+                        help="after the build, keep watching sources and rebuild affected pages")
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    # Get repository root (parent of INDEX directory)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    profiler = None
+    if args.profile:
+        if jobs > 1:
+            print("  [WARN] --profile converts in a single process, --jobs ignored")
+            jobs = 1
+        if args.profile_out:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+    
+    # Optimize images before pages (and fingerprinted names) reference them
+    images_time = None
+    if args.optimize_images:
+        stage_start = time.perf_counter()
+        optimizer = ImageOptimizer(repo_root, variant_widths=args.image_variants, force=args.force)
+        optimizer.run()
+        optimizer.report()
+        if args.profile:
+            images_time = time.perf_counter() - stage_start
+    
+    # Create converter and run
+    stage_start = time.perf_counter()
+    converter = MarkdownConverter(repo_root, uxl_base_url=args.uxl_base_url,
+                                  uxl_ttl=args.uxl_ttl, offline=args.offline,
+                                  fingerprint_assets=args.fingerprint_assets,
+                                  optimize_images=args.optimize_images,
+                                  icon_sprites=args.icon_sprites,
+                                  prerender_diagrams=args.prerender_diagrams,
+                                  image_variants=args.image_variants if args.optimize_images else ())
+    if args.profile:
+        converter.timer = StageTimer()
+        converter.timer.add('startup', time.perf_counter() - stage_start)
+    if images_time is not None:
+        converter.timer.add('images', images_time)
+    errors = converter.convert_all(force=args.force, jobs=jobs)
+    
+    # index.html is read once, updated in memory and written once
+    index_page = load_index_page(repo_root)
+    
+    # Update diagrams in index.html
+    stage_start = time.perf_counter()
+    update_index_diagrams(repo_root, converter.writer, index_page, converter.mermaid, converter.assets)
+    if converter.mermaid:
+        converter.mermaid.report()
+    if converter.timer:
+        converter.timer.add('index.diagrams', time.perf_counter() - stage_start)
+    
+    # Update ship log from Project/log.md
+    stage_start = time.perf_counter()
+    update_index_log(repo_root, index_page)
+    if index_page:
+        # Asset references follow --fingerprint-assets (plain names again when it is off)
+        if converter.assets:
+            index_page.html = converter.assets.rewrite(index_page.html)
+        else:
+            index_page.html = restore_asset_names(index_page.html)
+        save_index_page(index_page, converter.writer)
+    
+    if converter.timer:
+        converter.timer.add('index.ship_log', time.perf_counter() - stage_start)
+        converter.timer.print_report(args.profile_top)
+    if profiler:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(args.profile_out)
+        print(f"\ncProfile stats saved to: {args.profile_out} (top functions by cumulative time:)")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+    
+    if args.watch:
+        # Stage timings of the initial build are reported above, not per change
+        converter.timer = None
+        watch(converter)
+    
+    sys.exit(1 if errors else 0)
+
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Document Dependency Graph
+Which documents every generated page references, recorded during conversion.
+Answers "what must be rebuilt if X changes" and finds dangling section links.
+
+Usage:
+    python INDEX/doc_graph.py affected PDS/SynapsePDS_USML.md [...]
+    python INDEX/doc_graph.py dangling
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from doc_registry import USML_DOC
+
+GRAPH_NAME = 'doc_graph.json'
+
+
+class DocumentGraph:
+    """
+    Page -> referenced documents, one entry per source (key: path relative to repo root):
+        name     - document name of the source
+        links    - documents linked by name
+        sections - [document, anchor, heading id] of section links: the anchor derived
+                   from the reference and the heading it resolved to ('' if none)
+        includes - other sources injected into the page (*_scheme.md)
+        telegram - signature of the USML telegram table the page's telegram links
+                   were built from (None if the page has no telegram links)
+
+    A page is current while the telegram table it used is unchanged and its section
+    links still resolve to the same headings; plain links only depend on which
+    documents exist (part of the build fingerprint).
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': self.VERSION, 'entries': self.entries}
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+        tmp.replace(self.path)
+
+    def record(self, source: str, refs: dict, includes: Iterable[str] = ()):
+        """Store what a freshly built page references (refs from convert_file)"""
+        self.entries[source] = {
+            'name': Path(source).stem,
+            'links': sorted(refs.get('links', ())),
+            'sections': sorted([doc, anchor, target] for doc, anchor, target in refs.get('sections', ())),
+            'includes': sorted(includes),
+            'telegram': refs.get('telegram'),
+        }
+
+    def forget(self, source: str):
+        self.entries.pop(source, None)
+
+    def prune(self, sources: Iterable[str]):
+        keep = set(sources)
+        for key in list(self.entries):
+            if key not in keep:
+                del self.entries[key]
+
+    def is_current(self, source: str, telegram_signature: str, registry=None) -> bool:
+        entry = self.entries.get(source)
+        if entry is None:
+            return False
+        if registry is not None and any((registry.resolve_anchor(doc, anchor) or '') != target
+                                        for doc, anchor, target in entry['sections']):
+            return False
+        return entry['telegram'] is None or entry['telegram'] == telegram_signature
+
+    # --- Queries -------------------------------------------------------------
+
+    def dependents(self, changed: Iterable[str]) -> Set[str]:
+        """
+        Pages whose output may change when the given sources change (not counting
+        the sources themselves): pages including them, pages with section links into
+        them (headings may have changed), and for the USML document every page with
+        telegram links. Adding or removing a document affects every
+        page (the set of linkable names changes) and is not covered here.
+        """
+        changed = set(changed)
+        names = {Path(source).stem for source in changed}
+        result = set()
+        for source, entry in self.entries.items():
+            if changed & set(entry['includes']):
+                result.add(source)
+            elif any(doc in names for doc, _, _ in entry['sections']):
+                result.add(source)
+            elif USML_DOC in names and entry['telegram'] is not None:
+                result.add(source)
+        return result - changed
+
+    def referrers(self, name: str) -> Set[str]:
+        """Pages that link to a document (by name or by section link)"""
+        return {source for source, entry in self.entries.items()
+                if name in entry['links'] or any(doc == name for doc, _, _ in entry['sections'])}
+
+    def dangling(self, registry) -> List[Tuple[str, str, str]]:
+        """(source, document, anchor) of section links whose target does not exist"""
+        result = []
+        for source, entry in sorted(self.entries.items()):
+            for doc, anchor, _ in entry['sections']:
+                if not registry.resolve_anchor(doc, anchor):
+                    result.append((source, doc, anchor))
+        return result
+
+
+def main():
+    import argparse
+    from build_cache import CACHE_DIR_NAME
+    from doc_registry import REGISTRY_NAME, DocumentRegistry
+
+    parser = argparse.ArgumentParser(description="Synapse Document Dependency Graph")
+    sub = parser.add_subparsers(dest='command', required=True)
+    affected = sub.add_parser('affected', help="pages to rebuild if the given sources change")
+    affected.add_argument('sources', nargs='+', help="paths relative to the repository root")
+    sub.add_parser('dangling', help="section links pointing at missing documents or anchors")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parent.parent
+    cache_dir = repo_root / 'INDEX' / CACHE_DIR_NAME
+    graph = DocumentGraph(cache_dir / GRAPH_NAME)
+    if not graph.entries:
+        print("[!] No dependency graph yet, run INDEX/convert_to_html.py first")
+        return 1
+
+    if args.command == 'affected':
+        changed = [Path(s).as_posix() for s in args.sources]
+        for source in changed:
+            print(f"{source}{'' if source in graph.entries else '  (not built)'}")
+        for source in sorted(graph.dependents(changed)):
+            print(f"{source}  (dependent)")
+        for source in changed:
+            referrers = graph.referrers(Path(source).stem) - set(changed)
+            if referrers:
+                print(f"\nLinking to {Path(source).stem} (rebuilt if it is added, removed or renamed):")
+                for ref in sorted(referrers):
+                    print(f"  {ref}")
+    else:
+        registry = DocumentRegistry(repo_root, cache_dir / REGISTRY_NAME)
+        dangling = graph.dangling(registry)
+        for source, doc, anchor in dangling:
+            print(f"{source}: {doc}#{anchor}")
+        print(f"\n{len(dangling)} dangling section link(s)")
+        return 1 if dangling else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Document Registry
+Scans PRD/ and PDS/ once and answers every "which document is this" question
+the converter's link passes need: link targets, titles, heading anchors,
+injected schemes, icon folders and USML telegram sections.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DOC_FOLDERS = ('PRD', 'PDS')
+REGISTRY_NAME = 'doc_registry.json'
+
+# Document with the telegram reference (target of convert_telegram_links)
+USML_DOC = 'SynapsePDS_USML'
+
+# Folder with the icon SVGs shown on SynapsePDS_Icons_* pages
+ICONS_ROOT = 'MOBILE/Images/Ico'
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+_ICON_LINE_RE = re.compile(r'^(\d{3}_[a-zA-Z0-9_]+\.svg)')
+# "4.1. DALI_ — Работа с линией DALI" -> ("4.1.", "DALI_")
+_TELEGRAM_HEADING_RE = re.compile(r'^(\d+(?:\.\d+)*\.?)\s+([A-Z][A-Z0-9]*_)')
+# heading_id()
+_TAG_RE = re.compile(r'<[^>]+>')
+_NON_WORD_RE = re.compile(r'[^\w\s-]')
+_SEPARATOR_RE = re.compile(r'[\s_]+')
+
+
+def heading_id(text: str) -> str:
+    """Generate a URL-friendly id from heading text (same rule as the generated pages)"""
+    # Remove HTML tags
+    text = _TAG_RE.sub('', text)
+    # Convert to lowercase
+    text = text.lower()
+    # Replace spaces and special chars with hyphens
+    text = _NON_WORD_RE.sub('', text)
+    text = _SEPARATOR_RE.sub('-', text)
+    # Remove leading/trailing hyphens
+    text = text.strip('-')
+    return text
+
+
+def scan_document(md_file: Path, repo_root: Path) -> dict:
+    """Collect registry data from one markdown source"""
+    content = md_file.read_text(encoding='utf-8')
+    rel = md_file.relative_to(repo_root)
+
+    title = None
+    anchors = []
+    telegram = {}
+    svg_refs = []
+    in_fence = False
+    for line in content.split('\n'):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            level, text = len(heading.group(1)), heading.group(2)
+            if level == 1 and title is None:
+                title = text
+            # Only h2/h3 get ids on generated pages (add_heading_ids)
+            if level in (2, 3):
+                anchor = heading_id(text)
+                anchors.append(anchor)
+                section = _TELEGRAM_HEADING_RE.match(text)
+                if section:
+                    number, prefix = section.groups()
+                    telegram.setdefault(prefix, [anchor, f"{number} {prefix}"])
+            continue
+        icon = _ICON_LINE_RE.match(line)
+        if icon:
+            svg_refs.append(icon.group(1))
+
+    return {
+        'name': md_file.stem,
+        'md': rel.as_posix(),
+        'html': rel.with_suffix('.html').as_posix(),
+        'title': title or md_file.stem,
+        'anchors': anchors,
+        'telegram': telegram,
+        'svg_refs': svg_refs,
+    }
+
+
+class DocumentRegistry:
+    """
+    All documents under PRD/ and PDS/, keyed by name (file stem).
+
+    Built once per converter. Per-file scan results are cached in
+    INDEX/.cache/doc_registry.json and reused while the file's mtime/size match.
+    """
+
+    VERSION = 1
+
+    def __init__(self, repo_root: Path, cache_path: Optional[Path] = None):
+        self.repo_root = Path(repo_root)
+        self.cache_path = cache_path
+        self.docs: Dict[str, dict] = {}
+        self._icon_index: Optional[Dict[str, str]] = None
+        self.scan()
+
+    def _load_cache(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return data.get('files', {}) if data.get('version') == self.VERSION else {}
+
+    def _save_cache(self, files: dict):
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            data = {'version': self.VERSION, 'files': files}
+            tmp = self.cache_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+            tmp.replace(self.cache_path)
+        except OSError as e:
+            print(f"  [WARN] Failed to save document registry: {e}")
+
+    def scan(self):
+        """(Re)scan PRD/ and PDS/, reusing cached entries for unchanged files"""
+        cached = self._load_cache()
+        files = {}
+        docs = {}
+        for folder in DOC_FOLDERS:
+            folder_path = self.repo_root / folder
+            if not folder_path.exists():
+                continue
+            for md_file in sorted(folder_path.glob('*.md')):
+                rel = md_file.relative_to(self.repo_root).as_posix()
+                stat = md_file.stat()
+                stamp = [stat.st_mtime_ns, stat.st_size]
+                hit = cached.get(rel)
+                if hit and hit.get('stamp') == stamp:
+                    entry = hit['entry']
+                else:
+                    entry = scan_document(md_file, self.repo_root)
+                files[rel] = {'stamp': stamp, 'entry': entry}
+                docs[entry['name']] = entry
+        self.docs = docs
+        self._icon_index = None
+        if files != cached:
+            self._save_cache(files)
+
+    # --- Lookups -------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.docs.get(name)
+
+    def for_file(self, md_file: Path) -> Optional[dict]:
+        return self.docs.get(Path(md_file).stem)
+
+    def link_targets(self) -> Dict[str, str]:
+        """Document name -> HTML path relative to INDEX/"""
+        return {name: doc['html'] for name, doc in self.docs.items()}
+
+    def html_path(self, name: str) -> Optional[str]:
+        doc = self.docs.get(name)
+        return doc['html'] if doc else None
+
+    def has_anchor(self, name: str, anchor: str) -> bool:
+        doc = self.docs.get(name)
+        return bool(doc) and anchor in doc['anchors']
+
+    def resolve_anchor(self, name: str, anchor: str) -> Optional[str]:
+        """
+        Heading id a section reference points at: the anchor itself, or the only heading
+        that extends it ('5-структура-бд-прошивки' -> '5-структура-бд-прошивки-usm-прошивки',
+        references often quote a shortened title). None if missing or ambiguous.
+        """
+        doc = self.docs.get(name)
+        if not doc:
+            return None
+        if anchor in doc['anchors']:
+            return anchor
+        candidates = {a for a in doc['anchors'] if a.startswith(f"{anchor}-")}
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def telegram_sections(self) -> Dict[str, List[str]]:
+        """Telegram prefix (e.g. 'DALI_') -> [anchor, section title] in the USML document"""
+        doc = self.docs.get(USML_DOC)
+        return dict(doc['telegram']) if doc else {}
+
+    def scheme_file_for(self, md_file: Path) -> Optional[Path]:
+        """
+        Schema source injected into a page: <name>_scheme.md next to it.
+        Returned even if it does not exist yet (callers track it as a dependency).
+        """
+        md_file = Path(md_file)
+        if md_file.stem.endswith('_scheme'):
+            return None
+        return md_file.with_name(f"{md_file.stem}_scheme.md")
+
+    def _build_icon_index(self) -> Dict[str, str]:
+        """SVG file name -> icon folder (relative to repo root)"""
+        index = {}
+        icons_root = self.repo_root / ICONS_ROOT
+        if icons_root.exists():
+            for folder in sorted(p for p in icons_root.iterdir() if p.is_dir()):
+                for svg in folder.glob('*.svg'):
+                    index.setdefault(svg.name, f"{ICONS_ROOT}/{folder.name}")
+        return index
+
+    def icon_folder_for(self, md_file: Path) -> Optional[str]:
+        """Icon folder whose SVGs the page lists (the folder holding most of them)"""
+        doc = self.for_file(md_file)
+        if not doc or not doc['svg_refs']:
+            return None
+        if self._icon_index is None:
+            self._icon_index = self._build_icon_index()
+        votes: Dict[str, int] = {}
+        for svg in doc['svg_refs']:
+            folder = self._icon_index.get(svg)
+            if folder:
+                votes[folder] = votes.get(folder, 0) + 1
+        if not votes:
+            return None
+        return max(sorted(votes), key=lambda f: votes[f])
+
+    def link_signature(self) -> str:
+        """
+        Everything about the registry that affects links on every page (for build fingerprints).
+        The telegram table only affects pages with telegram links, see telegram_signature.
+        """
+        return json.dumps(self.link_targets(), sort_keys=True, ensure_ascii=False)
+
+    def telegram_signature(self) -> str:
+        """Identifies the current USML telegram table (recorded by pages that use it)"""
+        return json.dumps(self.telegram_sections(), sort_keys=True, ensure_ascii=False)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Documentation Watcher
+Reports debounced batches of changed documentation sources (convert_to_html.py --watch).
+Uses watchdog (inotify & co.) when installed, otherwise polls mtimes.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+# Try to import watchdog (optional)
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# Folders whose *.md files are watched, and single files (relative to repo root)
+WATCH_DIRS = ('PRD', 'PDS')
+WATCH_FILES = ('Project/process.md', 'Project/mindmap.md', 'Project/log.md')
+
+
+class ChangeWatcher:
+    """
+    Collects changes to the watched sources; wait() returns them in batches.
+
+    A batch is handed out once no new change arrived for `debounce` seconds, so an
+    editor's save (often several events) or a git checkout becomes one rebuild.
+    """
+
+    def __init__(self, repo_root: Path, debounce: float = 0.3, poll_interval: float = 0.5,
+                 use_watchdog: Optional[bool] = None):
+        self.repo_root = Path(repo_root)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_watchdog = WATCHDOG_AVAILABLE if use_watchdog is None else use_watchdog and WATCHDOG_AVAILABLE
+        self._files = {(self.repo_root / f).resolve() for f in WATCH_FILES}
+        self._pending: Set[Path] = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._observer = None
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+        if self.use_watchdog:
+            self._start_observer()
+        else:
+            self._snapshot = self._scan()
+
+    @property
+    def mode(self) -> str:
+        return 'watchdog' if self.use_watchdog else f'polling every {self.poll_interval:g} s'
+
+    def is_watched(self, path: Path) -> bool:
+        path = Path(path).resolve()
+        if path in self._files:
+            return True
+        return (path.suffix == '.md' and path.parent.name in WATCH_DIRS
+                and path.parent.parent == self.repo_root.resolve())
+
+    def _add(self, path: Path):
+        if self.is_watched(path):
+            with self._lock:
+                self._pending.add(Path(path).resolve())
+                self._last_event = time.monotonic()
+
+    # --- watchdog backend ----------------------------------------------------
+
+    def _start_observer(self):
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                watcher._add(Path(event.src_path))
+                # Renames (editors saving via a temp file) report the new name here
+                dest = getattr(event, 'dest_path', None)
+                if dest:
+                    watcher._add(Path(dest))
+
+        self._observer = Observer()
+        handler = Handler()
+        for folder in set(WATCH_DIRS) | {Path(f).parent.as_posix() for f in WATCH_FILES}:
+            path = self.repo_root / folder
+            if path.is_dir():
+                self._observer.schedule(handler, str(path), recursive=False)
+        self._observer.start()
+
+    # --- polling backend -----------------------------------------------------
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        paths = set(self._files)
+        for folder in WATCH_DIRS:
+            paths.update(p.resolve() for p in (self.repo_root / folder).glob('*.md'))
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self):
+        snapshot = self._scan()
+        for path in set(snapshot) | set(self._snapshot):
+            if snapshot.get(path) != self._snapshot.get(path):
+                self._add(path)
+        self._snapshot = snapshot
+
+    # --- API -----------------------------------------------------------------
+
+    def wait(self) -> Set[Path]:
+        """Block until a debounced batch of changed (or deleted) paths is available"""
+        while True:
+            if not self.use_watchdog:
+                self._poll()
+            with self._lock:
+                quiet = time.monotonic() - self._last_event >= self.debounce
+                if self._pending and quiet:
+                    batch, self._pending = self._pending, set()
+                    return batch
+            time.sleep(min(self.debounce, self.poll_interval) if self.use_watchdog else self.poll_interval)
+
+    def close(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
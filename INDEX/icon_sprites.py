@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Icon Sprites
+One inline SVG sprite per icon folder (convert_to_html.py --icon-sprites): every icon
+becomes a <symbol>, the SynapsePDS_Icons_* pages embed the sprite once and draw icons
+with <use href="#...">, so a catalog page loads in a single request.
+Sprites are cached in INDEX/.cache/sprites/ by folder content hash.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_cache import CACHE_DIR_NAME, file_hash
+from optimize_images import minify_svg
+
+# Bump when the sprite markup changes, so cached sprites are rebuilt
+SPRITE_VERSION = 2
+SPRITES_DIR_NAME = 'sprites'
+
+_ROOT_RE = re.compile(r'^<svg\b([^>]*)>(.*)</svg>$', re.DOTALL)
+_ATTR_RE = re.compile(r'([\w:.-]+)="([^"]*)"')
+_ID_RE = re.compile(r'\bid="([^"]+)"')
+# Root attributes that describe the document, not how its content is painted
+_ROOT_ONLY_ATTRS = {'xmlns', 'xmlns:xlink', 'width', 'height', 'viewBox', 'version', 'x', 'y'}
+
+# Hidden container: not display:none, which breaks clipPath/gradient references in use
+SPRITE_STYLE = 'position: absolute; width: 0; height: 0; overflow: hidden;'
+
+
+def symbol_id(svg_filename: str) -> str:
+    """100_default.svg -> icon-100_default"""
+    return f"icon-{Path(svg_filename).stem}"
+
+
+def svg_to_symbol(text: str, sym_id: str) -> str:
+    """
+    Icon SVG -> <symbol id=sym_id>. The root's paint attributes (fill="none", ...) move
+    to a wrapping <g>; ids inside the icon (clip paths) get the symbol id as prefix, so
+    icons of one sprite cannot collide.
+    """
+    match = _ROOT_RE.match(minify_svg(text).strip())
+    if not match:
+        raise ValueError("no <svg> root element")
+    attrs = dict(_ATTR_RE.findall(match.group(1)))
+    body = match.group(2)
+
+    for old_id in set(_ID_RE.findall(body)):
+        new_id = f"{sym_id}-{old_id}"
+        body = body.replace(f'id="{old_id}"', f'id="{new_id}"')
+        body = body.replace(f'url(#{old_id})', f'url(#{new_id})')
+        body = body.replace(f'href="#{old_id}"', f'href="#{new_id}"')
+
+    view_box = attrs.get('viewBox') or f"0 0 {attrs.get('width', '32')} {attrs.get('height', '32')}"
+    paint = ''.join(f' {key}="{value}"' for key, value in attrs.items() if key not in _ROOT_ONLY_ATTRS)
+    if paint:
+        body = f'<g{paint}>{body}</g>'
+    return f'<symbol id="{sym_id}" viewBox="{view_box}">{body}</symbol>'
+
+
+class IconSprites:
+    """
+    Sprites of the icon folders, built on first use.
+
+    The cached sprite of a folder is INDEX/.cache/sprites/<folder>.<hash>.svg, where
+    hash covers the names and contents of the folder's SVGs (and SPRITE_VERSION);
+    older sprites of the folder are removed when a new one is built.
+    """
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = Path(repo_root)
+        self.cache_dir = self.repo_root / 'INDEX' / CACHE_DIR_NAME / SPRITES_DIR_NAME
+        self._sprites: Dict[str, Tuple[str, frozenset]] = {}
+
+    def sources(self, icon_folder: str) -> List[Path]:
+        """SVG files bundled into the sprite of an icon folder (relative to repo root)"""
+        return sorted((self.repo_root / icon_folder).glob('*.svg'))
+
+    def folder_hash(self, icon_folder: str) -> str:
+        h = hashlib.sha256(f"sprite:{SPRITE_VERSION}\n".encode('utf-8'))
+        for svg in self.sources(icon_folder):
+            h.update(f"{svg.name}={file_hash(svg)}\n".encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    def sprite(self, icon_folder: str) -> str:
+        """Inline <svg> holding one <symbol> per icon of the folder"""
+        return self._load(icon_folder)[0]
+
+    def has_icon(self, icon_folder: str, svg_filename: str) -> bool:
+        return symbol_id(svg_filename) in self._load(icon_folder)[1]
+
+    def _load(self, icon_folder: str) -> Tuple[str, frozenset]:
+        if icon_folder not in self._sprites:
+            sprite = self._read_or_build(icon_folder)
+            self._sprites[icon_folder] = (sprite, frozenset(re.findall(r'<symbol id="([^"]+)"', sprite)))
+        return self._sprites[icon_folder]
+
+    def _read_or_build(self, icon_folder: str) -> str:
+        name = Path(icon_folder).name
+        cached = self.cache_dir / f"{name}.{self.folder_hash(icon_folder)}.svg"
+        try:
+            return cached.read_text(encoding='utf-8')
+        except OSError:
+            pass
+
+        symbols = []
+        for svg in self.sources(icon_folder):
+            try:
+                symbols.append(svg_to_symbol(svg.read_text(encoding='utf-8'), symbol_id(svg.name)))
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                print(f"  [WARN] Icon {svg.name} left out of the {name} sprite: {e}")
+        sprite = (f'<svg xmlns="http://www.w3.org/2000/svg" aria-hidden="true" style="{SPRITE_STYLE}">'
+                  + ''.join(symbols) + '</svg>')
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for old in self.cache_dir.glob(f"{name}.*.svg"):
+                old.unlink()
+            tmp = cached.with_suffix('.tmp')
+            tmp.write_text(sprite, encoding='utf-8')
+            tmp.replace(cached)
+        except OSError as e:
+            print(f"  [WARN] Failed to cache the {name} sprite: {e}")
+        return sprite
+
+    def use_tag(self, svg_filename: str, size: int = 64, style: Optional[str] = None) -> str:
+        """Icon drawn from the page's sprite"""
+        style_attr = f' style="{style}"' if style else ''
+        return (f'<svg width="{size}" height="{size}" role="img" aria-label="{svg_filename}"{style_attr}>'
+                f'<use href="#{symbol_id(svg_filename)}"/></svg>')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Index Page
+INDEX/index.html loaded once: every generated section (diagrams, ship log, ...)
+is replaced in memory and the page is written once, atomically, only if it changed
+"""
+
+import re
+from pathlib import Path
+from typing import Callable, Optional
+
+from build_cache import OutputWriter
+from mermaid_render import PRERENDERED_ATTR
+
+# Ship log entries inside <div class="hero-log"> (update_ship_log).
+# Whitespace after the <h3> stays outside the groups, so repeated updates are idempotent.
+SHIP_LOG_RE = re.compile(
+    r'(<div class="hero-log">.*?<h3>Судовой журнал</h3>)\s*((?:<div class="log-entry">.*?</div>\s*)+)(\s*</div>)',
+    re.DOTALL,
+)
+
+
+def diagram_pattern(diagram_id: str) -> re.Pattern:
+    """Mermaid diagram <div class="mermaid" id="..."> and its content (code or a pre-rendered SVG)"""
+    # A pre-rendered SVG may contain <div>s (HTML labels), so it is matched as a whole
+    return re.compile(rf'(<div class="mermaid" id="{re.escape(diagram_id)}"[^>]*>)((?:\s*<svg\b.*?</svg>)?.*?)(</div>)',
+                      re.DOTALL)
+
+
+class IndexPage:
+    """
+    In-memory INDEX/index.html.
+
+    Updaters call replace()/replace_diagram()/replace_ship_log(), then save() writes
+    the page once (through OutputWriter: atomic, skipped when nothing changed).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.original = self.path.read_text(encoding='utf-8')
+        self.html = self.original
+
+    @property
+    def changed(self) -> bool:
+        return self.html != self.original
+
+    def replace(self, pattern: re.Pattern, repl: Callable[[re.Match], str]) -> int:
+        """Replace every match of a section pattern. Returns the number of matches."""
+        self.html, count = pattern.subn(repl, self.html)
+        return count
+
+    def replace_diagram(self, diagram_id: str, diagram_content: str, prerendered: bool = False) -> bool:
+        """
+        Put new Mermaid code (or a pre-rendered SVG, prerendered=True) into a diagram div.
+        Returns True if the page changed.
+        """
+        before = self.html
+
+        def replace_diagram(match):
+            # data-processed makes Mermaid skip a div that already holds an SVG
+            opening_tag = match.group(1).replace(PRERENDERED_ATTR, '')
+            if prerendered:
+                opening_tag = opening_tag[:-1] + PRERENDERED_ATTR + '>'
+            closing_tag = match.group(3)
+            return f'{opening_tag}\n{diagram_content}\n            {closing_tag}'
+
+        self.replace(diagram_pattern(diagram_id), replace_diagram)
+        return self.html != before
+
+    def replace_ship_log(self, log_html: str) -> bool:
+        """Replace the ship log entries. Returns False if the log section was not found."""
+
+        def replace_log(match):
+            before = match.group(1)
+            after = match.group(3)
+            return before + '\n' + log_html + '\n        ' + after
+
+        return self.replace(SHIP_LOG_RE, replace_log) > 0
+
+    def save(self, writer: Optional[OutputWriter] = None) -> bool:
+        """Write the page if any section changed. Returns True if the file was written."""
+        if not self.changed:
+            return False
+        written = (writer or OutputWriter()).write_text(self.path, self.html)
+        self.original = self.html
+        return written
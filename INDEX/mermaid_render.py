@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Mermaid Renderer
+Optional build-time rendering of Mermaid diagrams to static SVG
+(convert_to_html.py --prerender-diagrams) with a locally installed mermaid-cli (mmdc).
+Rendered SVGs are cached in INDEX/.cache/mermaid/ by a hash of the diagram source,
+so unchanged diagrams are never rendered again. Without mmdc, or when a diagram
+fails to render, pages keep the client-side Mermaid renderer.
+
+Environment:
+    SYNAPSE_MMDC       - mmdc executable (default: mmdc on PATH)
+    SYNAPSE_MMDC_ARGS  - extra mmdc arguments, e.g. "-p puppeteer.json"
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+# Bump when the rendering setup changes, so cached SVGs are redone
+RENDER_VERSION = 1
+MERMAID_CACHE_DIR_NAME = 'mermaid'
+
+# Mermaid settings of the generated pages (see HTML_TEMPLATE / DIAGRAM_TEMPLATE)
+DEFAULT_CONFIG = {'theme': 'default', 'securityLevel': 'loose'}
+
+# Marks a diagram div that already holds a pre-rendered SVG (Mermaid skips it)
+PRERENDERED_ATTR = ' data-processed="true"'
+
+_PROLOG_RE = re.compile(r'^\s*<\?xml[^>]*\?>\s*')
+
+
+class MermaidRenderer:
+    """
+    Mermaid source -> static SVG through mmdc, cached per source.
+
+    The cache key covers the source, the Mermaid config, RENDER_VERSION and the
+    renderer executable (path + mtime, so an upgraded mmdc renders again). A diagram
+    mmdc rejects is cached too (<key>.err), so a broken diagram is not retried every
+    build; timeouts and failures to start mmdc are not cached and retried next time.
+    """
+
+    def __init__(self, cache_dir: Path, command: Optional[str] = None, timeout: float = 60):
+        self.cache_dir = Path(cache_dir) / MERMAID_CACHE_DIR_NAME
+        # Bare names (SYNAPSE_MMDC=mmdc) are looked up on PATH
+        command = command or os.environ.get('SYNAPSE_MMDC') or 'mmdc'
+        self.command = shutil.which(command)
+        self.extra_args = shlex.split(os.environ.get('SYNAPSE_MMDC_ARGS', ''))
+        self.timeout = timeout
+        self.rendered = 0
+        self.cached = 0
+        self.failed = 0
+
+    @property
+    def available(self) -> bool:
+        return bool(self.command)
+
+    def signature(self) -> str:
+        """Identity of the renderer (for build fingerprints): empty when mmdc is missing"""
+        if not self.available:
+            return ''
+        stat = Path(self.command).stat()
+        return f"{RENDER_VERSION}:{Path(self.command).resolve()}:{stat.st_mtime_ns}:{' '.join(self.extra_args)}"
+
+    def key(self, code: str, config: Optional[Dict] = None) -> str:
+        config = json.dumps(config or DEFAULT_CONFIG, sort_keys=True)
+        return hashlib.sha256(f"{self.signature()}\0{config}\0{code.strip()}".encode('utf-8')).hexdigest()
+
+    def render(self, code: str, config: Optional[Dict] = None) -> Optional[str]:
+        """Static SVG markup of a diagram, or None (renderer missing or diagram failed)"""
+        if not self.available:
+            return None
+        key = self.key(code, config)
+        svg_path = self.cache_dir / f"{key}.svg"
+        try:
+            svg = svg_path.read_text(encoding='utf-8')
+            self.cached += 1
+            return svg
+        except OSError:
+            pass
+        if (self.cache_dir / f"{key}.err").exists():
+            self.cached += 1
+            return None
+
+        svg, error, transient = self._run_mmdc(code.strip(), config or DEFAULT_CONFIG, f"mermaid-{key[:12]}")
+        if svg is None:
+            self.failed += 1
+            print(f"  [WARN] Mermaid pre-render failed, using the JS renderer: {error}")
+            if not transient:
+                self._store(self.cache_dir / f"{key}.err", error)
+            return None
+        self.rendered += 1
+        self._store(svg_path, svg)
+        return svg
+
+    def _run_mmdc(self, code: str, config: Dict, svg_id: str):
+        """
+        Run mmdc on one diagram. Returns (svg, None, False) or (None, error message,
+        transient): transient errors (timeout, mmdc could not run) say nothing about the diagram.
+        """
+        with tempfile.TemporaryDirectory(prefix='synapse-mmdc-') as tmp:
+            tmp = Path(tmp)
+            (tmp / 'diagram.mmd').write_text(code, encoding='utf-8')
+            (tmp / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+            # Unique svg id per diagram: mmdc scopes its <style> to it, and several
+            # diagrams share a page
+            cmd = [self.command, '-i', str(tmp / 'diagram.mmd'), '-o', str(tmp / 'diagram.svg'),
+                   '-c', str(tmp / 'config.json'), '-b', 'transparent', '-I', svg_id, '-q'] + self.extra_args
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                return None, str(e), True
+            if proc.returncode != 0:
+                message = (proc.stderr or proc.stdout).strip().splitlines()
+                return None, message[-1] if message else f"mmdc exited with {proc.returncode}", False
+            try:
+                svg = (tmp / 'diagram.svg').read_text(encoding='utf-8')
+            except OSError as e:
+                return None, str(e), True
+        return _PROLOG_RE.sub('', svg).strip(), None, False
+
+    def _store(self, path: Path, text: str):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: parallel build workers may render the same diagram
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"  [WARN] Failed to cache rendered diagram: {e}")
+
+    def report(self):
+        if not self.available:
+            print("  [-] mmdc not found, diagrams are rendered in the browser "
+                  "(npm install -g @mermaid-js/mermaid-cli, or set SYNAPSE_MMDC)")
+        elif self.rendered or self.failed:
+            print(f"  [OK] Diagrams pre-rendered: {self.rendered} new, {self.cached} cached, {self.failed} failed")
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synapse Image Optimizer
+Build stage for published images (convert_to_html.py --optimize-images):
+- PNGs under INDEX/assets/img: size variants <name>.w<width>.png next to them (with Pillow,
+  convert_to_html.py --image-variants), offered to browsers through srcset (ImageVariants)
+- icon SVGs under MOBILE/Images/Ico: minified copies in INDEX/assets/icons/<folder>/
+Results are cached by content hash (INDEX/.cache/image_cache.json), so only new or
+changed images are processed. The stage never modifies the source images.
+
+Lossless recompression of the PNGs themselves edits tracked files, so it is a separate
+one-off command (--recompress-png) whose result is reviewed and committed by hand.
+
+Usage:
+    python INDEX/optimize_images.py [--precision N] [--variants 480 960] [--force]
+    python INDEX/optimize_images.py --recompress-png
+"""
+
+import hashlib
+import io
+import json
+import re
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_cache import CACHE_DIR_NAME, OutputWriter
+from doc_registry import ICONS_ROOT
+
+# Try to import Pillow (optional, only needed for size variants)
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Bump when the optimizers change, so cached results are redone
+OPTIMIZER_VERSION = 3
+IMAGE_CACHE_NAME = 'image_cache.json'
+
+PNG_ROOT = 'INDEX/assets/img'
+# Minified icons, mirroring the ICONS_ROOT folders
+ICONS_OUT_ROOT = 'INDEX/assets/icons'
+
+# Variant / fingerprinted file names are outputs, never inputs
+_DERIVED_NAME_RE = re.compile(r'\.(?:w\d+|[0-9a-f]{10})\.png$')
+
+
+# --- PNG -----------------------------------------------------------------------
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Animated PNGs keep their frames in fdAT chunks; left alone
+_PNG_ANIMATION_CHUNKS = {b'acTL', b'fcTL', b'fdAT'}
+
+
+def _png_chunks(data: bytes) -> List[Tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        chunks.append((kind, data[pos + 8:pos + 8 + length]))
+        pos += 12 + length
+        if kind == b'IEND':
+            break
+    return chunks
+
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body) & 0xffffffff)
+
+
+def recompress_png(data: bytes) -> bytes:
+    """
+    Lossless PNG recompression: the image data (IDAT) is inflated and deflated again
+    at maximum compression, every other chunk (metadata included) is kept as is. The
+    filtered scanlines are unchanged, so pixels are identical. Returns the original if
+    nothing is gained.
+    """
+    chunks = _png_chunks(data)
+    if any(kind in _PNG_ANIMATION_CHUNKS for kind, _ in chunks):
+        return data
+    raw = zlib.decompress(b''.join(body for kind, body in chunks if kind == b'IDAT'))
+
+    best = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        packed = compressor.compress(raw) + compressor.flush()
+        if best is None or len(packed) < len(best):
+            best = packed
+
+    out = [PNG_SIGNATURE]
+    idat_written = False
+    for kind, body in chunks:
+        if kind == b'IDAT':
+            if not idat_written:
+                out.append(_png_chunk(b'IDAT', best))
+                idat_written = True
+            continue
+        out.append(_png_chunk(kind, body))
+    result = b''.join(out)
+    return result if len(result) < len(data) else data
+
+
+def png_size(data: bytes) -> Tuple[int, int]:
+    """(width, height) from the IHDR chunk"""
+    return struct.unpack('>II', data[16:24])
+
+
+def variant_name(path: Path, width: int) -> Path:
+    """Size variant of a PNG: img/logo.png -> img/logo.w480.png"""
+    return path.with_name(f"{path.stem}.w{width}.png")
+
+
+_IMG_TAG_RE = re.compile(r'<img\b[^>]*>')
+_IMG_PNG_SRC_RE = re.compile(r'\bsrc="(?P<prefix>(?:\.\./)*)assets/(?P<path>[^"?#]+\.png)"')
+_CSS_HEIGHT_RE = re.compile(r'\bheight:\s*(\d+(?:\.\d+)?)px')
+
+
+class ImageVariants:
+    """
+    srcset for generated pages.
+
+    An <img> pointing at assets/.../<name>.png whose size variants exist gets
+    srcset="<name>.w480.png 480w, ..., <name>.png <width>w", plus sizes (the rendered
+    width) when the tag sets a CSS height in px. Tags that already have a srcset are
+    left alone.
+    """
+
+    def __init__(self, assets_root: Path, widths=()):
+        self.assets_root = Path(assets_root)
+        self.widths = tuple(sorted(set(widths)))
+        self._found: Dict[str, Tuple[List[Tuple[str, int]], Tuple[int, int]]] = {}
+
+    def candidates(self, path: str) -> List[Tuple[str, int]]:
+        """assets-relative PNG path -> [(assets-relative path, width)], smallest first ([] without variants)"""
+        return self._lookup(path)[0]
+
+    def _lookup(self, path: str):
+        if path not in self._found:
+            src = self.assets_root / path
+            try:
+                with open(src, 'rb') as f:
+                    size = png_size(f.read(24))
+            except (OSError, struct.error):
+                size = (0, 0)
+            found = [(variant_name(src, width).relative_to(self.assets_root).as_posix(), width)
+                     for width in self.widths
+                     if width < size[0] and variant_name(src, width).exists()]
+            self._found[path] = (found + [(path, size[0])] if found else [], size)
+        return self._found[path]
+
+    def rewrite(self, html: str) -> str:
+        def replace(match):
+            tag = match.group(0)
+            src = _IMG_PNG_SRC_RE.search(tag)
+            if not src or 'srcset=' in tag:
+                return tag
+            candidates, (width, height) = self._lookup(src.group('path'))
+            if not candidates:
+                return tag
+            srcset = ', '.join(f"{src.group('prefix')}assets/{path} {w}w" for path, w in candidates)
+            extra = f' srcset="{srcset}"'
+            css_height = _CSS_HEIGHT_RE.search(tag)
+            if css_height:
+                extra += f' sizes="{round(float(css_height.group(1)) * width / height)}px"'
+            return tag[:src.end()] + extra + tag[src.end():]
+
+        return _IMG_TAG_RE.sub(replace, html)
+
+    def signature(self, paths) -> str:
+        """Variants of the given assets-relative PNG paths (for build fingerprints)"""
+        return '\n'.join(f"{path}={self.candidates(path)}" for path in sorted(set(paths)) if path.endswith('.png'))
+
+
+# --- SVG -----------------------------------------------------------------------
+
+_NUMBER_RE = re.compile(r'-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+_TAG_RE = re.compile(r'<(/?)([A-Za-z][\w:.-]*)((?:\s+[\w:.-]+\s*=\s*"[^"]*")*)\s*(/?)>')
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*"([^"]*)"')
+_COMMENT_RE = re.compile(r'<!--.*?-->|<\?xml.*?\?>', re.DOTALL)
+_REFERENCE_RE = re.compile(r'url\(#([^)]+)\)|href="#([^"]+)"')
+# Attributes holding plain coordinates / lengths that can be rounded. Not transform:
+# rounding matrix/rotate/scale terms distorts the whole element.
+_NUMERIC_ATTRS = {'d', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+                  'width', 'height', 'points', 'stroke-width', 'viewBox'}
+_PAINT_ATTRS = ('fill', 'stroke')
+
+
+def format_number(value: float, precision: int) -> str:
+    """Shortest form of a rounded number: 32.000000 -> 32, 0.50 -> .5, -0.0 -> 0"""
+    text = f"{round(value, precision):.{precision}f}".rstrip('0').rstrip('.') if precision > 0 else str(round(value))
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def round_numbers(value: str, precision: int) -> str:
+    return _NUMBER_RE.sub(lambda m: format_number(float(m.group(0)), precision), value)
+
+
+def _is_invisible_rect(attrs: Dict[str, str], inherited: Dict[str, Optional[str]]) -> bool:
+    """
+    Placeholder frame: a <rect> that paints nothing. inherited holds the fill and stroke
+    of the enclosing elements; rects with a style attribute are always kept.
+    """
+    if 'style' in attrs:
+        return False
+    if attrs.get('stroke', inherited['stroke'] or 'none') != 'none':
+        return False
+    if attrs.get('fill-opacity') == '0' or attrs.get('opacity') == '0':
+        return True
+    return attrs.get('fill', inherited['fill']) == 'none'
+
+
+def minify_svg(text: str, precision: int = 2) -> str:
+    """
+    Minify an icon SVG without changing how it renders:
+    drop comments, whitespace and invisible <rect> frames (outside <defs>), drop ids
+    nothing references, round coordinates to `precision` decimals.
+    """
+    text = _COMMENT_RE.sub('', text)
+    referenced = {a or b for a, b in _REFERENCE_RE.findall(text)}
+    uses_xlink = 'xlink:' in text.replace('xmlns:xlink', '')
+
+    out = []
+    # Paint inherited from the enclosing elements (None = SVG default: black fill, no stroke)
+    paints: List[Dict[str, Optional[str]]] = [{'fill': None, 'stroke': None}]
+    defs_depth = 0
+    pos = 0
+    for match in _TAG_RE.finditer(text):
+        between = text[pos:match.start()].strip()
+        if between:
+            out.append(between)
+        pos = match.end()
+        closing, name, raw_attrs, self_closing = match.groups()
+        if closing:
+            if name == 'defs':
+                defs_depth -= 1
+            if len(paints) > 1:
+                paints.pop()
+            out.append(f'</{name}>')
+            continue
+        attrs = dict(_ATTR_RE.findall(raw_attrs))
+        if name == 'svg' and not uses_xlink:
+            attrs.pop('xmlns:xlink', None)
+        if name == 'rect' and defs_depth == 0 and _is_invisible_rect(attrs, paints[-1]):
+            continue
+        if 'id' in attrs and attrs['id'] not in referenced:
+            del attrs['id']
+        for key in list(attrs):
+            if key in _NUMERIC_ATTRS:
+                attrs[key] = round_numbers(attrs[key], precision)
+        if not self_closing:
+            paints.append({key: attrs.get(key, paints[-1][key]) for key in _PAINT_ATTRS})
+            if name == 'defs':
+                defs_depth += 1
+        rendered = ''.join(f' {key}="{value}"' for key, value in attrs.items())
+        out.append(f'<{name}{rendered}{"/" if self_closing else ""}>')
+    return ''.join(out)
+
+
+# --- Stage ---------------------------------------------------------------------
+
+class ImageOptimizer:
+    """
+    Runs the image optimizations with a content-hash cache.
+
+    Cache entry per input (key: path relative to repo root):
+        key     - hash of the input + optimizer version + settings
+        outputs - files produced (relative paths)
+    An input is skipped while its current hash matches `key` and all outputs exist.
+    """
+
+    def __init__(self, repo_root: Path, writer: Optional[OutputWriter] = None,
+                 precision: int = 2, variant_widths=(), force: bool = False):
+        self.repo_root = Path(repo_root)
+        self.writer = writer or OutputWriter()
+        self.precision = precision
+        self.variant_widths = tuple(sorted(set(variant_widths)))
+        self.force = force
+        self.cache_path = self.repo_root / 'INDEX' / CACHE_DIR_NAME / IMAGE_CACHE_NAME
+        self.cache: Dict[str, dict] = self._load_cache()
+        self.stats = {'processed': 0, 'cached': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+    def _load_cache(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return data.get('entries', {}) if data.get('version') == OPTIMIZER_VERSION else {}
+
+    def _save_cache(self):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            data = {'version': OPTIMIZER_VERSION, 'entries': self.cache}
+            tmp = self.cache_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+            tmp.replace(self.cache_path)
+        except OSError as e:
+            print(f"  [WARN] Failed to save image cache: {e}")
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.repo_root).as_posix()
+
+    def _key(self, data: bytes, settings: str) -> str:
+        return hashlib.sha256(data + f"\0{OPTIMIZER_VERSION}\0{settings}".encode('utf-8')).hexdigest()
+
+    def _is_cached(self, rel: str, key: str) -> bool:
+        entry = self.cache.get(rel)
+        if self.force or not entry or entry['key'] != key:
+            return False
+        return all((self.repo_root / out).exists() for out in entry['outputs'])
+
+    # --- PNG -----------------------------------------------------------------
+
+    def png_variants(self, path: Path):
+        """Size variants of one PNG (stale ones, e.g. of a width no longer configured, are removed)"""
+        rel = self._rel(path)
+        data = path.read_bytes()
+        key = self._key(data, f"png-variants:{self.variant_widths}")
+        if self._is_cached(rel, key):
+            self.stats['cached'] += 1
+            return
+        try:
+            outputs = self._png_variants(path)
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            print(f"  [WARN] Skipped {rel}: {e}")
+            return
+        variant_re = re.compile(re.escape(path.stem) + r'\.w\d+\.png')
+        for stale in path.parent.glob(f"{path.stem}.w*.png"):
+            if self._rel(stale) not in outputs and variant_re.fullmatch(stale.name):
+                stale.unlink()
+                print(f"  > Removed stale variant: {self._rel(stale)}")
+        self.stats['processed'] += 1
+        self.cache[rel] = {'key': key, 'outputs': outputs}
+
+    def _png_variants(self, path: Path) -> List[str]:
+        """Downscaled copies <name>.w<width>.png for every configured width below the original"""
+        outputs = []
+        with Image.open(path) as image:
+            for width in self.variant_widths:
+                if width >= image.width:
+                    continue
+                height = max(1, round(image.height * width / image.width))
+                variant = image.resize((width, height), Image.LANCZOS)
+                variant_path = variant_name(path, width)
+                buf = io.BytesIO()
+                variant.save(buf, format='PNG', optimize=True)
+                self.writer.write_bytes(variant_path, recompress_png(buf.getvalue()))
+                outputs.append(self._rel(variant_path))
+        return outputs
+
+    # --- SVG -----------------------------------------------------------------
+
+    def minify_icon(self, src: Path, dst: Path):
+        rel = self._rel(src)
+        data = src.read_bytes()
+        key = self._key(data, f"svg:{self.precision}")
+        if self._is_cached(rel, key):
+            self.stats['cached'] += 1
+            return
+        minified = minify_svg(data.decode('utf-8'), self.precision).encode('utf-8')
+        self.writer.write_bytes(dst, minified)
+        self.stats['processed'] += 1
+        self.stats['bytes_before'] += len(data)
+        self.stats['bytes_after'] += len(minified)
+        self.cache[rel] = {'key': key, 'outputs': [self._rel(dst)]}
+
+    # --- Run -----------------------------------------------------------------
+
+    def png_sources(self) -> List[Path]:
+        """PNGs under PNG_ROOT, without generated variants and fingerprinted copies"""
+        png_root = self.repo_root / PNG_ROOT
+        paths = sorted(png_root.rglob('*.png')) if png_root.exists() else []
+        return [path for path in paths if not _DERIVED_NAME_RE.search(path.name)]
+
+    def recompress_sources(self):
+        """One-off: recompress the PNG sources in place (not part of the build stage, not cached)"""
+        for path in self.png_sources():
+            data = path.read_bytes()
+            try:
+                optimized = recompress_png(data)
+            except (ValueError, zlib.error, struct.error) as e:
+                print(f"  [WARN] Skipped {self._rel(path)}: {e}")
+                continue
+            if self.writer.write_bytes(path, optimized):
+                print(f"  > Recompressed: {self._rel(path)} ({len(data) // 1024} -> {len(optimized) // 1024} KB)")
+            self.stats['processed'] += 1
+            self.stats['bytes_before'] += len(data)
+            self.stats['bytes_after'] += len(optimized)
+        return self.stats
+
+    def run(self):
+        if self.variant_widths and PIL_AVAILABLE:
+            for path in self.png_sources():
+                self.png_variants(path)
+
+        icons_src = self.repo_root / ICONS_ROOT
+        icons_out = self.repo_root / ICONS_OUT_ROOT
+        sources = sorted(icons_src.rglob('*.svg')) if icons_src.exists() else []
+        for src in sources:
+            self.minify_icon(src, icons_out / src.relative_to(icons_src))
+
+        # Minified icons whose source is gone
+        expected = {icons_out / src.relative_to(icons_src) for src in sources}
+        for stale in sorted(icons_out.rglob('*.svg')) if icons_out.exists() else []:
+            if stale not in expected:
+                stale.unlink()
+                print(f"  > Removed stale icon: {self._rel(stale)}")
+        live = {self._rel(p) for p in sources}
+        if self.variant_widths and PIL_AVAILABLE:
+            live.update(self._rel(p) for p in self.png_sources())
+        for rel in list(self.cache):
+            if rel not in live:
+                del self.cache[rel]
+
+        self._save_cache()
+        return self.stats
+
+    def report(self):
+        stats = self.stats
+        saved = stats['bytes_before'] - stats['bytes_after']
+        print(f"  [OK] Images: {stats['processed']} optimized, {stats['cached']} cached"
+              + (f", {saved / 1024:.0f} KB saved" if stats['bytes_before'] else ''))
+        if self.variant_widths and not PIL_AVAILABLE:
+            print("  [-] Pillow not installed, PNG size variants skipped (pip install Pillow)")
+        sys.stdout.flush()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Synapse Image Optimizer")
+    parser.add_argument('--precision', type=int, default=2,
+                        help="decimals kept in SVG coordinates (default 2, icons are 32x32)")
+    parser.add_argument('--variants', type=int, nargs='*', default=[],
+                        help="widths of downscaled PNG variants (needs Pillow)")
+    parser.add_argument('--force', action='store_true', help="ignore the cache")
+    parser.add_argument('--recompress-png', action='store_true',
+                        help=f"only recompress the PNGs under {PNG_ROOT} in place (edits tracked files)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parent.parent
+    optimizer = ImageOptimizer(repo_root, precision=args.precision,
+                               variant_widths=args.variants, force=args.force)
+    print("Synapse Image Optimizer")
+    print("=" * 50)
+    if args.recompress_png:
+        optimizer.recompress_sources()
+    else:
+        optimizer.run()
+    optimizer.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""INDEX modules import their siblings directly (as when run from INDEX/)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""AssetFetcher against a local stand-in for the UXL server"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from asset_fetch import FAILED, FRESH, NOT_MODIFIED, OFFLINE, UPDATED, AssetFetcher
+
+
+class StandInServer:
+    """Serves `files` ({path: bytes}) with ETags; answers 304 to a matching If-None-Match"""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.broken = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                if self.path in server.broken or self.path not in server.files:
+                    self.send_error(500 if self.path in server.broken else 404)
+                    return
+                body = server.files[self.path]
+                etag = f'"{len(body)}-{hash(body) & 0xffffffff:x}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    server.files = {'/uxl.css': b'body {}', '/uxl.js': b'var UXL = {};'}
+    yield server
+    server.close()
+
+
+def make_fetcher(tmp_path, **kwargs):
+    kwargs.setdefault('timeout', 5)
+    return AssetFetcher(tmp_path / 'cache' / 'asset_fetch.json', repo_root=tmp_path, **kwargs)
+
+
+def test_first_fetch_downloads_and_stores_validators(server, tmp_path):
+    fetcher = make_fetcher(tmp_path)
+    dst = tmp_path / 'assets' / 'uxl.css'
+    assert fetcher.fetch([(f"{server.url}/uxl.css", dst)]) == [UPDATED]
+    assert dst.read_bytes() == b'body {}'
+    meta = json.loads((tmp_path / 'cache' / 'asset_fetch.json').read_text(encoding='utf-8'))
+    assert meta['entries']['assets/uxl.css']['etag']
+
+
+def test_unchanged_asset_is_not_downloaded_again(server, tmp_path):
+    dst = tmp_path / 'uxl.css'
+    make_fetcher(tmp_path).fetch([(f"{server.url}/uxl.css", dst)])
+    # A new fetcher (next build) reads the validators back from the metadata file
+    assert make_fetcher(tmp_path).fetch([(f"{server.url}/uxl.css", dst)]) == [NOT_MODIFIED]
+    assert 'If-None-Match' in server.requests[-1][1]
+    assert dst.read_bytes() == b'body {}'
+
+
+def test_changed_asset_is_updated(server, tmp_path):
+    dst = tmp_path / 'uxl.js'
+    fetcher = make_fetcher(tmp_path)
+    fetcher.fetch([(f"{server.url}/uxl.js", dst)])
+    server.files['/uxl.js'] = b'var UXL = {v: 2};'
+    assert fetcher.fetch([(f"{server.url}/uxl.js", dst)]) == [UPDATED]
+    assert dst.read_bytes() == b'var UXL = {v: 2};'
+
+
+def test_missing_local_copy_is_fetched_unconditionally(server, tmp_path):
+    dst = tmp_path / 'uxl.css'
+    fetcher = make_fetcher(tmp_path)
+    fetcher.fetch([(f"{server.url}/uxl.css", dst)])
+    dst.unlink()
+    assert fetcher.fetch([(f"{server.url}/uxl.css", dst)]) == [UPDATED]
+    assert 'If-None-Match' not in server.requests[-1][1]
+    assert dst.exists()
+
+
+def test_ttl_skips_the_request(server, tmp_path):
+    dst = tmp_path / 'uxl.css'
+    make_fetcher(tmp_path, ttl=3600).fetch([(f"{server.url}/uxl.css", dst)])
+    count = len(server.requests)
+    assert make_fetcher(tmp_path, ttl=3600).fetch([(f"{server.url}/uxl.css", dst)]) == [FRESH]
+    assert len(server.requests) == count
+
+
+def test_server_error_keeps_the_local_copy(server, tmp_path):
+    dst = tmp_path / 'uxl.css'
+    fetcher = make_fetcher(tmp_path)
+    fetcher.fetch([(f"{server.url}/uxl.css", dst)])
+    server.broken.add('/uxl.css')
+    assert fetcher.fetch([(f"{server.url}/uxl.css", dst)]) == [FAILED]
+    assert dst.read_bytes() == b'body {}'
+
+
+def test_unreachable_server_fails(server, tmp_path):
+    url = server.url
+    server.close()
+    dst = tmp_path / 'uxl.css'
+    assert make_fetcher(tmp_path, timeout=1).fetch([(f"{url}/uxl.css", dst)]) == [FAILED]
+    assert not dst.exists()
+
+
+def test_offline_mode_never_requests(server, tmp_path):
+    dst = tmp_path / 'uxl.css'
+    dst.write_bytes(b'local')
+    assert make_fetcher(tmp_path, offline=True).fetch([(f"{server.url}/uxl.css", dst)]) == [OFFLINE]
+    assert server.requests == []
+    assert dst.read_bytes() == b'local'
+    assert not (tmp_path / 'cache' / 'asset_fetch.json').exists()
+
+
+def test_results_follow_the_input_order(server, tmp_path):
+    items = [(f"{server.url}/uxl.js", tmp_path / 'uxl.js'),
+             (f"{server.url}/missing", tmp_path / 'missing'),
+             (f"{server.url}/uxl.css", tmp_path / 'uxl.css')]
+    assert make_fetcher(tmp_path).fetch(items) == [UPDATED, FAILED, UPDATED]
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""BuildManifest freshness and OutputWriter"""
+
+import os
+
+import pytest
+
+import build_cache
+from build_cache import BuildManifest, OutputWriter
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / 'PDS').mkdir()
+    (tmp_path / 'INDEX' / 'PDS').mkdir(parents=True)
+    (tmp_path / 'PDS' / 'doc.md').write_text('# Doc\n', encoding='utf-8')
+    (tmp_path / 'PDS' / 'doc_scheme.md').write_text('erDiagram\n', encoding='utf-8')
+    (tmp_path / 'INDEX' / 'PDS' / 'doc.html').write_text('<h1>Doc</h1>', encoding='utf-8')
+    return tmp_path
+
+
+def build(repo, fingerprint='v1'):
+    """Record doc.md as built (one run) and save the manifest"""
+    manifest = BuildManifest(repo, repo / 'INDEX' / '.cache' / 'build_manifest.json')
+    manifest.record(repo / 'PDS' / 'doc.md', fingerprint,
+                    outputs=[repo / 'INDEX' / 'PDS' / 'doc.html'], deps=[repo / 'PDS' / 'doc_scheme.md'])
+    manifest.save()
+
+
+def is_fresh(repo, fingerprint='v1'):
+    """Freshness as seen by the next run (a new manifest instance)"""
+    manifest = BuildManifest(repo, repo / 'INDEX' / '.cache' / 'build_manifest.json')
+    return manifest.is_fresh(repo / 'PDS' / 'doc.md', fingerprint)
+
+
+def test_fresh_after_build(repo):
+    assert not is_fresh(repo)
+    build(repo)
+    assert is_fresh(repo)
+
+
+def test_source_edit(repo):
+    build(repo)
+    (repo / 'PDS' / 'doc.md').write_text('# Doc, edited\n', encoding='utf-8')
+    assert not is_fresh(repo)
+
+
+def test_dependency_edit(repo):
+    build(repo)
+    (repo / 'PDS' / 'doc_scheme.md').write_text('erDiagram\n  A ||--o{ B : has\n', encoding='utf-8')
+    assert not is_fresh(repo)
+
+
+def test_dependency_created(repo):
+    (repo / 'PDS' / 'doc_scheme.md').unlink()
+    build(repo)
+    assert is_fresh(repo)
+    (repo / 'PDS' / 'doc_scheme.md').write_text('erDiagram\n', encoding='utf-8')
+    assert not is_fresh(repo)
+
+
+def test_converter_change(repo):
+    build(repo)
+    assert not is_fresh(repo, fingerprint='v2')
+
+
+def test_output_edit_with_the_same_size(repo):
+    build(repo)
+    output = repo / 'INDEX' / 'PDS' / 'doc.html'
+    stat = output.stat()
+    output.write_text('<h1>Dog</h1>', encoding='utf-8')
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not is_fresh(repo)
+
+
+def test_output_deleted(repo):
+    build(repo)
+    (repo / 'INDEX' / 'PDS' / 'doc.html').unlink()
+    assert not is_fresh(repo)
+
+
+def test_outputs_are_hashed_only_when_their_stat_changes(repo, monkeypatch):
+    build(repo)
+    output = repo / 'INDEX' / 'PDS' / 'doc.html'
+    hashed = []
+    real_file_hash = build_cache.file_hash
+    monkeypatch.setattr(build_cache, 'file_hash', lambda path: hashed.append(path) or real_file_hash(path))
+
+    assert is_fresh(repo)
+    assert output not in hashed
+
+    # Same bytes, new mtime (e.g. a checkout): hashed once, then the new stat is remembered
+    os.utime(output, ns=(0, output.stat().st_mtime_ns + 10 ** 9))
+    manifest = BuildManifest(repo, repo / 'INDEX' / '.cache' / 'build_manifest.json')
+    assert manifest.is_fresh(repo / 'PDS' / 'doc.md', 'v1')
+    assert hashed.count(output) == 1
+    manifest.save()
+    assert is_fresh(repo)
+    assert hashed.count(output) == 1
+
+
+def test_other_manifest_versions_are_ignored(repo):
+    build(repo)
+    path = repo / 'INDEX' / '.cache' / 'build_manifest.json'
+    path.write_text(path.read_text(encoding='utf-8').replace(f'"version": {BuildManifest.VERSION}', '"version": 0'),
+                    encoding='utf-8')
+    assert not is_fresh(repo)
+
+
+def test_prune_drops_removed_sources(repo):
+    build(repo)
+    manifest = BuildManifest(repo, repo / 'INDEX' / '.cache' / 'build_manifest.json')
+    manifest.prune([])
+    assert manifest.entries == {}
+
+
+# --- OutputWriter --------------------------------------------------------------
+
+def test_identical_write_is_skipped(tmp_path):
+    writer = OutputWriter()
+    path = tmp_path / 'page.html'
+    assert writer.write_bytes(path, b'<p>1</p>')
+    mtime = path.stat().st_mtime_ns
+    os.utime(path, ns=(0, mtime - 10 ** 9))
+    assert not writer.write_bytes(path, b'<p>1</p>')
+    assert path.stat().st_mtime_ns == mtime - 10 ** 9
+    assert writer.write_bytes(path, b'<p>2</p>')
+    assert (writer.changed, writer.unchanged) == (2, 1)
+    assert [p.name for p in tmp_path.iterdir()] == ['page.html']
+
+
+def test_link_makes_a_hardlink(tmp_path):
+    writer = OutputWriter()
+    src, dst = tmp_path / 'uxl.js', tmp_path / 'PDS' / 'uxl.js'
+    src.write_bytes(b'v1')
+    assert writer.link(src, dst)
+    assert os.path.samefile(src, dst)
+    # Already linked
+    assert not writer.link(src, dst)
+    assert (writer.changed, writer.unchanged) == (1, 1)
+
+
+def test_link_replaces_a_separate_copy(tmp_path):
+    writer = OutputWriter()
+    src, dst = tmp_path / 'uxl.js', tmp_path / 'copy.js'
+    src.write_bytes(b'v1')
+    dst.write_bytes(b'v1')
+    # Same content: not a change, but the copy becomes a link
+    assert not writer.link(src, dst)
+    assert os.path.samefile(src, dst)
+
+
+def test_link_after_the_source_was_replaced(tmp_path):
+    writer = OutputWriter()
+    src, dst = tmp_path / 'uxl.js', tmp_path / 'copy.js'
+    src.write_bytes(b'v1')
+    writer.link(src, dst)
+    # A download replaces the file (new inode): the old link keeps the old bytes until re-linked
+    tmp = tmp_path / 'uxl.js.tmp'
+    tmp.write_bytes(b'v2')
+    tmp.replace(src)
+    assert dst.read_bytes() == b'v1'
+    assert writer.link(src, dst)
+    assert dst.read_bytes() == b'v2' and os.path.samefile(src, dst)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['copy.js', 'uxl.js']
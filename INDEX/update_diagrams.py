@@ -9,6 +9,15 @@ import re
 import sys
 from pathlib import Path
 
+from build_cache import OutputWriter
+from index_page import IndexPage
+from mermaid_render import PRERENDERED_ATTR
+
+# Mermaid settings of index.html and of the standalone pages (process_diagram.html)
+INDEX_MERMAID_CONFIG = {'theme': 'base', 'securityLevel': 'loose'}
+PAGE_MERMAID_CONFIG = {'theme': 'default', 'securityLevel': 'loose'}
+MERMAID_SCRIPT_TAG = '<script defer src="assets/js/mermaid.min.js"></script>'
+
 def extract_mermaid_from_md(md_file_path):
     """Extract Mermaid diagram content from markdown file"""
     try:
@@ -25,54 +34,64 @@ def extract_mermaid_from_md(md_file_path):
         sys.stdout.flush()
         return None
 
-def update_diagram_in_html(html_path, diagram_id, new_diagram_content):
-    """Update a specific diagram in the HTML file"""
+def update_diagram_in_html(index_page, diagram_id, new_diagram_content, renderer=None):
+    """
+    Update a specific diagram in the (in-memory) index page. Returns True if it changed.
+    With a MermaidRenderer the diagram is stored as static SVG when rendering succeeds.
+    """
+    svg = renderer.render(new_diagram_content, INDEX_MERMAID_CONFIG) if renderer else None
     try:
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Find the diagram div and replace its content
-        pattern = rf'(<div class="mermaid" id="{diagram_id}"[^>]*>)(.*?)(</div>)'
-        
-        def replace_diagram(match):
-            opening_tag = match.group(1)
-            closing_tag = match.group(3)
-            return f'{opening_tag}\n{new_diagram_content}\n            {closing_tag}'
-        
-        updated_html = re.sub(pattern, replace_diagram, html_content, flags=re.DOTALL)
-        
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(updated_html)
-        
-        return html_content != updated_html
+        return index_page.replace_diagram(diagram_id, svg or new_diagram_content, prerendered=bool(svg))
     except Exception as e:
-        print(f"   [ERROR] Failed to update {html_path}: {e}")
+        print(f"   [ERROR] Failed to update {index_page.path}: {e}")
         sys.stdout.flush()
         return False
 
-def create_diagram_page(diagram_content, title, output_path):
-    """Create a standalone HTML page for a diagram"""
+def create_diagram_page(diagram_content, title, output_path, writer=None, renderer=None, assets=None):
+    """
+    Create a standalone HTML page for a diagram. Returns True if the file changed.
+    A page whose diagram was pre-rendered to SVG (renderer) does not load Mermaid;
+    with AssetFingerprints (assets) the page references the fingerprinted asset names.
+    """
     template = Path(__file__).parent / 'process_diagram.html'
     with open(template, 'r', encoding='utf-8') as f:
         html_content = f.read()
     
+    svg = renderer.render(diagram_content, PAGE_MERMAID_CONFIG) if renderer else None
+    if svg:
+        diagram_content = svg
+        html_content = html_content.replace(MERMAID_SCRIPT_TAG, '')
+        html_content = html_content.replace('<div class="mermaid">', f'<div class="mermaid"{PRERENDERED_ATTR}>', 1)
+    
     # Replace placeholder with diagram content
     html_content = html_content.replace('<!-- DIAGRAM_CONTENT_PLACEHOLDER -->', diagram_content)
     html_content = html_content.replace('<title>Процесс разработки - Synapse</title>', 
                                        f'<title>{title} - Synapse</title>')
+    if assets:
+        html_content = assets.rewrite(html_content)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    return (writer or OutputWriter()).write_text(output_path, html_content)
 
-def main():
+def update_diagrams(base_dir=None, writer=None, index_page=None, renderer=None, assets=None):
+    """
+    Update Mermaid diagrams in INDEX/index.html and their standalone pages.
+    Importable: convert_to_html.py calls it in-process with its own OutputWriter and
+    IndexPage (and saves the page itself, after the other index updates), with its
+    MermaidRenderer when diagrams are pre-rendered (--prerender-diagrams) and its
+    AssetFingerprints when asset names are fingerprinted (--fingerprint-assets).
+    """
     # Paths
-    base_dir = Path(__file__).parent.parent
+    base_dir = Path(base_dir) if base_dir else Path(__file__).parent.parent
     index_html = base_dir / 'INDEX' / 'index.html'
     process_md = base_dir / 'Project' / 'process.md'
     mindmap_md = base_dir / 'Project' / 'mindmap.md'
     process_diagram_html = base_dir / 'INDEX' / 'process_diagram_full.html'
     mindmap_diagram_html = base_dir / 'INDEX' / 'mindmap_diagram_full.html'
     
+    own_page = index_page is None
+    if own_page:
+        index_page = IndexPage(index_html)
+    
     print("Synapse Diagram Updater")
     print("=" * 50)
     sys.stdout.flush()
@@ -95,15 +114,17 @@ def main():
         if 'click DSAPP' not in process_diagram:
             process_diagram += '\n    click DSAPP "PDS/SynapsePDS_APP.html"'
         
-        if update_diagram_in_html(index_html, 'process-diagram', process_diagram):
+        if update_diagram_in_html(index_page, 'process-diagram', process_diagram, renderer):
             print("   [OK] Process diagram updated in index.html")
         else:
             print("   [-] Process diagram unchanged in index.html")
         sys.stdout.flush()
         
         # Create standalone diagram page
-        create_diagram_page(process_diagram, 'Процесс разработки', process_diagram_html)
-        print("   [OK] Created process_diagram_full.html")
+        if create_diagram_page(process_diagram, 'Процесс разработки', process_diagram_html, writer, renderer, assets):
+            print("   [OK] Created process_diagram_full.html")
+        else:
+            print("   [-] process_diagram_full.html unchanged")
         sys.stdout.flush()
     else:
         print("   [FAIL] Failed to extract process diagram")
@@ -114,24 +135,32 @@ def main():
     sys.stdout.flush()
     mindmap_diagram = extract_mermaid_from_md(mindmap_md)
     if mindmap_diagram:
-        if update_diagram_in_html(index_html, 'mindmap-diagram', mindmap_diagram):
+        if update_diagram_in_html(index_page, 'mindmap-diagram', mindmap_diagram, renderer):
             print("   [OK] Mindmap updated in index.html")
         else:
             print("   [-] Mindmap unchanged in index.html")
         sys.stdout.flush()
         
         # Create standalone diagram page
-        create_diagram_page(mindmap_diagram, 'Мозгокарта', mindmap_diagram_html)
-        print("   [OK] Created mindmap_diagram_full.html")
+        if create_diagram_page(mindmap_diagram, 'Мозгокарта', mindmap_diagram_html, writer, renderer, assets):
+            print("   [OK] Created mindmap_diagram_full.html")
+        else:
+            print("   [-] mindmap_diagram_full.html unchanged")
         sys.stdout.flush()
     else:
         print("   [FAIL] Failed to extract mindmap")
         sys.stdout.flush()
     
+    if own_page:
+        index_page.save(writer)
+    
     print("\n" + "=" * 50)
     print("Done! Diagrams updated in INDEX/index.html")
     sys.stdout.flush()
 
+def main():
+    update_diagrams()
+
 if __name__ == '__main__':
     main()
 
@@ -2,14 +2,31 @@
 # -*- coding: utf-8 -*-
 """
 Конвертация SVG иконок в Android Vector Drawable формат
+
+Запуск:
+    python convert_svg_to_android.py            # последовательно
+    python convert_svg_to_android.py -j 0       # пул процессов, по одному на ядро
+    python convert_svg_to_android.py -j 4       # пул из 4 процессов
+    python convert_svg_to_android.py --precision 2   # грубее округлять pathData
+    python convert_svg_to_android.py --no-optimize   # pathData как в исходном SVG
 """
 
+import argparse
+import hashlib
 import os
 import re
 import json
+import math
+import sys
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from svg_path import (IDENTITY, bounds_overlap, ellipse_segments, format_number, matrix_scale,
+                      multiply, parse_path, parse_transform, polyline_segments, rect_segments,
+                      round_segments, segments_bounds, serialize_path, simplify_segments,
+                      transform_segments, viewport_decimals)
+
 # Папки для обработки
 FOLDERS = ["Controller", "Location", "Luminaire", "System"]
 
@@ -20,6 +37,17 @@ OUTPUT_DIR = SCRIPT_DIR / "app" / "src" / "main" / "res" / "drawable"
 CATALOG_DIR = SCRIPT_DIR / "app" / "src" / "main" / "res" / "raw"
 CATALOG_FILE = CATALOG_DIR / "icons_catalog.json"
 
+# Кэш конвертации: хэш SVG -> сгенерированный drawable (build/ не в git)
+CACHE_FILE = SCRIPT_DIR / "build" / "icon_convert_cache.json"
+
+# Версия конвертера: увеличить при любом изменении генерируемого XML,
+# тогда кэш устареет и все иконки будут сконвертированы заново
+CONVERTER_VERSION = 4
+
+# Точность pathData по умолчанию (см. svg_path.viewport_decimals): для viewport 32
+# координаты округляются до 0.01
+DEFAULT_PRECISION = 3
+
 def extract_icon_id(filename):
     """Извлекает ID иконки (первые 3 цифры) из имени файла"""
     match = re.match(r'(\d{3})', filename)
@@ -111,88 +139,275 @@ def svg_fill_rule_to_android_fill_type(rule: str) -> str:
         return 'nonZero'
     return ''
 
+# Контейнеры, содержимое которых рисуется; <defs>, <clipPath>, <mask>, <symbol> и прочие
+# элементы вне этого списка (и вне RENDERED_SHAPES) сами ничего не рисуют и пропускаются
+# (<symbol> рисуется только через <use>)
+CONTAINER_TAGS = {'svg', 'g', 'a', 'switch'}
+RENDERED_SHAPES = {'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon'}
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+# Наследуемые свойства оформления (opacity, display и transform не наследуются)
+INHERITED_PROPERTIES = ('fill', 'stroke', 'stroke-width', 'fill-rule', 'clip-rule',
+                        'fill-opacity', 'stroke-opacity', 'visibility')
+
+# Знаков после запятой в pathData, пересчитанной после transform (без оптимизации)
+TRANSFORMED_DECIMALS = 6
+
+def local_name(element):
+    """Имя тега без namespace: {http://www.w3.org/2000/svg}path -> path"""
+    return element.tag.rsplit('}', 1)[-1] if isinstance(element.tag, str) else ''
+
+def element_properties(element):
+    """Свойства оформления элемента: атрибуты, затем style="..." (атрибут приоритетнее)"""
+    style = parse_style_attr(element.get('style', ''))
+    props = {}
+    for name in INHERITED_PROPERTIES + ('opacity', 'display', 'transform'):
+        value = element.get(name) or style.get(name)
+        if value:
+            props[name] = value.strip()
+    return props
+
+def parse_opacity(value):
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return 1.0
+
+def parse_length(value, reference=0.0, default=0.0):
+    """Длина SVG в единицах viewport: "12", "12px", "50%" (от reference)"""
+    if value is None or not value.strip():
+        return default
+    value = value.strip()
+    number = re.match(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', value)
+    if not number:
+        raise ValueError(f"неверная длина: {value!r}")
+    if value.endswith('%'):
+        return float(number.group()) * reference / 100
+    return float(number.group())
+
+def shape_segments(element, tag, viewport):
+    """Фигура -> абсолютные сегменты пути (svg_path); координаты в её системе"""
+    vw, vh = viewport
+    diagonal = math.sqrt((vw * vw + vh * vh) / 2)
+    get = lambda name, ref=0.0, default=0.0: parse_length(element.get(name), ref, default)
+    if tag == 'path':
+        return parse_path(element.get('d', ''))
+    if tag == 'rect':
+        rx = element.get('rx')
+        ry = element.get('ry')
+        return rect_segments(get('x', vw), get('y', vh), get('width', vw), get('height', vh),
+                             None if rx in (None, 'auto') else parse_length(rx, vw),
+                             None if ry in (None, 'auto') else parse_length(ry, vh))
+    if tag == 'circle':
+        r = get('r', diagonal)
+        return ellipse_segments(get('cx', vw), get('cy', vh), r, r)
+    if tag == 'ellipse':
+        return ellipse_segments(get('cx', vw), get('cy', vh), get('rx', vw), get('ry', vh))
+    if tag == 'line':
+        return [('M', [get('x1', vw), get('y1', vh)]), ('L', [get('x2', vw), get('y2', vh)])]
+    return polyline_segments(element.get('points', ''), closed=(tag == 'polygon'))
+
+def paint_color(value):
+    """Цвет заливки/обводки или '' для none, transparent и полностью прозрачного rgba()"""
+    if not value or value.lower() in ('none', 'transparent'):
+        return ''
+    rgba = re.match(r'rgba\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*([\d.]+)\s*\)', value)
+    if rgba:
+        if not parse_opacity(rgba.group(4)):
+            return ''
+        value = 'rgb({},{},{})'.format(*rgba.groups()[:3])
+    return rgb_to_hex(value)
+
+def shape_path(element, tag, props, matrix, viewport):
+    """
+    Видимая фигура -> запись пути {data, fill, stroke, stroke_width, fill_type}
+    или None, если фигура ничего не рисует. Фигуры, кроме <path>, и пути под transform
+    записываются заново из сегментов; <path> без transform сохраняет исходный d.
+    """
+    if props.get('visibility') in ('hidden', 'collapse'):
+        return None
+    if tag == 'path' and not element.get('d', '').strip():
+        return None
+    
+    # У <line> нет площади, заливка не рисуется
+    fill = '' if tag == 'line' else paint_color(props.get('fill', '#000000'))
+    if not parse_opacity(props.get('fill-opacity', 1)):
+        fill = ''
+    stroke = paint_color(props.get('stroke', ''))
+    # stroke-width по умолчанию 1 (в Android - 0, обводка не рисуется); проценты - от диагонали viewport
+    stroke_width = parse_length(props.get('stroke-width'), math.hypot(*viewport) / math.sqrt(2), 1.0)
+    if not parse_opacity(props.get('stroke-opacity', 1)) or stroke_width <= 0:
+        stroke = ''
+    if not fill and not stroke:
+        return None
+    
+    if tag == 'path' and matrix == IDENTITY:
+        path_data = element.get('d')
+    else:
+        segments = transform_segments(shape_segments(element, tag, viewport), matrix)
+        if not segments:
+            return None
+        path_data = serialize_path(segments, TRANSFORMED_DECIMALS)
+    
+    fill_type = (
+        svg_fill_rule_to_android_fill_type(props.get('fill-rule', ''))
+        or svg_fill_rule_to_android_fill_type(props.get('clip-rule', ''))
+    )
+    return {
+        'data': path_data,
+        'fill': fill,
+        'stroke': stroke,
+        'stroke_width': format_number(stroke_width * matrix_scale(matrix), TRANSFORMED_DECIMALS) if stroke else '',
+        'fill_type': fill_type
+    }
+
+def viewbox_matrix(view_box, width, height):
+    """
+    viewBox="x y w h" вписанный в width x height (preserveAspectRatio по умолчанию:
+    xMidYMid meet) -> матрица
+    """
+    parts = [float(v) for v in re.split(r'[\s,]+', view_box.strip())] if view_box else []
+    if len(parts) != 4 or parts[2] <= 0 or parts[3] <= 0:
+        return IDENTITY
+    x, y, w, h = parts
+    scale = min(width / w, height / h)
+    return (scale, 0.0, 0.0, scale,
+            (width - w * scale) / 2 - x * scale, (height - h * scale) / 2 - y * scale)
+
+def collect_paths(element, context=None, inherited=None, matrix=IDENTITY, opacity=1.0, used=()):
+    """
+    Обходит дерево SVG и возвращает видимые фигуры в порядке отрисовки.
+    Пропускаются: элементы вне CONTAINER_TAGS/RENDERED_SHAPES (defs, clipPath, ...),
+    display="none", opacity="0", фигуры без видимой заливки и обводки (рамки-заглушки
+    <rect> из Pixso, fill="none", прозрачные элементы). Группы не переносятся в drawable:
+    их стили наследуются фигурами, а transform применяется к координатам путей.
+    <use> разворачивается в копию элемента, на который ссылается (used - цепочка
+    ссылок, защита от циклов).
+    """
+    if context is None:
+        # Корень: индекс id для <use> и размер viewport для длин в процентах
+        vb_parts = element.get('viewBox', '').replace(',', ' ').split()
+        viewport = ((float(vb_parts[2]), float(vb_parts[3])) if len(vb_parts) == 4 else
+                    (parse_length(element.get('width'), default=24.0),
+                     parse_length(element.get('height'), default=24.0)))
+        context = {'ids': {e.get('id'): e for e in element.iter() if e.get('id')}, 'viewport': viewport}
+    
+    tag = local_name(element)
+    props = element_properties(element)
+    if tag not in CONTAINER_TAGS and tag not in RENDERED_SHAPES and tag != 'use':
+        return []
+    if props.get('display') == 'none':
+        return []
+    opacity *= parse_opacity(props.get('opacity', 1))
+    if not opacity:
+        return []
+    
+    current = dict(inherited or {})
+    current.update((k, v) for k, v in props.items() if k in INHERITED_PROPERTIES and v != 'inherit')
+    if 'transform' in props:
+        matrix = multiply(matrix, parse_transform(props['transform']))
+    
+    if tag in RENDERED_SHAPES:
+        path = shape_path(element, tag, current, matrix, context['viewport'])
+        return [path] if path else []
+    
+    children = list(element)
+    if tag == 'use':
+        href = element.get('href') or element.get(XLINK_HREF) or ''
+        target = context['ids'].get(href[1:]) if href.startswith('#') else None
+        if target is None or href in used:
+            return []
+        used = used + (href,)
+        vw, vh = context['viewport']
+        matrix = multiply(matrix, (1.0, 0.0, 0.0, 1.0,
+                                   parse_length(element.get('x'), vw), parse_length(element.get('y'), vh)))
+        if local_name(target) != 'symbol':
+            return collect_paths(target, context, current, matrix, opacity, used)
+        # <symbol>: содержимое вписывается в width x height элемента <use> (по умолчанию 100%)
+        symbol_props = element_properties(target)
+        if symbol_props.get('display') == 'none':
+            return []
+        current.update((k, v) for k, v in symbol_props.items() if k in INHERITED_PROPERTIES and v != 'inherit')
+        matrix = multiply(matrix, viewbox_matrix(target.get('viewBox'),
+                                                 parse_length(element.get('width'), vw, vw),
+                                                 parse_length(element.get('height'), vh, vh)))
+        children = list(target)
+    
+    paths = []
+    for child in children:
+        paths += collect_paths(child, context, current, matrix, opacity, used)
+    return paths
+
 def parse_svg(svg_path):
     """Парсит SVG и извлекает необходимые данные"""
     try:
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-        
-        # Namespace для SVG
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-        
-        # Извлекаем размеры
-        width = root.get('width', '24')
-        height = root.get('height', '24')
-        
-        # Убираем единицы измерения (px, dp и т.д.)
-        width = re.sub(r'[^\d.]', '', width) or '24'
-        height = re.sub(r'[^\d.]', '', height) or '24'
-        
-        # Извлекаем viewBox
-        viewbox = root.get('viewBox', f'0 0 {width} {height}')
-        vb_parts = viewbox.split()
-        viewport_width = vb_parts[2] if len(vb_parts) >= 3 else width
-        viewport_height = vb_parts[3] if len(vb_parts) >= 4 else height
-        
-        # Извлекаем пути
-        paths = []
-        for path in root.findall('.//svg:path', ns):
-            path_data = path.get('d', '')
-            if path_data:
-                style = parse_style_attr(path.get('style', ''))
-                fill = rgb_to_hex(path.get('fill') or style.get('fill') or '#000000')
-                stroke = rgb_to_hex(path.get('stroke') or style.get('stroke') or '')
-                stroke_width = path.get('stroke-width') or style.get('stroke-width') or ''
-                fill_rule = path.get('fill-rule') or style.get('fill-rule') or ''
-                clip_rule = path.get('clip-rule') or style.get('clip-rule') or ''
-                fill_type = (
-                    svg_fill_rule_to_android_fill_type(fill_rule)
-                    or svg_fill_rule_to_android_fill_type(clip_rule)
-                )
-                
-                paths.append({
-                    'data': path_data,
-                    'fill': fill,
-                    'stroke': stroke,
-                    'stroke_width': stroke_width,
-                    'fill_type': fill_type
-                })
-        
-        # Если путей нет, ищем в корне без namespace
-        if not paths:
-            for path in root.findall('.//path'):
-                path_data = path.get('d', '')
-                if path_data:
-                    style = parse_style_attr(path.get('style', ''))
-                    fill = rgb_to_hex(path.get('fill') or style.get('fill') or '#000000')
-                    stroke = rgb_to_hex(path.get('stroke') or style.get('stroke') or '')
-                    stroke_width = path.get('stroke-width') or style.get('stroke-width') or ''
-                    fill_rule = path.get('fill-rule') or style.get('fill-rule') or ''
-                    clip_rule = path.get('clip-rule') or style.get('clip-rule') or ''
-                    fill_type = (
-                        svg_fill_rule_to_android_fill_type(fill_rule)
-                        or svg_fill_rule_to_android_fill_type(clip_rule)
-                    )
-                    
-                    paths.append({
-                        'data': path_data,
-                        'fill': fill,
-                        'stroke': stroke,
-                        'stroke_width': stroke_width,
-                        'fill_type': fill_type
-                    })
-        
-        return {
-            'width': width,
-            'height': height,
-            'viewport_width': viewport_width,
-            'viewport_height': viewport_height,
-            'paths': paths
-        }
+        return read_svg(svg_path)
     except Exception as e:
         print(f"  [ERROR] Ошибка парсинга: {e}")
         return None
 
+def read_svg(svg_path):
+    """Как parse_svg, но ошибки парсинга пробрасываются (для отчёта по каждому файлу)"""
+    tree = ET.parse(svg_path)
+    root = tree.getroot()
+    
+    # Извлекаем размеры
+    width = root.get('width', '24')
+    height = root.get('height', '24')
+    
+    # Убираем единицы измерения (px, dp и т.д.)
+    width = re.sub(r'[^\d.]', '', width) or '24'
+    height = re.sub(r'[^\d.]', '', height) or '24'
+    
+    # Извлекаем viewBox
+    viewbox = root.get('viewBox', f'0 0 {width} {height}')
+    vb_parts = viewbox.split()
+    viewport_width = vb_parts[2] if len(vb_parts) >= 3 else width
+    viewport_height = vb_parts[3] if len(vb_parts) >= 4 else height
+    
+    # Извлекаем видимые пути (с учётом наследования стилей и transform групп)
+    paths = collect_paths(root)
+    
+    return {
+        'width': width,
+        'height': height,
+        'viewport_width': viewport_width,
+        'viewport_height': viewport_height,
+        'paths': paths
+    }
+
+def path_style(path):
+    """Атрибуты пути, кроме данных: пути с одинаковым стилем можно объединить"""
+    return (path['fill'], path['stroke'], path['stroke_width'], path.get('fill_type', ''))
+
+def optimize_paths(svg_data, precision=DEFAULT_PRECISION):
+    """
+    Оптимизирует pathData: округление до точности относительно viewport, удаление
+    лишних команд, кратчайшая запись каждой команды (абсолютная/относительная).
+    Соседние пути с одинаковым стилем объединяются в один <path>, если их габариты
+    (с учётом обводки) не пересекаются: тогда заливка и обводка не меняются.
+    """
+    decimals = viewport_decimals(svg_data['viewport_width'], svg_data['viewport_height'], precision)
+    merged = []
+    for path in svg_data['paths']:
+        segments = simplify_segments(round_segments(parse_path(path['data']), decimals),
+                                     keep_zero_length=bool(path['stroke']))
+        if not segments:
+            continue
+        # Запас на обводку: половина толщины, плюс выступ углов (miter)
+        padding = 2 * float(path['stroke_width'] or 1) if path['stroke'] else 0.0
+        bounds = segments_bounds(segments, padding)
+        last = merged[-1] if merged else None
+        if last and path_style(last['path']) == path_style(path) \
+                and not any(bounds_overlap(bounds, b) for b in last['bounds']):
+            last['segments'] += segments
+            last['bounds'].append(bounds)
+        else:
+            merged.append({'path': path, 'segments': segments, 'bounds': [bounds]})
+    
+    paths = [dict(m['path'], data=serialize_path(m['segments'], decimals)) for m in merged]
+    return dict(svg_data, paths=paths)
+
 def generate_android_xml(svg_data):
     """Генерирует Android Vector Drawable XML"""
     xml_lines = [
@@ -225,72 +440,207 @@ def generate_android_xml(svg_data):
     
     return '\n'.join(xml_lines)
 
-def convert_folder(folder_name, catalog_entries):
-    """Конвертирует все SVG из папки и добавляет записи в каталог"""
+def file_hash(path):
+    """SHA-256 содержимого файла"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def write_if_changed(path, text):
+    """
+    Записывает текст (с системными переводами строк, как write_text), только если
+    содержимое файла отличается. True, если файл записан.
+    Неизменённые файлы не трогаются, и Gradle не пересобирает ресурсы.
+    """
+    data = text.replace('\n', os.linesep).encode('utf-8')
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.write_bytes(data)
+    return True
+
+def load_cache(precision=DEFAULT_PRECISION):
+    """
+    Кэш прошлых конвертаций: {"Папка/файл.svg": {hash, output, output_hash, entry}}.
+    Пуст, если он создан другой версией конвертера или с другой точностью pathData.
+    """
+    try:
+        data = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != CONVERTER_VERSION or data.get('precision') != precision:
+        return {}
+    return data.get('files', {})
+
+def save_cache(cache, precision=DEFAULT_PRECISION):
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    # Без sort_keys: записи каталога хранятся с ключами в порядке icons_catalog.json
+    data = {'version': CONVERTER_VERSION, 'precision': precision, 'files': dict(sorted(cache.items()))}
+    tmp = CACHE_FILE.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+    tmp.replace(CACHE_FILE)
+
+def cache_key(folder_name, svg_file):
+    return f"{folder_name}/{svg_file.name}"
+
+def cached_result(cache, folder_name, svg_file, svg_hash):
+    """
+    Результат из кэша, если SVG не менялся, а drawable на месте и совпадает с тем,
+    что был сгенерирован (иначе None: например, после git checkout drawables)
+    """
+    cached = cache.get(cache_key(folder_name, svg_file))
+    if not cached or cached['hash'] != svg_hash:
+        return None
+    try:
+        if file_hash(OUTPUT_DIR / cached['output']) != cached.get('output_hash'):
+            return None
+    except OSError:
+        return None
+    return {'name': svg_file.name, 'output': cached['output'], 'output_hash': cached['output_hash'],
+            'entry': cached['entry'], 'error': None, 'written': False, 'cached': True}
+
+def convert_file(folder_name, svg_file, precision=DEFAULT_PRECISION):
+    """
+    Конвертирует один SVG (precision=None - без оптимизации pathData).
+    Вызывается и в пуле процессов, поэтому ничего не печатает,
+    а возвращает результат: {'name', 'output', 'entry' (запись каталога или None), 'error',
+    'written' (drawable перезаписан), 'cached', 'output_hash' (хэш drawable)}
+    """
+    prefix = folder_name.lower()
+    result = {'name': svg_file.name, 'output': None, 'output_hash': None, 'entry': None, 'error': None,
+              'written': False, 'cached': False}
+    try:
+        # Генерируем имя выходного файла
+        sanitized_name = sanitize_filename(svg_file.name)
+        output_name = f"{prefix}_{sanitized_name}"
+        output_path = OUTPUT_DIR / output_name
+        
+        # Парсим SVG
+        svg_data = read_svg(svg_file)
+        if precision is not None:
+            svg_data = optimize_paths(svg_data, precision)
+        
+        if not svg_data['paths']:
+            result['error'] = "Нет путей в SVG"
+            return result
+        
+        # Генерируем Android XML и сохраняем (если изменился)
+        result['written'] = write_if_changed(output_path, generate_android_xml(svg_data))
+        result['output'] = output_name
+        result['output_hash'] = file_hash(output_path)
+        
+        # Запись для каталога
+        icon_id = extract_icon_id(svg_file.name)
+        if icon_id is not None:
+            result['entry'] = {
+                "category": prefix,
+                "id": icon_id,
+                "description": "",
+                "resourceName": output_name.replace('.xml', '')
+            }
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+    return result
+
+def _convert_task(task):
+    return convert_file(*task)
+
+def list_svg_files(folder_name):
+    """SVG файлы папки в стабильном порядке (None, если папки нет)"""
     folder_path = IMG_DIR / folder_name
-    
     if not folder_path.exists():
-        print(f"  [SKIP] Папка не найдена: {folder_name}")
-        return 0, 0
-    
-    svg_files = list(folder_path.glob('*.svg'))
-    
-    if not svg_files:
-        print(f"  [SKIP] SVG файлы не найдены в: {folder_name}")
-        return 0, 0
+        return None
+    return sorted(folder_path.glob('*.svg'))
+
+def report_result(result, catalog_entries):
+    """Печатает результат конвертации файла и добавляет запись в каталог. True, если успешно."""
+    if result['error']:
+        print(f"  [ERROR] {result['name']} -> {result['error']}")
+        return False
+    if result['entry']:
+        catalog_entries.append(result['entry'])
+    if not result['cached']:
+        note = '' if result['written'] else ' (без изменений)'
+        print(f"  [OK] {result['name']} -> {result['output']}{note}")
+    return True
+
+def convert_all(cache, jobs=1, force=False, precision=DEFAULT_PRECISION):
+    """
+    Конвертирует все папки FOLDERS. SVG, чей хэш совпадает с кэшем (и drawable на месте),
+    не конвертируются. При jobs > 1 изменённые иконки всех папок конвертируются сразу,
+    пулом процессов; результаты собираются в исходном порядке файлов, поэтому вывод
+    и каталог не зависят от того, какой процесс закончил первым.
+    Возвращает (результаты по папкам, {ключ кэша: хэш SVG}).
+    """
+    svg_files = {folder: list_svg_files(folder) for folder in FOLDERS}
+    hashes = {}
+    results = {}
+    tasks = []
+    for folder in FOLDERS:
+        for svg_file in svg_files[folder] or []:
+            key = cache_key(folder, svg_file)
+            hashes[key] = file_hash(svg_file)
+            results[key] = None if force else cached_result(cache, folder, svg_file, hashes[key])
+            if results[key] is None:
+                tasks.append((folder, svg_file, precision))
     
-    success_count = 0
-    error_count = 0
-    prefix = folder_name.lower()
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            converted = pool.map(_convert_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+            for (folder, svg_file, _), result in zip(tasks, converted):
+                results[cache_key(folder, svg_file)] = result
+    else:
+        for task in tasks:
+            results[cache_key(task[0], task[1])] = convert_file(*task)
     
-    for svg_file in svg_files:
-        try:
-            # Генерируем имя выходного файла
-            sanitized_name = sanitize_filename(svg_file.name)
-            output_name = f"{prefix}_{sanitized_name}"
-            output_path = OUTPUT_DIR / output_name
-            
-            # Парсим SVG
-            svg_data = parse_svg(svg_file)
-            
-            if not svg_data or not svg_data['paths']:
-                print(f"  [ERROR] {svg_file.name} -> Нет путей в SVG")
-                error_count += 1
-                continue
-            
-            # Генерируем Android XML
-            android_xml = generate_android_xml(svg_data)
-            
-            # Сохраняем
-            output_path.write_text(android_xml, encoding='utf-8')
-            
-            # Добавляем в каталог
-            icon_id = extract_icon_id(svg_file.name)
-            if icon_id is not None:
-                resource_name = output_name.replace('.xml', '')
-                catalog_entries.append({
-                    "category": prefix,
-                    "id": icon_id,
-                    "description": "",
-                    "resourceName": resource_name
-                })
-            
-            print(f"  [OK] {svg_file.name} -> {output_name}")
-            success_count += 1
-            
-        except Exception as e:
-            print(f"  [ERROR] {svg_file.name} -> {e}")
-            error_count += 1
-    
-    return success_count, error_count
+    by_folder = {folder: None if files is None else [results[cache_key(folder, f)] for f in files]
+                 for folder, files in svg_files.items()}
+    return by_folder, hashes
+
+def remove_stale_drawables(cache, hashes):
+    """Удаляет drawables, сгенерированные из SVG, которых больше нет. Возвращает их имена."""
+    removed = []
+    for key in sorted(set(cache) - set(hashes)):
+        output_path = OUTPUT_DIR / cache.pop(key)['output']
+        if output_path.exists():
+            output_path.unlink()
+            removed.append(output_path.name)
+    return removed
+
+def merge_catalog(catalog_entries):
+    """
+    Каталог в детерминированном порядке (категория, id, имя ресурса).
+    Описания, уже заполненные в существующем icons_catalog.json, сохраняются.
+    """
+    try:
+        existing = json.loads(CATALOG_FILE.read_text(encoding='utf-8')).get('icons', [])
+    except (OSError, ValueError):
+        existing = []
+    descriptions = {e.get('resourceName'): e.get('description', '') for e in existing}
+    icons = [dict(entry, description=descriptions.get(entry['resourceName'], entry['description']))
+             for entry in catalog_entries]
+    return {"icons": sorted(icons, key=lambda x: (x["category"], x["id"], x["resourceName"]))}
 
 def main():
+    parser = argparse.ArgumentParser(description="Конвертация SVG иконок в Android Vector Drawable")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="число процессов (0 = по одному на ядро, по умолчанию 1 - последовательно)")
+    parser.add_argument('--force', action='store_true',
+                        help="конвертировать все SVG, не глядя в кэш")
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, metavar='N',
+                        help=f"точность pathData относительно размера viewport (по умолчанию {DEFAULT_PRECISION})")
+    parser.add_argument('--no-optimize', action='store_true',
+                        help="не оптимизировать pathData (как в исходном SVG)")
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    precision = None if args.no_optimize else max(0, args.precision)
+    
     print("Начало конвертации SVG -> Android XML\n")
     
     # Проверяем наличие папок
     if not IMG_DIR.exists():
         print(f"[ERROR] Папка IMG не найдена: {IMG_DIR}")
-        return
+        return 1
     
     # Создаём выходные папки если нужно
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -299,36 +649,73 @@ def main():
     print("Установка зависимостей...")
     print("[OK] Встроенные библиотеки доступны\n")
     
+    if jobs > 1:
+        print(f"Параллельная конвертация: {jobs} процессов\n")
+    
+    # Конвертируем изменённые SVG (остальные берём из кэша)
+    cache = load_cache(precision)
+    by_folder, hashes = convert_all(cache, jobs, args.force, precision)
+    
     # Каталог иконок
     catalog_entries = []
-    
-    # Конвертируем каждую папку
     total_success = 0
-    total_error = 0
+    total_cached = 0
+    total_written = 0
+    failed = []
     
     for folder in FOLDERS:
         print(f"Обработка папки: {folder}")
-        success, errors = convert_folder(folder, catalog_entries)
-        total_success += success
-        total_error += errors
+        results = by_folder[folder]
+        if results is None:
+            print(f"  [SKIP] Папка не найдена: {folder}")
+        elif not results:
+            print(f"  [SKIP] SVG файлы не найдены в: {folder}")
+        for result in results or []:
+            if report_result(result, catalog_entries):
+                total_success += 1
+                total_cached += result['cached']
+                total_written += result['written']
+                key = f"{folder}/{result['name']}"
+                cache[key] = {'hash': hashes[key], 'output': result['output'],
+                              'output_hash': result['output_hash'], 'entry': result['entry']}
+            else:
+                failed.append((folder, result['name'], result['error']))
+        cached_in_folder = sum(1 for r in results or [] if r['cached'])
+        if cached_in_folder:
+            print(f"  [-] Без изменений (кэш): {cached_in_folder}")
         print()
     
-    # Сохраняем каталог
-    catalog_data = {"icons": sorted(catalog_entries, key=lambda x: (x["category"], x["id"]))}
-    CATALOG_FILE.write_text(json.dumps(catalog_data, indent=2, ensure_ascii=False), encoding='utf-8')
+    # Drawables удалённых SVG
+    removed = remove_stale_drawables(cache, hashes)
+    for name in removed:
+        print(f"  [DEL] {name} (исходный SVG удалён)")
+    
+    # Сохраняем каталог (только если он изменился)
+    catalog_data = merge_catalog(catalog_entries)
+    catalog_written = write_if_changed(CATALOG_FILE, json.dumps(catalog_data, indent=2, ensure_ascii=False))
+    save_cache(cache, precision)
     
     # Итоги
+    total_error = len(failed)
     print("=" * 60)
     print("Результаты конвертации:")
     print(f"   Всего файлов: {total_success + total_error}")
     print(f"   Успешно: {total_success}")
+    print(f"   Из кэша: {total_cached}")
+    print(f"   Перезаписано drawables: {total_written}")
+    print(f"   Удалено drawables: {len(removed)}")
     print(f"   Ошибок: {total_error}")
     print(f"   Записей в каталоге: {len(catalog_entries)}")
     print("=" * 60)
+    if failed:
+        print("\nФайлы с ошибками:")
+        for folder, name, error in failed:
+            print(f"   {folder}/{name}: {error}")
     print(f"\nРезультаты сохранены в: {OUTPUT_DIR}")
-    print(f"Каталог сохранён в: {CATALOG_FILE}")
+    print(f"Каталог {'сохранён' if catalog_written else 'не изменился'}: {CATALOG_FILE}")
     print("\n[REMINDER] Обновите описания иконок в icons_catalog.json!")
     print("Готово!")
+    return 1 if total_error else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Оптимизация SVG path data для Android Vector Drawable (convert_svg_to_android.py)
+
+Путь разбирается в абсолютные сегменты M/L/C/Q/A/Z, координаты округляются до точности,
+заданной относительно размера viewport, лишние команды выбрасываются, и путь
+записывается заново: для каждой команды берётся более короткая из абсолютной
+и относительной форм (плюс H/V, S/T и неявное повторение команды).
+"""
+
+import math
+import re
+
+# Команда и её аргументы (до следующей команды)
+_COMMAND_RE = re.compile(r'([MmLlHhVvCcSsQqTtAaZz])([^MmLlHhVvCcSsQqTtAaZz]*)')
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_SEPARATOR_RE = re.compile(r'[\s,]*')
+
+# Число аргументов каждой команды
+ARG_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+
+def _scan_numbers(text, arc=False):
+    """Числа аргументов команды. Флаги дуги (4-й и 5-й аргументы) - одна цифра, могут идти слитно."""
+    numbers = []
+    pos = _SEPARATOR_RE.match(text, 0).end()
+    while pos < len(text):
+        if arc and len(numbers) % 7 in (3, 4):
+            flag = text[pos]
+            if flag not in '01':
+                raise ValueError(f"неверный флаг дуги: {text[pos:pos + 10]!r}")
+            numbers.append(float(flag))
+            pos += 1
+        else:
+            match = _NUMBER_RE.match(text, pos)
+            if not match:
+                raise ValueError(f"неверные данные пути: {text[pos:pos + 10]!r}")
+            numbers.append(float(match.group()))
+            pos = match.end()
+        pos = _SEPARATOR_RE.match(text, pos).end()
+    return numbers
+
+
+def parse_path(d):
+    """
+    Path data -> список абсолютных сегментов (команда, [координаты]).
+    Команды приводятся к M, L, C, Q, A, Z: H/V становятся L, S/T - C/Q
+    с явной отражённой контрольной точкой.
+    """
+    segments = []
+    cx = cy = 0.0          # текущая точка
+    sx = sy = 0.0          # начало подпути
+    last_ctrl = None       # вторая контрольная точка предыдущей C/S (или Q/T)
+    last_cmd = None
+    for letter, args in _COMMAND_RE.findall(d):
+        cmd = letter.upper()
+        relative = letter.islower()
+        numbers = _scan_numbers(args, arc=(cmd == 'A'))
+        count = ARG_COUNTS[cmd]
+        if cmd == 'Z':
+            segments.append(('Z', []))
+            cx, cy = sx, sy
+            last_cmd, last_ctrl = 'Z', None
+            continue
+        if not numbers or len(numbers) % count:
+            raise ValueError(f"неверное число аргументов команды {letter}: {len(numbers)}")
+        for i in range(0, len(numbers), count):
+            a = numbers[i:i + count]
+            # Повтор M без буквы означает L
+            if cmd == 'M' and i > 0:
+                cmd = 'L'
+            dx, dy = (cx, cy) if relative else (0.0, 0.0)
+            if cmd == 'M':
+                cx, cy = a[0] + dx, a[1] + dy
+                sx, sy = cx, cy
+                segments.append(('M', [cx, cy]))
+                last_ctrl = None
+            elif cmd in ('L', 'H', 'V'):
+                x = a[0] + dx if cmd in ('L', 'H') else cx
+                y = (a[1] + dy if cmd == 'L' else a[0] + dy) if cmd in ('L', 'V') else cy
+                cx, cy = x, y
+                segments.append(('L', [x, y]))
+                last_ctrl = None
+            elif cmd in ('C', 'S'):
+                if cmd == 'C':
+                    x1, y1 = a[0] + dx, a[1] + dy
+                    rest = a[2:]
+                else:
+                    # Отражение второй контрольной точки предыдущей кривой
+                    if last_cmd in ('C', 'S') and last_ctrl:
+                        x1, y1 = 2 * cx - last_ctrl[0], 2 * cy - last_ctrl[1]
+                    else:
+                        x1, y1 = cx, cy
+                    rest = a
+                x2, y2, x, y = rest[0] + dx, rest[1] + dy, rest[2] + dx, rest[3] + dy
+                segments.append(('C', [x1, y1, x2, y2, x, y]))
+                cx, cy = x, y
+                last_ctrl = (x2, y2)
+            elif cmd in ('Q', 'T'):
+                if cmd == 'Q':
+                    x1, y1 = a[0] + dx, a[1] + dy
+                    x, y = a[2] + dx, a[3] + dy
+                else:
+                    if last_cmd in ('Q', 'T') and last_ctrl:
+                        x1, y1 = 2 * cx - last_ctrl[0], 2 * cy - last_ctrl[1]
+                    else:
+                        x1, y1 = cx, cy
+                    x, y = a[0] + dx, a[1] + dy
+                segments.append(('Q', [x1, y1, x, y]))
+                cx, cy = x, y
+                last_ctrl = (x1, y1)
+            else:  # A
+                x, y = a[5] + dx, a[6] + dy
+                segments.append(('A', [a[0], a[1], a[2], a[3], a[4], x, y]))
+                cx, cy = x, y
+                last_ctrl = None
+            last_cmd = 'C' if cmd == 'S' else 'Q' if cmd == 'T' else cmd
+    return segments
+
+
+def viewport_decimals(viewport_width, viewport_height, precision=3):
+    """
+    Знаков после запятой для координат: шаг округления - 10^-precision от порядка
+    размера viewport (32x32 при precision=3 -> 2 знака, 512x512 -> 1 знак).
+    """
+    size = max(float(viewport_width or 0), float(viewport_height or 0), 1.0)
+    return max(0, precision - int(math.floor(math.log10(size))))
+
+
+def round_segments(segments, decimals):
+    """Округляет все координаты (флаги дуг остаются 0/1)"""
+    return [(cmd, [round(v, decimals) + 0.0 for v in coords]) for cmd, coords in segments]
+
+
+def simplify_segments(segments, keep_zero_length=False):
+    """
+    Убирает команды, не влияющие на рисунок:
+    - нулевые отрезки и кривые (если keep_zero_length=False: у заливки они не видны;
+      у обводки с круглыми концами это точки);
+    - M, за которым сразу идёт другой M, и M в конце пути;
+    - L в начало подпути прямо перед Z (Z и так замыкает подпуть);
+    - повторный Z.
+    """
+    out = []
+    cx = cy = 0.0
+    sx = sy = 0.0
+    for cmd, coords in segments:
+        if cmd == 'M':
+            if out and out[-1][0] == 'M':
+                out.pop()
+            out.append((cmd, coords))
+            cx, cy = sx, sy = coords
+            continue
+        if cmd == 'Z':
+            if out and out[-1][0] == 'Z':
+                continue
+            # L в начало подпути перед Z
+            while out and out[-1][0] == 'L' and out[-1][1] == [sx, sy] and len(out) > 1 \
+                    and out[-2][0] != 'M':
+                out.pop()
+            out.append((cmd, coords))
+            cx, cy = sx, sy
+            continue
+        end = coords[-2:]
+        points = [end] if cmd == 'A' else [coords[i:i + 2] for i in range(0, len(coords), 2)]
+        if not keep_zero_length and all(point == [cx, cy] for point in points):
+            continue
+        out.append((cmd, coords))
+        cx, cy = end
+    while out and out[-1][0] == 'M':
+        out.pop()
+    return out
+
+
+def format_number(value, decimals):
+    """Кратчайшая запись числа: 3.50 -> 3.5, 0.5 -> .5, -0.25 -> -.25, -0 -> 0"""
+    text = f"{value:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _join(numbers):
+    """
+    Числа через пробел. Разделитель не нужен перед отрицательным числом и перед
+    дробью без целой части после числа с точкой (".5.5" - это .5 и .5).
+    """
+    out = ''
+    for i, text in enumerate(numbers):
+        previous = numbers[i - 1] if i else ''
+        if i and not text.startswith('-') and not (
+                text.startswith('.') and '.' in previous and 'e' not in previous):
+            out += ' '
+        out += text
+    return out
+
+
+def _implicit(active, letter):
+    """Можно ли опустить букву команды после команды active"""
+    if active is None or letter in 'Mm':
+        return False
+    if active == 'M':
+        return letter == 'L'
+    if active == 'm':
+        return letter == 'l'
+    return active == letter
+
+
+def serialize_path(segments, decimals):
+    """Абсолютные сегменты -> кратчайшая строка path data"""
+    parts = []
+    active = None          # команда, аргументы которой сейчас продолжаются
+    cx = cy = 0.0
+    sx = sy = 0.0
+    prev_cmd = None
+    prev_ctrl = None
+    first = True
+
+    def fmt(values):
+        return [format_number(v, decimals) for v in values]
+
+    def cost(letter, numbers):
+        text = _join(numbers)
+        if _implicit(active, letter):
+            return len(text) + (0 if text.startswith('-') else 1)
+        return len(text) + 1
+
+    for cmd, coords in segments:
+        if cmd == 'Z':
+            parts.append('Z')
+            active = 'Z'
+            cx, cy = sx, sy
+            prev_cmd, prev_ctrl = 'Z', None
+            continue
+
+        candidates = []
+        rel = lambda values, origin: [round(v - origin[i % 2], decimals) for i, v in enumerate(values)]
+        if cmd == 'M':
+            x, y = coords
+            candidates.append(('M', fmt(coords)))
+            if not first:
+                candidates.append(('m', fmt(rel(coords, (cx, cy)))))
+            cx, cy = sx, sy = x, y
+            ctrl = None
+        elif cmd == 'L':
+            x, y = coords
+            if y == cy:
+                candidates += [('H', fmt([x])), ('h', fmt([round(x - cx, decimals)]))]
+            if x == cx:
+                candidates += [('V', fmt([y])), ('v', fmt([round(y - cy, decimals)]))]
+            candidates += [('L', fmt(coords)), ('l', fmt(rel(coords, (cx, cy))))]
+            ctrl = None
+        elif cmd == 'C':
+            x1, y1, x2, y2, x, y = coords
+            reflected = prev_cmd == 'C' and prev_ctrl and \
+                [x1, y1] == [round(2 * cx - prev_ctrl[0], decimals) + 0.0, round(2 * cy - prev_ctrl[1], decimals) + 0.0]
+            if reflected or (prev_cmd != 'C' and [x1, y1] == [cx, cy]):
+                candidates += [('S', fmt(coords[2:])), ('s', fmt(rel(coords[2:], (cx, cy))))]
+            candidates += [('C', fmt(coords)), ('c', fmt(rel(coords, (cx, cy))))]
+            ctrl = (x2, y2)
+        elif cmd == 'Q':
+            x1, y1, x, y = coords
+            reflected = prev_cmd == 'Q' and prev_ctrl and \
+                [x1, y1] == [round(2 * cx - prev_ctrl[0], decimals) + 0.0, round(2 * cy - prev_ctrl[1], decimals) + 0.0]
+            if reflected or (prev_cmd != 'Q' and [x1, y1] == [cx, cy]):
+                candidates += [('T', fmt(coords[2:])), ('t', fmt(rel(coords[2:], (cx, cy))))]
+            candidates += [('Q', fmt(coords)), ('q', fmt(rel(coords, (cx, cy))))]
+            ctrl = (x1, y1)
+        else:  # A
+            rx, ry, rotation, large, sweep, x, y = coords
+            head = fmt([rx, ry, rotation]) + [str(int(large)), str(int(sweep))]
+            candidates += [('A', head + fmt([x, y])), ('a', head + fmt(rel([x, y], (cx, cy))))]
+            ctrl = None
+
+        letter, numbers = min(candidates, key=lambda c: cost(*c))
+        text = _join(numbers)
+        if _implicit(active, letter):
+            parts.append(text if text.startswith('-') else ' ' + text)
+        else:
+            parts.append(letter + text)
+            active = letter
+        if cmd != 'M':
+            cx, cy = coords[-2:]
+        prev_cmd, prev_ctrl = cmd, ctrl
+        first = False
+    return ''.join(parts)
+
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+_TRANSFORM_RE = re.compile(r'\s*(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)\s*,?')
+
+
+def multiply(m1, m2):
+    """Произведение матриц (a, b, c, d, e, f): сначала применяется m2, потом m1"""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2,
+            a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+
+def parse_transform(text):
+    """Атрибут transform -> матрица (a, b, c, d, e, f): x' = a*x + c*y + e, y' = b*x + d*y + f"""
+    matrix = IDENTITY
+    pos = 0
+    text = (text or '').strip()
+    while pos < len(text):
+        match = _TRANSFORM_RE.match(text, pos)
+        if not match:
+            raise ValueError(f"неверный transform: {text[pos:pos + 20]!r}")
+        name, args = match.group(1), [float(v) for v in _NUMBER_RE.findall(match.group(2))]
+        if name == 'matrix' and len(args) == 6:
+            step = tuple(args)
+        elif name == 'translate' and len(args) in (1, 2):
+            step = (1.0, 0.0, 0.0, 1.0, args[0], args[1] if len(args) == 2 else 0.0)
+        elif name == 'scale' and len(args) in (1, 2):
+            step = (args[0], 0.0, 0.0, args[-1], 0.0, 0.0)
+        elif name == 'rotate' and len(args) in (1, 3):
+            angle = math.radians(args[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(args) == 3:
+                cx, cy = args[1], args[2]
+                step = multiply(multiply((1.0, 0.0, 0.0, 1.0, cx, cy), step), (1.0, 0.0, 0.0, 1.0, -cx, -cy))
+        elif name == 'skewX' and len(args) == 1:
+            step = (1.0, 0.0, math.tan(math.radians(args[0])), 1.0, 0.0, 0.0)
+        elif name == 'skewY' and len(args) == 1:
+            step = (1.0, math.tan(math.radians(args[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            raise ValueError(f"неверные аргументы {name}: {match.group(2)!r}")
+        matrix = multiply(matrix, step)
+        pos = match.end()
+    return matrix
+
+
+def matrix_scale(matrix):
+    """Средний масштаб матрицы (для толщины обводки)"""
+    return math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+
+
+def arc_to_cubics(x1, y1, rx, ry, rotation, large, sweep, x2, y2):
+    """
+    Дуга эллипса (параметры команды A) -> список кубических кривых [x1, y1, x2, y2, x, y],
+    не больше 90 градусов каждая. Алгоритм из SVG 1.1, приложение F.6.5.
+    """
+    if (x1, y1) == (x2, y2):
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if not rx or not ry:
+        return [[x1, y1, x2, y2, x2, y2]]
+    phi = math.radians(rotation)
+    cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    xp = cos_phi * dx + sin_phi * dy
+    yp = -sin_phi * dx + cos_phi * dy
+    # Радиусы, слишком маленькие для концов дуги, увеличиваются
+    scale = (xp / rx) ** 2 + (yp / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * yp * yp - ry * ry * xp * xp
+    den = rx * rx * yp * yp + ry * ry * xp * xp
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if bool(large) == bool(sweep):
+        coef = -coef
+    cxp, cyp = coef * rx * yp / ry, -coef * ry * xp / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2
+    cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2
+
+    def angle(ux, uy, vx, vy):
+        return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+    theta = angle(1, 0, (xp - cxp) / rx, (yp - cyp) / ry)
+    delta = angle((xp - cxp) / rx, (yp - cyp) / ry, (-xp - cxp) / rx, (-yp - cyp) / ry)
+    if not sweep and delta > 0:
+        delta -= 2 * math.pi
+    elif sweep and delta < 0:
+        delta += 2 * math.pi
+
+    def point(t):
+        x, y = rx * math.cos(t), ry * math.sin(t)
+        return cos_phi * x - sin_phi * y + cx, sin_phi * x + cos_phi * y + cy
+
+    def derivative(t):
+        x, y = -rx * math.sin(t), ry * math.cos(t)
+        return cos_phi * x - sin_phi * y, sin_phi * x + cos_phi * y
+
+    count = max(1, int(math.ceil(abs(delta) / (math.pi / 2) - 1e-9)))
+    step = delta / count
+    k = 4 / 3 * math.tan(step / 4)
+    curves = []
+    start = (x1, y1)
+    for i in range(count):
+        t1, t2 = theta + i * step, theta + (i + 1) * step
+        d1, d2 = derivative(t1), derivative(t2)
+        end = (x2, y2) if i == count - 1 else point(t2)
+        curves.append([start[0] + k * d1[0], start[1] + k * d1[1],
+                       end[0] - k * d2[0], end[1] - k * d2[1], end[0], end[1]])
+        start = end
+    return curves
+
+
+def transform_segments(segments, matrix):
+    """
+    Применяет матрицу к абсолютным сегментам. Дуги при этом становятся кубическими
+    кривыми: после поворота или неравномерного масштаба эллипс уже не описать
+    параметрами команды A.
+    """
+    if matrix == IDENTITY:
+        return segments
+    a, b, c, d, e, f = matrix
+
+    def apply(coords):
+        out = []
+        for i in range(0, len(coords), 2):
+            x, y = coords[i], coords[i + 1]
+            out += [a * x + c * y + e, b * x + d * y + f]
+        return out
+
+    result = []
+    cx = cy = sx = sy = 0.0
+    for cmd, coords in segments:
+        if cmd == 'Z':
+            result.append(('Z', []))
+            cx, cy = sx, sy
+            continue
+        if cmd == 'A':
+            for curve in arc_to_cubics(cx, cy, *coords):
+                result.append(('C', apply(curve)))
+        else:
+            result.append((cmd, apply(coords)))
+        cx, cy = coords[-2:]
+        if cmd == 'M':
+            sx, sy = cx, cy
+    return result
+
+
+def rect_segments(x, y, width, height, rx=None, ry=None):
+    """<rect> -> сегменты пути (скругление углов дугами). Пусто, если размер нулевой."""
+    if width <= 0 or height <= 0:
+        return []
+    if rx is None:
+        rx = ry
+    if ry is None:
+        ry = rx
+    rx = min(max(rx or 0.0, 0.0), width / 2)
+    ry = min(max(ry or 0.0, 0.0), height / 2)
+    right, bottom = x + width, y + height
+    if not rx or not ry:
+        return [('M', [x, y]), ('L', [right, y]), ('L', [right, bottom]), ('L', [x, bottom]), ('Z', [])]
+    return [
+        ('M', [x + rx, y]),
+        ('L', [right - rx, y]), ('A', [rx, ry, 0.0, 0.0, 1.0, right, y + ry]),
+        ('L', [right, bottom - ry]), ('A', [rx, ry, 0.0, 0.0, 1.0, right - rx, bottom]),
+        ('L', [x + rx, bottom]), ('A', [rx, ry, 0.0, 0.0, 1.0, x, bottom - ry]),
+        ('L', [x, y + ry]), ('A', [rx, ry, 0.0, 0.0, 1.0, x + rx, y]),
+        ('Z', []),
+    ]
+
+
+def ellipse_segments(cx, cy, rx, ry):
+    """<ellipse>/<circle> -> две полуэллиптические дуги"""
+    if rx <= 0 or ry <= 0:
+        return []
+    return [
+        ('M', [cx - rx, cy]),
+        ('A', [rx, ry, 0.0, 1.0, 0.0, cx + rx, cy]),
+        ('A', [rx, ry, 0.0, 1.0, 0.0, cx - rx, cy]),
+        ('Z', []),
+    ]
+
+
+def polyline_segments(points, closed=False):
+    """
+    Атрибут points (<polyline>/<polygon>) -> сегменты пути.
+    Непарная последняя координата отбрасывается, как в браузерах.
+    """
+    numbers = [float(v) for v in _NUMBER_RE.findall(points or '')]
+    pairs = [numbers[i:i + 2] for i in range(0, len(numbers) - 1, 2)]
+    if not pairs:
+        return []
+    segments = [('M', pairs[0])] + [('L', pair) for pair in pairs[1:]]
+    if closed:
+        segments.append(('Z', []))
+    return segments
+
+
+def segments_bounds(segments, padding=0.0):
+    """
+    Габариты пути по всем точкам, включая контрольные (кривая лежит внутри их оболочки).
+    Дуги считаются по их кубическим кривым (arc_to_cubics) с запасом на погрешность
+    приближения: большая дуга уходит от концов на диаметр и дальше.
+    """
+    xs, ys = [], []
+    cx = cy = sx = sy = 0.0
+    for cmd, coords in segments:
+        if cmd == 'Z':
+            cx, cy = sx, sy
+            continue
+        if cmd == 'A':
+            margin = 1e-3 * max(abs(coords[0]), abs(coords[1]))
+            for curve in arc_to_cubics(cx, cy, *coords):
+                xs += [min(curve[0::2]) - margin, max(curve[0::2]) + margin]
+                ys += [min(curve[1::2]) - margin, max(curve[1::2]) + margin]
+            xs.append(coords[5])
+            ys.append(coords[6])
+        else:
+            xs += coords[0::2]
+            ys += coords[1::2]
+        cx, cy = coords[-2:]
+        if cmd == 'M':
+            sx, sy = cx, cy
+    if not xs:
+        return None
+    return (min(xs) - padding, min(ys) - padding, max(xs) + padding, max(ys) + padding)
+
+
+def bounds_overlap(a, b):
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
+
+def optimize_path_data(d, decimals, keep_zero_length=False):
+    """Path data -> оптимизированная path data с decimals знаками после запятой"""
+    segments = simplify_segments(round_segments(parse_path(d), decimals), keep_zero_length)
+    return serialize_path(segments, decimals)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Модули конвертера импортируют друг друга напрямую (как при запуске из MOBILE/ANDROID)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Разбор, запись и преобразование path data (svg_path.py)"""
+
+import math
+
+import pytest
+
+from svg_path import (arc_to_cubics, optimize_path_data, parse_path, round_segments,
+                      serialize_path, simplify_segments)
+
+
+def assert_segments_close(actual, expected, tolerance=1e-9):
+    assert [cmd for cmd, _ in actual] == [cmd for cmd, _ in expected]
+    for (_, a), (_, b) in zip(actual, expected):
+        assert a == pytest.approx(b, abs=tolerance)
+
+
+# --- parse_path ------------------------------------------------------------------
+
+def test_relative_commands_become_absolute():
+    assert parse_path('m10 10 l5 0 h-2 v3 c1 1 2 2 3 3 q1 0 2 2 z m1 1 l1 0') == [
+        ('M', [10, 10]), ('L', [15, 10]), ('L', [13, 10]), ('L', [13, 13]),
+        ('C', [14, 14, 15, 15, 16, 16]), ('Q', [17, 16, 18, 18]), ('Z', []),
+        ('M', [11, 11]), ('L', [12, 11]),
+    ]
+
+
+def test_implicit_repeats():
+    # Повтор после M - это L, после остальных команд - та же команда
+    assert parse_path('M0 0 10 10 20 0') == [('M', [0, 0]), ('L', [10, 10]), ('L', [20, 0])]
+    assert parse_path('m1 1 2 2') == [('M', [1, 1]), ('L', [3, 3])]
+    assert parse_path('M0 0l1 1 1 1') == [('M', [0, 0]), ('L', [1, 1]), ('L', [2, 2])]
+
+
+def test_compact_numbers():
+    assert parse_path('M.5.5-1-1e1,2 3') == [('M', [.5, .5]), ('L', [-1, -10]), ('L', [2, 3])]
+
+
+def test_smooth_curves_reflect_the_previous_control_point():
+    assert parse_path('M0 0C0 10 10 10 10 0S20-10 20 0') == [
+        ('M', [0, 0]), ('C', [0, 10, 10, 10, 10, 0]), ('C', [10, -10, 20, -10, 20, 0])]
+    assert parse_path('M0 0Q5 10 10 0T20 0') == [
+        ('M', [0, 0]), ('Q', [5, 10, 10, 0]), ('Q', [15, -10, 20, 0])]
+    # Без предыдущей кривой контрольная точка совпадает с текущей
+    assert parse_path('M1 2S3 4 5 6') == [('M', [1, 2]), ('C', [1, 2, 3, 4, 5, 6])]
+
+
+def test_arc_flags_may_be_written_without_separators():
+    assert parse_path('M0 0a5 5 0 1010 0') == [('M', [0, 0]), ('A', [5, 5, 0, 1, 0, 10, 0])]
+    assert parse_path('M0 0A5,5,30,0,1,10,0') == [('M', [0, 0]), ('A', [5, 5, 30, 0, 1, 10, 0])]
+
+
+@pytest.mark.parametrize('d', ['M0 0L1', 'M0 0A5 5 0 2 0 10 0', 'M0 0Lx'])
+def test_invalid_path_data(d):
+    with pytest.raises(ValueError):
+        parse_path(d)
+
+
+# --- serialize_path ------------------------------------------------------------
+
+@pytest.mark.parametrize('d', [
+    'M10 10L20 10L20 20L10 20Z',
+    'm10 10 l5 0 h-2 v3 c1 1 2 2 3 3 q1 0 2 2 z m1 1 l1 0',
+    'M0 0C0 10 10 10 10 0S20-10 20 0',
+    'M0 0Q5 10 10 0T20 0T30 0',
+    'M0 0a5 5 0 1010 0a5 5 0 0 0-10 0z',
+    'M1.25-3.5L-2.125.75l.5.5 100.875 3',
+    'M0 0 10 10 20 0M5 5l1 1',
+])
+def test_round_trip(d):
+    segments = parse_path(d)
+    assert_segments_close(parse_path(serialize_path(segments, 3)), segments)
+
+
+def test_shortest_form():
+    assert serialize_path(parse_path('M 10 10 L 20 10 L 20 20 L 10 20 Z'), 2) == 'M10 10H20V20H10Z'
+    # Относительная форма и неявный повтор, если они короче
+    assert serialize_path(parse_path('M100 100L101 101L102 102'), 2) == 'M100 100l1 1 1 1'
+    # Отражённая контрольная точка записывается через S
+    assert serialize_path(parse_path('M0 0C0 10 10 10 10 0C10-10 20-10 20 0'), 2) == 'M0 0C0 10 10 10 10 0S20-10 20 0'
+
+
+def test_optimize_path_data_rounds_and_drops_redundant_commands():
+    d = 'M0 0L0.0001 0L10.004 0L10 10L0 10L0 0Z M5 5'
+    assert optimize_path_data(d, 2) == 'M0 0H10V10H0Z'
+    segments = simplify_segments(round_segments(parse_path(d), 2))
+    assert_segments_close(parse_path(optimize_path_data(d, 2)), segments)
+
+
+# --- arc_to_cubics ---------------------------------------------------------------
+
+@pytest.mark.parametrize('large, sweep', [(0, 0), (0, 1), (1, 0), (1, 1)])
+def test_arc_to_cubics_follows_the_arc(large, sweep):
+    # Полуокружность радиуса 5 через (0, 0) и (10, 0): центр (5, 0) при любых флагах
+    curves = arc_to_cubics(0, 0, 5, 5, 0, large, sweep, 10, 0)
+    assert curves and curves[-1][4:] == [10, 0]
+    start = (0, 0)
+    for x1, y1, x2, y2, x, y in curves:
+        for t in (0.25, 0.5, 0.75):
+            px = (1 - t) ** 3 * start[0] + 3 * (1 - t) ** 2 * t * x1 + 3 * (1 - t) * t * t * x2 + t ** 3 * x
+            py = (1 - t) ** 3 * start[1] + 3 * (1 - t) ** 2 * t * y1 + 3 * (1 - t) * t * t * y2 + t ** 3 * y
+            assert math.hypot(px - 5, py) == pytest.approx(5, abs=5e-3)
+        start = (x, y)
+
+
+def test_arc_sweep_picks_the_side():
+    # sweep=1 в SVG (ось y вниз) - по часовой стрелке: дуга из (0, 0) в (10, 0) идёт через y < 0
+    up = arc_to_cubics(0, 0, 5, 5, 0, 0, 1, 10, 0)
+    down = arc_to_cubics(0, 0, 5, 5, 0, 0, 0, 10, 0)
+    assert min(c[5] for c in up[:-1]) < 0 < max(c[5] for c in down[:-1])
+
+
+def test_degenerate_arcs():
+    assert arc_to_cubics(1, 1, 5, 5, 0, 0, 1, 1, 1) == []
+    # Нулевой радиус - прямая
+    assert arc_to_cubics(0, 0, 0, 5, 0, 0, 1, 10, 0) == [[0, 0, 10, 0, 10, 0]]
+    # Слишком маленький радиус увеличивается до половины хорды
+    curves = arc_to_cubics(0, 0, 1, 1, 0, 0, 1, 10, 0)
+    assert len(curves) == 2 and curves[0][4:] == pytest.approx([5, -5])